@@ -0,0 +1,256 @@
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.report import environment, write_report
+from src.cluster import HashRing
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class LocalNode:
+    # One aggregator process (src.runtime launcher) on a local port with its own
+    # database; RUNTIME_* in env select the server settings.
+
+    def __init__(self, port: int, data_dir: Path, env: Optional[Dict[str, str]] = None):
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.db_path = data_dir / f"node-{port}.db"
+        self.log_path = data_dir / f"node-{port}.log"
+        self.env = env or {}
+        self.process: Optional[subprocess.Popen] = None
+
+    def start(self, **env: str):
+        self.env.update(env)
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "src.runtime"],
+            cwd=ROOT,
+            env={**os.environ, "HOST": "127.0.0.1", "PORT": str(self.port), "DATABASE_PATH": str(self.db_path), **self.env},
+            stdout=open(self.log_path, "ab"),
+            stderr=subprocess.STDOUT,
+        )
+
+    def stop(self, kill: bool = False):
+        if self.process is None:
+            return
+        if kill:
+            self.process.kill()
+        else:
+            self.process.terminate()
+        self.process.wait(timeout=60)
+        self.process = None
+
+    async def wait_ready(self, client: httpx.AsyncClient, timeout: float = 30.0) -> float:
+        start = time.perf_counter()
+        while time.perf_counter() - start < timeout:
+            if self.process is not None and self.process.poll() is not None:
+                raise RuntimeError(f"Node {self.url} exited, see {self.log_path}")
+            try:
+                if (await client.get(f"{self.url}/ready")).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.05)
+        raise TimeoutError(f"Node {self.url} not ready after {timeout}s")
+
+    def keys(self) -> Set[Tuple[str, str]]:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return set(conn.execute("SELECT topic, event_id FROM processed_events"))
+        finally:
+            conn.close()
+
+
+def make_events(count: int, topics: int, run_id: str, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "topic": f"cluster.topic-{rng.randrange(topics)}",
+            "event_id": f"{run_id}-{i}",
+            "timestamp": "2025-10-23T10:00:00Z",
+            "source": "cluster-bench",
+            "payload": {"n": i},
+        }
+        for i in range(count)
+    ]
+
+
+async def publish_all(
+    client: httpx.AsyncClient,
+    nodes: List[LocalNode],
+    events: List[Dict[str, Any]],
+    batch_size: int,
+    concurrency: int
+) -> Dict[str, Any]:
+    # Batches go to nodes round-robin, so every node acts as an entry point.
+    batches = [events[i:i + batch_size] for i in range(0, len(events), batch_size)]
+    pending = list(enumerate(batches))
+    totals = {"accepted": 0, "duplicates": 0, "errors": 0}
+
+    async def worker():
+        while pending:
+            index, batch = pending.pop()
+            node = nodes[index % len(nodes)]
+            response = await client.post(f"{node.url}/publish", json={"events": batch})
+            if response.status_code != 200:
+                totals["errors"] += 1
+                continue
+            body = response.json()
+            totals["accepted"] += body["accepted"]
+            totals["duplicates"] += body["duplicates"]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    totals["throughput_events_per_s"] = len(events) / elapsed if elapsed > 0 else 0.0
+    return totals
+
+
+async def wait_processed(client: httpx.AsyncClient, node: LocalNode, target: int, timeout: float) -> int:
+    start = time.perf_counter()
+    processed = 0
+    while time.perf_counter() - start < timeout:
+        processed = (await client.get(f"{node.url}/stats")).json()["unique_processed"]
+        if processed >= target:
+            break
+        await asyncio.sleep(0.1)
+    return processed
+
+
+def check_placement(nodes: List[LocalNode], expected: Set[Tuple[str, str]]) -> Dict[str, Any]:
+    # Every key stored exactly once, on the node the ring says owns it.
+    ring = HashRing([node.url for node in nodes])
+    seen: Dict[Tuple[str, str], str] = {}
+    misplaced = duplicated = 0
+    per_node = {}
+    for node in nodes:
+        keys = node.keys()
+        per_node[node.url] = len(keys)
+        for key in keys:
+            if key in seen:
+                duplicated += 1
+            seen[key] = node.url
+            if ring.owner(*key) != node.url:
+                misplaced += 1
+    missing = len(expected - set(seen))
+    return {
+        "per_node": per_node,
+        "misplaced": misplaced,
+        "duplicated": duplicated,
+        "missing": missing,
+        "ok": misplaced == 0 and duplicated == 0 and missing == 0,
+    }
+
+
+async def start_cluster(client: httpx.AsyncClient, nodes: List[LocalNode]):
+    urls = ",".join(node.url for node in nodes)
+    for node in nodes:
+        node.start(CLUSTER_NODES=urls, CLUSTER_SELF=node.url)
+    for node in nodes:
+        await node.wait_ready(client)
+
+
+def stop_cluster(nodes: List[LocalNode]):
+    for node in nodes:
+        node.stop()
+
+
+async def run(args: argparse.Namespace, data_dir: Path) -> Dict[str, Any]:
+    run_id = uuid.uuid4().hex[:8]
+    nodes = [LocalNode(args.base_port + i, data_dir) for i in range(args.nodes)]
+    events = make_events(args.events, args.topics, run_id, args.seed)
+    expected = {(e["topic"], e["event_id"]) for e in events}
+    results: Dict[str, Any] = {}
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=60.0, limits=limits) as client:
+        await start_cluster(client, nodes)
+        try:
+            publish = await publish_all(client, nodes, events, args.batch_size, args.concurrency)
+            processed = await wait_processed(client, nodes[0], len(expected), args.timeout)
+            republish = await publish_all(client, nodes, events, args.batch_size, args.concurrency)
+            results["publish"] = publish
+            results["republish"] = republish
+            results["unique_processed"] = processed
+            results["placement"] = check_placement(nodes, expected)
+        finally:
+            stop_cluster(nodes)
+
+        # Rebalance: restart with one more node, move keys, and check that
+        # nothing is lost and a full replay is still rejected.
+        nodes.append(LocalNode(args.base_port + args.nodes, data_dir))
+        await start_cluster(client, nodes)
+        try:
+            start = time.perf_counter()
+            moved = 0
+            for node in nodes:
+                moved += (await client.post(f"{node.url}/cluster/rebalance", timeout=600.0)).json()["moved"]
+            results["rebalance"] = {
+                "nodes": len(nodes),
+                "moved": moved,
+                "moved_fraction": moved / len(expected) if expected else 0.0,
+                "duration_s": time.perf_counter() - start,
+                "placement": check_placement(nodes, expected),
+                "replay": await publish_all(client, nodes, events, args.batch_size, args.concurrency),
+            }
+        finally:
+            stop_cluster(nodes)
+
+    rebalance = results["rebalance"]
+    results["ok"] = (
+        results["placement"]["ok"]
+        and results["unique_processed"] == len(expected)
+        and results["republish"]["accepted"] == 0
+        and rebalance["placement"]["ok"]
+        and rebalance["replay"]["accepted"] == 0
+    )
+    return results
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Cluster-mode correctness and rebalancing check with local processes")
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--base-port", type=int, default=18080)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait for processing")
+    parser.add_argument("--data-dir", help="Keep node databases and logs here")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(args.data_dir) if args.data_dir else Path(tmp)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        results = asyncio.run(run(args, data_dir))
+
+    write_report({
+        "benchmark": "cluster",
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "data_dir")},
+        "environment": environment(),
+        "results": results,
+    }, args.output)
+    return 0 if results["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
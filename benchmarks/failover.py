@@ -0,0 +1,162 @@
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.cluster import LocalNode, make_events, publish_all, wait_processed
+from benchmarks.report import environment, write_report
+
+
+async def sample_lag(client: httpx.AsyncClient, standby: LocalNode, samples: List[int], stop: asyncio.Event):
+    while not stop.is_set():
+        try:
+            status = (await client.get(f"{standby.url}/replication")).json()["replicator"]
+            samples.append(status["lag"])
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.05)
+
+
+async def wait_caught_up(client: httpx.AsyncClient, standby: LocalNode, head: int, timeout: float) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        status = (await client.get(f"{standby.url}/replication")).json()["replicator"]
+        if status["offset"] >= head:
+            break
+        await asyncio.sleep(0.02)
+    return time.perf_counter() - start
+
+
+def percentile(values: List[int], q: float) -> int:
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(args: argparse.Namespace, data_dir: Path) -> Dict[str, Any]:
+    run_id = uuid.uuid4().hex[:8]
+    primary = LocalNode(args.base_port, data_dir)
+    standby = LocalNode(args.base_port + 1, data_dir)
+    events = make_events(args.events, args.topics, run_id, args.seed)
+    steady, tail = events[:len(events) // 2], events[len(events) // 2:]
+    results: Dict[str, Any] = {}
+
+    limits = httpx.Limits(max_connections=args.concurrency + 2, max_keepalive_connections=args.concurrency + 2)
+    async with httpx.AsyncClient(timeout=60.0, limits=limits) as client:
+        primary.start(REPLICATION_ROLE="primary")
+        standby.start(REPLICATION_ROLE="standby", REPLICATION_PRIMARY=primary.url, REPLICATION_STANDBY_ID="bench-standby")
+        try:
+            await primary.wait_ready(client)
+            await standby.wait_ready(client)
+
+            # Steady state: lag sampled on the standby while the primary takes load.
+            samples: List[int] = []
+            stop = asyncio.Event()
+            sampler = asyncio.create_task(sample_lag(client, standby, samples, stop))
+            publish = await publish_all(client, [primary], steady, args.batch_size, args.concurrency)
+            await wait_processed(client, primary, len(steady), args.timeout)
+            head = (await client.get(f"{primary.url}/replication")).json()["changelog"]["head"]
+            catch_up_s = await wait_caught_up(client, standby, head, args.timeout)
+            stop.set()
+            await sampler
+            results["steady"] = {
+                "publish": publish,
+                "lag_samples": len(samples),
+                "lag_p50": percentile(samples, 0.5),
+                "lag_p99": percentile(samples, 0.99),
+                "lag_max": max(samples, default=0),
+                "catch_up_s": catch_up_s,
+            }
+
+            # Failure: more load, then the primary is killed without warning.
+            await publish_all(client, [primary], tail, args.batch_size, args.concurrency)
+            await asyncio.sleep(args.kill_after)
+            primary.stop(kill=True)
+            killed_at = time.perf_counter()
+
+            promote = (await client.post(
+                f"{standby.url}/replication/promote", params={"timeout": args.promote_timeout}
+            )).json()
+            probe = {
+                "topic": "failover.probe",
+                "event_id": f"{run_id}-probe",
+                "timestamp": "2025-10-23T10:00:00Z",
+                "source": "failover-bench",
+                "payload": {},
+            }
+            while (await client.post(f"{standby.url}/publish", json=probe)).status_code != 200:
+                await asyncio.sleep(0.01)
+            failover_s = time.perf_counter() - killed_at
+
+            # What the dead primary had recorded but the standby never received
+            # would be processed again after failover.
+            primary_keys = primary.keys()
+            standby_keys = standby.keys()
+            replay = await publish_all(client, [standby], events, args.batch_size, args.concurrency)
+            results["failover"] = {
+                "promote": promote,
+                "failover_s": failover_s,
+                "primary_processed": len(primary_keys),
+                "standby_had": len(primary_keys & standby_keys),
+                "lost_dedup_keys": len(primary_keys - standby_keys),
+                "replay": replay,
+            }
+        finally:
+            primary.stop(kill=True)
+            standby.stop()
+
+    failover = results["failover"]
+    results["ok"] = (
+        failover["promote"]["role"] == "primary"
+        and failover["replay"]["errors"] == 0
+        and failover["replay"]["accepted"] + failover["replay"]["duplicates"] == len(events)
+        and failover["lost_dedup_keys"] <= args.max_lost
+    )
+    return results
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Primary/standby replication lag and failover time with local processes")
+    parser.add_argument("--base-port", type=int, default=18180)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--kill-after", type=float, default=0.5, help="Seconds between the last publish and the kill")
+    parser.add_argument("--promote-timeout", type=float, default=2.0)
+    parser.add_argument("--max-lost", type=int, default=0, help="Lost dedup keys tolerated for ok")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait for processing")
+    parser.add_argument("--data-dir", help="Keep node databases and logs here")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(args.data_dir) if args.data_dir else Path(tmp)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        results = asyncio.run(run(args, data_dir))
+
+    write_report({
+        "benchmark": "failover",
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "data_dir")},
+        "environment": environment(),
+        "results": results,
+    }, args.output)
+    return 0 if results["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
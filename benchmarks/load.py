@@ -0,0 +1,312 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.report import (
+    compare, correct_coordinated_omission, environment,
+    load_report, summarize, write_report
+)
+
+
+@dataclass
+class Scenario:
+    name: str
+    total_events: int = 5000
+    duplicate_rate: float = 0.25
+    batch_size: int = 100
+    concurrency: int = 10
+    topics: int = 5
+    payload_bytes: int = 128
+    # "closed": each of `concurrency` workers sends back-to-back.
+    # "open": batches are released on a fixed schedule of `rate` events/s.
+    mode: str = "closed"
+    rate: float = 0.0
+    seed: int = 42
+    drain_timeout: float = 120.0
+
+
+SCENARIOS = {
+    "baseline": Scenario("baseline"),
+    "smoke": Scenario("smoke", total_events=1000, concurrency=4),
+    "small-events": Scenario("small-events", payload_bytes=16, batch_size=500),
+    "large-events": Scenario("large-events", payload_bytes=8192, batch_size=20),
+    "high-duplicates": Scenario("high-duplicates", duplicate_rate=0.75),
+    "many-topics": Scenario("many-topics", topics=1000),
+    "single-event": Scenario("single-event", total_events=2000, batch_size=1, concurrency=32),
+    "open-loop": Scenario("open-loop", mode="open", rate=2000.0),
+}
+
+HIGHER_IS_BETTER = ("throughput_events_per_s",)
+COMPARED_METRICS = ("throughput_events_per_s", "latency_ms", "time_to_processed_s", "drain_after_publish_s")
+
+
+class Workload:
+
+    def __init__(self, scenario: Scenario, run_id: str):
+        self.scenario = scenario
+        self.run_id = run_id
+        self.rng = random.Random(scenario.seed)
+        self.topics = [f"bench.topic-{i}" for i in range(scenario.topics)]
+        self.unique_count = max(1, int(scenario.total_events * (1 - scenario.duplicate_rate)))
+
+    def event_ids(self) -> List[str]:
+        unique_ids = [f"{self.run_id}-{i}" for i in range(self.unique_count)]
+        duplicate_count = self.scenario.total_events - self.unique_count
+        duplicates = [self.rng.choice(unique_ids) for _ in range(duplicate_count)]
+        ids = unique_ids + duplicates
+        self.rng.shuffle(ids)
+        return ids
+
+    def batches(self) -> List[Dict[str, Any]]:
+        timestamp = datetime.now(timezone.utc).isoformat()
+        filler = "x" * self.scenario.payload_bytes
+        origin = {}
+
+        events = []
+        for event_id in self.event_ids():
+            if event_id not in origin:
+                origin[event_id] = (self.rng.choice(self.topics), f"bench-source-{self.rng.randrange(8)}")
+            topic, source = origin[event_id]
+            events.append({
+                "topic": topic,
+                "event_id": event_id,
+                "timestamp": timestamp,
+                "source": source,
+                "payload": {"data": filler},
+            })
+
+        size = self.scenario.batch_size
+        if size == 1:
+            return events
+        return [{"events": events[i:i + size]} for i in range(0, len(events), size)]
+
+
+class Recorder:
+
+    def __init__(self):
+        self.service_times: List[float] = []
+        self.response_times: List[float] = []
+        self.received = 0
+        self.accepted = 0
+        self.duplicates = 0
+        self.errors = 0
+        self.first_send: Optional[float] = None
+        self.last_response: Optional[float] = None
+
+    def record(self, intended: float, sent: float, done: float, result: Optional[Dict[str, Any]]):
+        if self.first_send is None or sent < self.first_send:
+            self.first_send = sent
+        self.last_response = max(self.last_response or done, done)
+        self.service_times.append(done - sent)
+        self.response_times.append(done - intended)
+
+        if result is None:
+            self.errors += 1
+            return
+        self.received += result.get("received", 0)
+        self.accepted += result.get("accepted", 0)
+        self.duplicates += result.get("duplicates", 0)
+
+
+async def post_batch(client: httpx.AsyncClient, body: Dict[str, Any], recorder: Recorder, intended: float):
+    sent = time.perf_counter()
+    try:
+        response = await client.post("/publish", json=body, timeout=30.0)
+        response.raise_for_status()
+        result = response.json()
+    except (httpx.HTTPError, ValueError):
+        result = None
+    recorder.record(intended, sent, time.perf_counter(), result)
+
+
+async def run_closed_loop(client: httpx.AsyncClient, batches: List[Dict[str, Any]], scenario: Scenario, recorder: Recorder):
+    pending = iter(batches)
+
+    async def worker():
+        for body in pending:
+            await post_batch(client, body, recorder, time.perf_counter())
+
+    await asyncio.gather(*(worker() for _ in range(scenario.concurrency)))
+
+
+async def run_open_loop(client: httpx.AsyncClient, batches: List[Dict[str, Any]], scenario: Scenario, recorder: Recorder):
+    # Latency is measured from each batch's scheduled send time, so a stalled
+    # server is charged for the queueing it causes (no coordinated omission).
+    interval = scenario.batch_size / scenario.rate
+    start = time.perf_counter()
+    tasks = []
+    for i, body in enumerate(batches):
+        intended = start + i * interval
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(post_batch(client, body, recorder, intended)))
+    await asyncio.gather(*tasks)
+
+
+async def fetch_json(client: httpx.AsyncClient, path: str) -> Dict[str, Any]:
+    response = await client.get(path, timeout=10.0)
+    response.raise_for_status()
+    return response.json()
+
+
+async def wait_until_processed(client: httpx.AsyncClient, target: int, timeout: float) -> Optional[float]:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        stats = await fetch_json(client, "/stats")
+        if stats["unique_processed"] >= target:
+            return time.perf_counter()
+        await asyncio.sleep(0.05)
+    return None
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario) -> Dict[str, Any]:
+    workload = Workload(scenario, run_id=f"bench-{uuid.uuid4().hex[:8]}")
+    batches = workload.batches()
+    recorder = Recorder()
+
+    baseline = (await fetch_json(client, "/stats"))["unique_processed"]
+
+    if scenario.mode == "open":
+        await run_open_loop(client, batches, scenario, recorder)
+    else:
+        await run_closed_loop(client, batches, scenario, recorder)
+
+    # Events the queue refused are never processed, so don't wait for them.
+    dropped = recorder.received - recorder.accepted - recorder.duplicates
+    target = baseline + max(0, workload.unique_count - dropped)
+    processed_at = await wait_until_processed(client, target, scenario.drain_timeout)
+
+    publish_duration = recorder.last_response - recorder.first_send
+    service_ms = [t * 1000 for t in recorder.service_times]
+    if scenario.mode == "open":
+        corrected_ms = [t * 1000 for t in recorder.response_times]
+    else:
+        expected = sorted(service_ms)[len(service_ms) // 2] if service_ms else 0.0
+        corrected_ms = correct_coordinated_omission(service_ms, expected)
+
+    return {
+        "requests": len(batches),
+        "errors": recorder.errors,
+        "received": recorder.received,
+        "accepted": recorder.accepted,
+        "duplicates": recorder.duplicates,
+        "dropped": dropped,
+        "publish_duration_s": publish_duration,
+        "throughput_events_per_s": recorder.received / publish_duration if publish_duration > 0 else 0.0,
+        "latency_ms": {
+            "service": summarize(service_ms),
+            "corrected": summarize(corrected_ms),
+        },
+        "time_to_processed_s": (processed_at - recorder.first_send) if processed_at else None,
+        "drain_after_publish_s": (processed_at - recorder.last_response) if processed_at else None,
+    }
+
+
+async def run_in_process(scenario: Scenario) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = str(Path(tmp) / "bench.db")
+        from src.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://inprocess") as client:
+                return await run_scenario(client, scenario)
+
+
+async def run_live(scenario: Scenario, base_url: str) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=max(scenario.concurrency, 10), max_keepalive_connections=scenario.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+        return await run_scenario(client, scenario)
+
+
+def build_scenario(args: argparse.Namespace) -> Scenario:
+    scenario = SCENARIOS[args.scenario]
+    overrides = {
+        "total_events": args.events,
+        "duplicate_rate": args.dup_rate,
+        "batch_size": args.batch_size,
+        "concurrency": args.concurrency,
+        "topics": args.topics,
+        "payload_bytes": args.payload_bytes,
+        "mode": args.mode,
+        "rate": args.rate,
+        "seed": args.seed,
+    }
+    scenario = replace(scenario, **{k: v for k, v in overrides.items() if v is not None})
+    if scenario.mode == "open" and scenario.rate <= 0:
+        raise SystemExit("open-loop mode needs --rate > 0")
+    return scenario
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load benchmark for the Log Aggregator /publish path")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="baseline")
+    parser.add_argument("--target", default="inprocess", help="'inprocess' or a base URL such as http://localhost:8080")
+    parser.add_argument("--events", type=int)
+    parser.add_argument("--dup-rate", type=float)
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--topics", type=int)
+    parser.add_argument("--payload-bytes", type=int)
+    parser.add_argument("--mode", choices=["closed", "open"])
+    parser.add_argument("--rate", type=float, help="Target events/s for open-loop mode")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--queue-mode", help="QUEUE_MODE for in-process runs (fifo, fair, ring)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON report to diff against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change counted as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    scenario = build_scenario(args)
+
+    if args.queue_mode:
+        os.environ["QUEUE_MODE"] = args.queue_mode
+
+    if args.target == "inprocess":
+        results = asyncio.run(run_in_process(scenario))
+    else:
+        results = asyncio.run(run_live(scenario, args.target))
+
+    report = {
+        "benchmark": "load",
+        "target": args.target,
+        "queue_mode": os.getenv("QUEUE_MODE", "fifo") if args.target == "inprocess" else None,
+        "scenario": asdict(scenario),
+        "environment": environment(),
+        "results": results,
+    }
+
+    regressed = False
+    if args.compare:
+        baseline = load_report(args.compare)
+        report["comparison"] = compare(
+            {k: results[k] for k in COMPARED_METRICS},
+            baseline["results"],
+            higher_is_better=HIGHER_IS_BETTER, threshold=args.threshold
+        )
+        regressed = any(d["regression"] for d in report["comparison"].values())
+
+    write_report(report, args.output)
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,609 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.report import compare, environment, load_report, summarize, write_report
+from src import codec
+from src.cold_keys import ColdKeyIndex
+from src.dedup_store import DedupStore
+from src.event_queue import EventQueue
+from src.fingerprint import fingerprint_batch
+from src.http_encoding import encode_body
+from src.models import Event, EventRecord, EventsResponse
+from src.search import SearchIndex
+from src.snapshot import Snapshotter
+
+HIGHER_IS_BETTER = ("ops_per_s", "events_per_s")
+DEFAULT_ROWS = "10000,1000000,10000000"
+PAYLOAD_SIZES = (0, 256, 4096, 65536)
+TIMESTAMP = "2025-10-23T10:00:00Z"
+BATCH_SIZE = 100
+
+
+def result(latencies_ns: List[int], elapsed: float, ops: int) -> Dict[str, Any]:
+    return {
+        "ops": ops,
+        "ops_per_s": ops / elapsed if elapsed > 0 else 0.0,
+        "latency_us": summarize(latencies_ns, scale=1e-3),
+    }
+
+
+async def measure_async(fn: Callable[[int], Awaitable[Any]], iterations: int, warmup: int) -> Dict[str, Any]:
+    for i in range(warmup):
+        await fn(i)
+
+    latencies = []
+    start = time.perf_counter()
+    for i in range(warmup, warmup + iterations):
+        t0 = time.perf_counter_ns()
+        await fn(i)
+        latencies.append(time.perf_counter_ns() - t0)
+    return result(latencies, time.perf_counter() - start, iterations)
+
+
+def measure_sync(fn: Callable[[int], Any], iterations: int, warmup: int) -> Dict[str, Any]:
+    for i in range(warmup):
+        fn(i)
+
+    latencies = []
+    start = time.perf_counter()
+    for i in range(warmup, warmup + iterations):
+        t0 = time.perf_counter_ns()
+        fn(i)
+        latencies.append(time.perf_counter_ns() - t0)
+    return result(latencies, time.perf_counter() - start, iterations)
+
+
+def record_batch(prefix: str, i: int) -> List[EventRecord]:
+    # What the consumer hands to mark_processed_batch; built outside timed code.
+    return [
+        EventRecord(f"micro.topic-{j % 16}", f"{prefix}-{i}-{j}", TIMESTAMP, "micro")
+        for j in range(BATCH_SIZE)
+    ]
+
+
+def populate(db_path: Path, rows: int, seed: int):
+    # Bulk-load straight through sqlite3: going through mark_processed would
+    # take hours at 10M rows and is not what is being measured.
+    conn = sqlite3.connect(db_path)
+    try:
+        existing = conn.execute("SELECT COUNT(*) FROM processed_events").fetchone()[0]
+        if existing >= rows:
+            return
+        rng = random.Random(seed)
+        topics = [f"micro.topic-{i}" for i in range(16)]
+        chunk = 50000
+        for start in range(existing, rows, chunk):
+            conn.executemany(
+                "INSERT OR IGNORE INTO processed_events "
+                "(topic, event_id, timestamp, source, processed_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (topics[i % len(topics)], f"existing-{i}", TIMESTAMP, f"source-{rng.randrange(32)}", TIMESTAMP)
+                    for i in range(start, min(start + chunk, rows))
+                ),
+            )
+            conn.commit()
+    finally:
+        conn.close()
+
+
+async def bench_dedup(rows_list: List[int], data_dir: Path, iterations: int, warmup: int, seed: int) -> Dict[str, Any]:
+    results = {}
+    for rows in rows_list:
+        db_path = data_dir / f"micro-dedup-{rows}.db"
+        store = DedupStore(db_path=str(db_path))
+        await store.initialize()
+        populate(db_path, rows, seed)
+
+        rng = random.Random(seed)
+        probes = [
+            (f"micro.topic-{i % 16}", f"existing-{i}") if rng.random() < 0.5
+            else (f"micro.topic-{i % 16}", f"missing-{i}")
+            for i in (rng.randrange(rows) for _ in range(iterations + warmup))
+        ]
+        run_id = f"{time.time_ns()}"
+
+        async def is_duplicate(i: int):
+            await store.is_duplicate(*probes[i])
+
+        async def mark_processed(i: int):
+            await store.mark_processed(f"micro.topic-{i % 16}", f"new-{run_id}-{i}", TIMESTAMP, "micro")
+
+        async def get_existing(i: int):
+            await store.get_existing(probes[(i + j) % len(probes)] for j in range(BATCH_SIZE))
+
+        batch_iterations = max(1, iterations // BATCH_SIZE)
+        batches = [record_batch(f"batch-{run_id}", i) for i in range(batch_iterations + 1)]
+
+        async def mark_processed_batch(i: int):
+            await store.mark_processed_batch(batches[i])
+
+        results[str(rows)] = {
+            "is_duplicate": await measure_async(is_duplicate, iterations, warmup),
+            "mark_processed": await measure_async(mark_processed, iterations, warmup),
+            "get_existing": per_event(await measure_async(get_existing, batch_iterations, 1)),
+            "mark_processed_batch": per_event(await measure_async(mark_processed_batch, batch_iterations, 1)),
+        }
+        await store.close()
+    return results
+
+
+async def bench_cold_keys(rows_list: List[int], data_dir: Path, iterations: int, warmup: int, seed: int) -> Dict[str, Any]:
+    # Batch lookups where 95% of keys are new (the common case for older keys),
+    # against SQLite alone and with the cold-key snapshot in front of it.
+    results = {}
+    for rows in rows_list:
+        db_path = data_dir / f"micro-dedup-{rows}.db"
+        rng = random.Random(seed)
+        probes = [
+            (f"micro.topic-{i % 16}", f"existing-{i}") if rng.random() < 0.05
+            else (f"micro.topic-{i % 16}", f"missing-{i}")
+            for i in (rng.randrange(rows) for _ in range(iterations + warmup))
+        ]
+        batch_iterations = max(1, iterations // BATCH_SIZE)
+        results[str(rows)] = {}
+        for variant in ("sqlite", "cold_keys"):
+            store = DedupStore(db_path=str(db_path))
+            index = None
+            if variant == "cold_keys":
+                index = ColdKeyIndex(store, str(data_dir / f"cold-keys-{rows}"))
+                store.add_writer(index)
+                store.add_key_index(index)
+            await store.initialize()
+            populate(db_path, rows, seed)
+            if index is not None:
+                await index.load()
+                await index.build()
+
+            async def get_existing(i: int):
+                await store.get_existing(probes[(i * BATCH_SIZE + j) % len(probes)] for j in range(BATCH_SIZE))
+
+            results[str(rows)][variant] = per_event(await measure_async(get_existing, batch_iterations, 1))
+            if index is not None:
+                results[str(rows)]["sqlite_skipped"] = index.stats["sqlite_skipped"] / index.stats["lookups"]
+            await store.close()
+    return results
+
+
+WORDS = ["disk", "timeout", "connection", "refused", "login", "failed", "retry", "quota",
+         "latency", "upstream", "cache", "miss", "error", "warning", "user", "token"]
+
+
+def populate_search(db_path: Path, rows: int, seed: int):
+    conn = sqlite3.connect(db_path)
+    try:
+        existing = conn.execute("SELECT COUNT(*) FROM search_docs").fetchone()[0]
+        if existing >= rows:
+            return
+        rng = random.Random(seed)
+        # Zipf-ish vocabulary: a few common words plus a long tail of ids, like logs.
+        chunk = 50000
+        for start in range(existing, rows, chunk):
+            conn.executemany(
+                "INSERT INTO search_docs (topic, source, event_id, body, timestamp, processed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        f"micro.topic-{i % 16}", f"source-{rng.randrange(32)}", f"existing-{i}",
+                        " ".join(rng.choice(WORDS) for _ in range(6)) + f" req-{rng.randrange(rows)}",
+                        TIMESTAMP, f"2025-10-23T10:{i * 60 // rows:02d}:00",
+                    )
+                    for i in range(start, min(start + chunk, rows))
+                ),
+            )
+            conn.commit()
+    finally:
+        conn.close()
+
+
+async def bench_search(rows_list: List[int], data_dir: Path, iterations: int, warmup: int, seed: int) -> Dict[str, Any]:
+    results = {}
+    for rows in rows_list:
+        db_path = data_dir / f"micro-search-{rows}.db"
+        store = DedupStore(db_path=str(db_path))
+        index = SearchIndex()
+        store.add_writer(index)
+        await store.initialize()
+        populate_search(db_path, rows, seed)
+
+        rng = random.Random(seed)
+        terms = [rng.choice(WORDS) for _ in range(iterations + warmup)]
+        rare = [f"req-{rng.randrange(rows)}" for _ in range(iterations + warmup)]
+
+        async def common_term(i: int):
+            await index.search(terms[i], limit=50)
+
+        async def common_term_topic(i: int):
+            await index.search(terms[i], topic=f"micro.topic-{i % 16}", limit=50)
+
+        async def two_terms_since(i: int):
+            await index.search(f"{terms[i]} {terms[-i]}", since="2025-10-23T10:30:00", limit=50)
+
+        async def rare_term(i: int):
+            await index.search(rare[i], limit=50)
+
+        async def common_term_ranked(i: int):
+            await index.search(terms[i], limit=50, order="rank")
+
+        search_iterations = max(1, iterations // 10)
+        results[str(rows)] = {
+            "common_term": await measure_async(common_term, search_iterations, 5),
+            "common_term_topic": await measure_async(common_term_topic, search_iterations, 5),
+            "two_terms_since": await measure_async(two_terms_since, search_iterations, 5),
+            "rare_term": await measure_async(rare_term, search_iterations, 5),
+            "common_term_ranked": await measure_async(common_term_ranked, max(1, search_iterations // 10), 1),
+        }
+        await store.close()
+    return results
+
+
+def import_ms(module: str, runs: int = 5) -> float:
+    # Fresh interpreter per run: in-process timing would hit the module cache.
+    code = f"import time; t = time.perf_counter(); import {module}; print((time.perf_counter() - t) * 1000)"
+    root = Path(__file__).resolve().parent.parent
+    samples = sorted(
+        float(subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True).stdout)
+        for _ in range(runs)
+    )
+    return samples[len(samples) // 2]
+
+
+async def bench_startup(rows_list: List[int], data_dir: Path, seed: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {
+        "import_ms": {"fastapi": import_ms("fastapi"), "src.main": import_ms("src.main")},
+    }
+
+    from src import main
+    for rows in rows_list:
+        db_path = data_dir / f"micro-dedup-{rows}.db"
+        store = DedupStore(db_path=str(db_path))
+        await store.initialize()
+        await store.close()
+        populate(db_path, rows, seed)
+
+        os.environ["DATABASE_PATH"] = str(db_path)
+        start = time.perf_counter()
+        async with main.app.router.lifespan_context(main.app):
+            live = time.perf_counter() - start
+            while not main.warmup.ready and not main.warmup.failed:
+                await asyncio.sleep(0.01)
+            ready = time.perf_counter() - start
+        results[str(rows)] = {"live_ms": live * 1000, "ready_ms": ready * 1000}
+    return results
+
+
+async def bench_snapshot(rows_list: List[int], data_dir: Path, iterations: int, seed: int) -> Dict[str, Any]:
+    # mark_processed_batch latency with and without a snapshot running (default
+    # pacing), plus full and incremental snapshot cost.
+    results = {}
+    for rows in rows_list:
+        db_path = data_dir / f"micro-dedup-{rows}.db"
+        store = DedupStore(db_path=str(db_path))
+        await store.initialize()
+        populate(db_path, rows, seed)
+        snapshot_dir = data_dir / f"micro-snapshots-{rows}"
+        run_id = f"{time.time_ns()}"
+
+        batch_iterations = max(1, iterations // BATCH_SIZE)
+        batches = [record_batch(f"snap-{run_id}", i) for i in range(batch_iterations + 1)]
+
+        async def mark_processed_batch(i: int):
+            await store.mark_processed_batch(batches[i])
+
+        idle = per_event(await measure_async(mark_processed_batch, batch_iterations, 1))
+
+        snapshotter = Snapshotter(str(db_path), str(snapshot_dir))
+        full = await snapshotter.run(incremental=False)
+
+        # Keep ingesting for as long as an incremental snapshot takes.
+        snapshotter.start(incremental=True)
+        latencies = []
+        i = batch_iterations + 1
+        while snapshotter.running:
+            batch = record_batch(f"snap-{run_id}", i)
+            t0 = time.perf_counter_ns()
+            await store.mark_processed_batch(batch)
+            latencies.append(time.perf_counter_ns() - t0)
+            i += 1
+        await snapshotter.stop()
+        results[str(rows)] = {
+            "mark_processed_batch_idle": idle,
+            "mark_processed_batch_during_snapshot": {
+                "ops": len(latencies),
+                "latency_us": summarize(latencies, scale=1e-3),
+            },
+            "full": full,
+            "incremental": snapshotter.last,
+        }
+        await store.close()
+    return results
+
+
+def events_legacy(topic: str, rows: List[Any]) -> bytes:
+    # What /events did before rows went straight to bytes: Event models, then
+    # FastAPI's response_model pass (dump, re-validate, dump to JSON types) and
+    # JSONResponse rendering.
+    response = EventsResponse(
+        topic=topic,
+        count=len(rows),
+        events=[
+            Event(topic=topic, event_id=e, timestamp=t, source=s, payload={"processed_at": p})
+            for e, t, s, p in rows
+        ],
+    )
+    content = EventsResponse.model_validate(response.model_dump()).model_dump(mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def events_direct(topic: str, rows: List[Any]) -> bytes:
+    return codec.dumps({
+        "topic": topic,
+        "count": len(rows),
+        "events": [
+            {"topic": topic, "event_id": e, "timestamp": t, "source": s, "payload": {"processed_at": p}}
+            for e, t, s, p in rows
+        ],
+    })
+
+
+async def bench_responses(data_dir: Path, iterations: int, warmup: int, seed: int, limit: int = 1000) -> Dict[str, Any]:
+    # GET /events?limit=1000: serialization alone (old model path vs. direct),
+    # then the whole request through the ASGI app with the response cache off.
+    import httpx
+    from src import main
+
+    db_path = data_dir / "micro-responses.db"
+    store = DedupStore(db_path=str(db_path))
+    await store.initialize()
+    await store.close()
+    populate(db_path, max(limit * 16, 20000), seed)
+
+    store = DedupStore(db_path=str(db_path))
+    await store.initialize()
+    rows = await store.get_events_by_topic("micro.topic-0", limit)
+    await store.close()
+    body = events_direct("micro.topic-0", rows)
+
+    iterations = max(1, iterations // 10)
+    results: Dict[str, Any] = {
+        "rows": len(rows),
+        "body_bytes": {
+            "identity": len(body),
+            "gzip": len(encode_body(body, "gzip")[0]),
+        },
+        "serialize": {
+            "legacy": measure_sync(lambda i: events_legacy("micro.topic-0", rows), iterations, warmup // 10),
+            "direct": measure_sync(lambda i: events_direct("micro.topic-0", rows), iterations, warmup // 10),
+            "direct_gzip": measure_sync(
+                lambda i: encode_body(events_direct("micro.topic-0", rows), "gzip"), iterations, warmup // 10
+            ),
+        },
+    }
+
+    os.environ["DATABASE_PATH"] = str(db_path)
+    os.environ["RESPONSE_CACHE_ENTRIES"] = "0"
+    try:
+        async with main.app.router.lifespan_context(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://micro") as client:
+                url = f"/events?topic=micro.topic-0&limit={limit}"
+
+                async def identity(i: int):
+                    (await client.get(url, headers={"Accept-Encoding": "identity"})).raise_for_status()
+
+                async def gzipped(i: int):
+                    (await client.get(url, headers={"Accept-Encoding": "gzip"})).raise_for_status()
+
+                results["request"] = {
+                    "identity": await measure_async(identity, iterations, warmup // 10),
+                    "gzip": await measure_async(gzipped, iterations, warmup // 10),
+                }
+    finally:
+        os.environ.pop("RESPONSE_CACHE_ENTRIES", None)
+    return results
+
+
+def per_event(item: Dict[str, Any], batch_size: Optional[int] = None) -> Dict[str, Any]:
+    # One measured op moves a whole batch; report the per-event rate alongside.
+    item["batch_size"] = batch_size or BATCH_SIZE
+    item["events_per_s"] = item["ops_per_s"] * item["batch_size"]
+    return item
+
+
+def make_events(count: int, payload_bytes: int, seed: int) -> List[Event]:
+    rng = random.Random(seed)
+    return [
+        Event(
+            topic=f"micro.topic-{rng.randrange(16)}",
+            event_id=f"evt-{i}",
+            timestamp=TIMESTAMP,
+            source="micro",
+            payload={"data": "x" * payload_bytes},
+        )
+        for i in range(count)
+    ]
+
+
+def make_records(count: int, payload_bytes: int, seed: int) -> List[EventRecord]:
+    # The queue carries EventRecords, converted once at /publish.
+    return [EventRecord.from_event(event) for event in make_events(count, payload_bytes, seed)]
+
+
+async def bench_queue(iterations: int, warmup: int, seed: int, batch_size: int = BATCH_SIZE) -> Dict[str, Any]:
+    return {
+        mode: await bench_queue_mode(mode, iterations, warmup, seed, batch_size)
+        for mode in EventQueue.MODES
+    }
+
+
+async def bench_queue_mode(mode: str, iterations: int, warmup: int, seed: int, batch_size: int) -> Dict[str, Any]:
+    events = make_records(batch_size, 64, seed)
+    queue = EventQueue(maxsize=2 * (iterations + warmup) * batch_size, mode=mode)
+
+    async def enqueue_batch(i: int):
+        await queue.enqueue_batch(events)
+
+    async def dequeue(i: int):
+        for _ in range(batch_size):
+            await queue.dequeue()
+
+    async def dequeue_batch(i: int):
+        await queue.dequeue_batch(batch_size, max_wait=0)
+
+    enqueue = await measure_async(enqueue_batch, 2 * iterations, 2 * warmup)
+    return {
+        "enqueue_batch": per_event(enqueue, batch_size),
+        "dequeue": per_event(await measure_async(dequeue, iterations, warmup), batch_size),
+        "dequeue_batch": per_event(await measure_async(dequeue_batch, iterations, warmup), batch_size),
+    }
+
+
+def bench_models(iterations: int, warmup: int, seed: int) -> Dict[str, Any]:
+    results = {}
+    for size in PAYLOAD_SIZES:
+        raw = make_events(1, size, seed)[0]
+        as_dict = raw.model_dump()
+        as_json = raw.model_dump_json().encode()
+
+        results[str(size)] = {
+            "validate_dict": measure_sync(lambda i: Event(**as_dict), iterations, warmup),
+            "validate_json": measure_sync(lambda i: Event.model_validate_json(as_json), iterations, warmup),
+        }
+    return results
+
+
+def bench_fingerprint(iterations: int, warmup: int, seed: int) -> Dict[str, Any]:
+    # Per-event cost of content fingerprints at /publish: canonical (sorted-key)
+    # payload serialization replaces the plain one, plus hashing in batches.
+    results = {}
+    for size in PAYLOAD_SIZES:
+        events = make_events(BATCH_SIZE, size, seed)
+        records = [EventRecord.from_event(event, canonical=True) for event in events]
+        results[str(size)] = {
+            "serialize": per_event(measure_sync(
+                lambda i: [EventRecord.from_event(event) for event in events], iterations, warmup
+            )),
+            "serialize_canonical": per_event(measure_sync(
+                lambda i: [EventRecord.from_event(event, canonical=True) for event in events], iterations, warmup
+            )),
+            "hash": per_event(measure_sync(lambda i: fingerprint_batch(records), iterations, warmup)),
+        }
+    return results
+
+
+def retained_bytes(build: Callable[[], List[Any]]) -> float:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        items = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (after - before) / len(items)
+
+
+def bench_queued_memory(seed: int, count: int = 10000) -> Dict[str, Any]:
+    # Bytes kept alive per queued event, parsing each one from its own JSON body
+    # the way /publish receives it (so payload strings are not shared).
+    results = {}
+    for size in PAYLOAD_SIZES[:3]:
+        bodies = [e.model_dump_json().encode() for e in make_events(count, size, seed)]
+        results[str(size)] = {
+            "event": retained_bytes(lambda: [Event.model_validate_json(b) for b in bodies]),
+            "record": retained_bytes(
+                lambda: [EventRecord.from_event(Event.model_validate_json(b)) for b in bodies]
+            ),
+        }
+    return results
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    suites = set(args.suite.split(","))
+    rows_list = [int(r) for r in args.rows.split(",") if r]
+    random.seed(args.seed)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(args.data_dir) if args.data_dir else Path(tmp)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        if "dedup" in suites:
+            results["dedup"] = await bench_dedup(rows_list, data_dir, args.iterations, args.warmup, args.seed)
+        if "startup" in suites:
+            results["startup"] = await bench_startup(rows_list, data_dir, args.seed)
+        if "search" in suites:
+            results["search"] = await bench_search(rows_list, data_dir, args.iterations, args.warmup, args.seed)
+        if "snapshot" in suites:
+            results["snapshot"] = await bench_snapshot(rows_list, data_dir, args.iterations, args.seed)
+        if "responses" in suites:
+            results["responses"] = await bench_responses(data_dir, args.iterations, args.warmup, args.seed)
+        if "cold_keys" in suites:
+            results["cold_keys"] = await bench_cold_keys(rows_list, data_dir, args.iterations, args.warmup, args.seed)
+    if "queue" in suites:
+        results["queue"] = await bench_queue(args.iterations, args.warmup, args.seed)
+    if "models" in suites:
+        results["models"] = bench_models(args.iterations, args.warmup, args.seed)
+        results["queued_bytes_per_event"] = bench_queued_memory(args.seed)
+    if "fingerprint" in suites:
+        results["fingerprint"] = bench_fingerprint(args.iterations, args.warmup, args.seed)
+    return results
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for DedupStore, EventQueue, Event validation and search")
+    parser.add_argument("--suite", default="dedup,queue,models", help="Comma-separated subset of dedup,queue,models,search,startup,snapshot,fingerprint,responses,cold_keys")
+    parser.add_argument("--rows", default=DEFAULT_ROWS, help="Pre-existing dedup rows to benchmark against")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", help="Keep populated databases here and reuse them across runs")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON report to diff against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change counted as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    results = asyncio.run(run(args))
+
+    report = {
+        "benchmark": "micro",
+        "config": {
+            "suite": args.suite,
+            "rows": args.rows,
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "seed": args.seed,
+        },
+        "environment": environment(),
+        "results": results,
+    }
+
+    regressed = False
+    if args.compare:
+        baseline = load_report(args.compare)
+        report["comparison"] = compare(
+            results, baseline["results"],
+            higher_is_better=HIGHER_IS_BETTER, threshold=args.threshold
+        )
+        regressed = any(d["regression"] for d in report["comparison"].values())
+
+    write_report(report, args.output)
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
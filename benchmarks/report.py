@@ -0,0 +1,124 @@
+import json
+import math
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+PERCENTILES = (50.0, 90.0, 95.0, 99.0, 99.9)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(values: Iterable[float], scale: float = 1.0) -> Dict[str, float]:
+    ordered = sorted(v * scale for v in values)
+    if not ordered:
+        return {"count": 0}
+
+    summary = {
+        "count": len(ordered),
+        "min": ordered[0],
+        "mean": sum(ordered) / len(ordered),
+        "max": ordered[-1],
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct:g}"] = percentile(ordered, pct)
+    return summary
+
+
+def correct_coordinated_omission(samples: List[float], expected_interval: float) -> List[float]:
+    # Same back-fill HdrHistogram's recordValueWithExpectedInterval applies: a
+    # sample that stalled the sender for k intervals hides k requests that would
+    # have been issued meanwhile, each waiting a little less than the stall.
+    if expected_interval <= 0:
+        return list(samples)
+
+    corrected = []
+    for value in samples:
+        corrected.append(value)
+        missing = value - expected_interval
+        while missing >= expected_interval:
+            corrected.append(missing)
+            missing -= expected_interval
+    return corrected
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "git_commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5,
+            cwd=Path(__file__).resolve().parent,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def write_report(report: Dict[str, Any], output: Optional[str]):
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if output:
+        Path(output).write_text(text + "\n")
+    else:
+        print(text)
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text())
+
+
+def flatten(data: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    higher_is_better: Iterable[str] = (),
+    threshold: float = 0.10,
+) -> Dict[str, Dict[str, Any]]:
+    # Metric names ending in any of `higher_is_better` (throughput, ops/s) regress
+    # when they drop; everything else is a latency or cost and regresses when it rises.
+    better_up = tuple(higher_is_better)
+    cur = flatten(current)
+    base = flatten(baseline)
+
+    deltas = {}
+    for name in sorted(cur.keys() & base.keys()):
+        if name.endswith("count"):
+            continue
+        before, after = base[name], cur[name]
+        if before == 0:
+            continue
+        change = (after - before) / before
+        worse = -change if name.endswith(better_up) else change
+        deltas[name] = {
+            "baseline": before,
+            "current": after,
+            "change": change,
+            "regression": worse > threshold,
+        }
+    return deltas
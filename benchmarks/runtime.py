@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import itertools
+import sys
+import tempfile
+from dataclasses import asdict, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.cluster import LocalNode
+from benchmarks.load import SCENARIOS, run_live
+from benchmarks.report import environment, write_report
+
+
+def combinations(args: argparse.Namespace) -> List[Dict[str, str]]:
+    # Every loop x parser x access log x limit_concurrency in the lists given.
+    keys = ("RUNTIME_LOOP", "RUNTIME_HTTP", "RUNTIME_ACCESS_LOG", "RUNTIME_LIMIT_CONCURRENCY")
+    values = (args.loops.split(","), args.http.split(","), args.access_log.split(","), args.limit_concurrency.split(","))
+    return [dict(zip(keys, combo)) for combo in itertools.product(*values)]
+
+
+async def run(args: argparse.Namespace, data_dir: Path) -> Dict[str, Any]:
+    # One fresh server process per combination, each driven by the same
+    # publish-heavy load scenario over real sockets.
+    scenario = replace(
+        SCENARIOS[args.scenario],
+        total_events=args.events,
+        concurrency=args.concurrency,
+        drain_timeout=args.timeout,
+    )
+    runs = []
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        for i, env in enumerate(combinations(args)):
+            node = LocalNode(args.base_port + i, data_dir, env=dict(env))
+            node.start()
+            try:
+                await node.wait_ready(client)
+                health = (await client.get(f"{node.url}/health")).json()
+                outcome = await run_live(scenario, node.url)
+            finally:
+                node.stop()
+            runs.append({
+                "settings": env,
+                "runtime": health["runtime"],
+                "throughput_events_per_s": outcome["throughput_events_per_s"],
+                "latency_ms": outcome["latency_ms"]["service"],
+                "errors": outcome["errors"],
+                "time_to_processed_s": outcome["time_to_processed_s"],
+            })
+    best = max((r for r in runs if not r["errors"]), key=lambda r: r["throughput_events_per_s"], default=None)
+    return {"scenario": asdict(scenario), "runs": runs, "best": best["settings"] if best else None}
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Server runtime settings (event loop, HTTP parser, ...) under publish load")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="single-event")
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--loops", default="asyncio,uvloop")
+    parser.add_argument("--http", default="h11,httptools")
+    parser.add_argument("--access-log", default="true,false")
+    parser.add_argument("--limit-concurrency", default="0", help="Comma-separated values, 0 = unlimited")
+    parser.add_argument("--base-port", type=int, default=18280)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait for processing")
+    parser.add_argument("--data-dir", help="Keep node databases and logs here")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(args.data_dir) if args.data_dir else Path(tmp)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        results = asyncio.run(run(args, data_dir))
+
+    write_report({
+        "benchmark": "runtime",
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "data_dir")},
+        "environment": environment(),
+        "results": results,
+    }, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+import importlib.util
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Sequence
+
+# numpy, optional: /analytics answers 503 without it. Imported on first use,
+# keeping it out of the service's start.
+np: Any = None
+
+# Rows fetched and folded in per step; memory is this plus the result arrays.
+CHUNK_ROWS = 100000
+# Upper limit on rate buckets times sources in one answer.
+MAX_CELLS = 1000000
+# Inter-arrival histogram: 0 ms, then 1 ms .. ~115 days in steps of 10^(1/50)
+# (4.7%), which bounds the error of the reported percentiles. Set with np.
+GAP_EDGES_MS: Any = None
+
+# Event timestamps as int64 epoch milliseconds, parsed by SQLite (it accepts
+# the Z and +HH:MM suffixes /publish lets through); unparseable ones are NULL.
+EPOCH_MS = "CAST(ROUND((julianday(timestamp) - 2440587.5) * 86400000) AS INTEGER)"
+
+
+def available() -> bool:
+    return importlib.util.find_spec("numpy") is not None
+
+
+def _import_numpy():
+    global np, GAP_EDGES_MS
+    if np is None:
+        import numpy
+        GAP_EDGES_MS = numpy.concatenate(([0.0], numpy.logspace(0, 10, 501)))
+        np = numpy
+
+
+def to_epoch_ms(value: datetime) -> int:
+    # Naive datetimes are UTC, as everywhere in the service.
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def from_epoch_ms(value: int) -> str:
+    return datetime.fromtimestamp(value / 1000, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class EventRateAnalysis:
+    # Streaming aggregate over (epoch ms, source) chunks arriving in time order:
+    # events per interval bucket, optionally per source, and the distribution
+    # of gaps between consecutive events. Every step is a whole-chunk numpy
+    # operation and the state is fixed-size (bucket counts, gap histogram,
+    # one row per source), whatever the number of events.
+    
+    def __init__(self, start_ms: int, end_ms: int, interval_ms: int, by_source: bool = False):
+        _import_numpy()
+        self.start_ms = start_ms
+        self.interval_ms = interval_ms
+        self.buckets = max(1, -(-(end_ms - start_ms) // interval_ms))
+        self.by_source = by_source
+        self.counts = np.zeros(self.buckets, dtype=np.int64)
+        # Source name -> row of source_counts, in order of first appearance.
+        self.source_ids: Dict[str, int] = {}
+        self.source_counts = np.zeros((0, self.buckets), dtype=np.int64)
+        self.gap_counts = np.zeros(len(GAP_EDGES_MS), dtype=np.int64)
+        self.events = 0
+        self.gaps = 0
+        self.gap_sum = 0
+        self.gap_min: Optional[int] = None
+        self.gap_max: Optional[int] = None
+        self._last: Optional[int] = None
+    
+    def add(self, timestamps: Any, sources: Optional[Sequence[str]] = None):
+        if not len(timestamps):
+            return
+        bucket = (timestamps - self.start_ms) // self.interval_ms
+        self.counts += np.bincount(bucket, minlength=self.buckets)
+        self.events += len(timestamps)
+        
+        if self.by_source:
+            # Ids by dict lookup: sorting Python strings (np.unique) costs ten
+            # times more than the rest of the chunk.
+            ids = self.source_ids
+            index = np.fromiter((ids.setdefault(s, len(ids)) for s in sources), dtype=np.int64, count=len(sources))
+            if len(ids) * self.buckets > MAX_CELLS:
+                raise ValueError(
+                    f"Too many sources x buckets (limit {MAX_CELLS}); use a longer interval or a shorter range"
+                )
+            if len(ids) > len(self.source_counts):
+                grown = np.zeros((len(ids), self.buckets), dtype=np.int64)
+                grown[:len(self.source_counts)] = self.source_counts
+                self.source_counts = grown
+            # One bincount for every (source, bucket) pair of the chunk.
+            cells = np.bincount(index * self.buckets + bucket, minlength=len(ids) * self.buckets)
+            self.source_counts += cells.reshape(len(ids), self.buckets)
+        
+        # Gaps inside the chunk plus the one from the previous chunk's last event.
+        if self._last is not None:
+            gaps = np.diff(timestamps, prepend=self._last)
+        else:
+            gaps = np.diff(timestamps)
+        self._last = int(timestamps[-1])
+        if len(gaps):
+            bins = np.searchsorted(GAP_EDGES_MS, gaps, side="right") - 1
+            self.gap_counts += np.bincount(bins, minlength=len(GAP_EDGES_MS))
+            self.gaps += len(gaps)
+            self.gap_sum += int(gaps.sum())
+            low, high = int(gaps.min()), int(gaps.max())
+            self.gap_min = low if self.gap_min is None else min(self.gap_min, low)
+            self.gap_max = high if self.gap_max is None else max(self.gap_max, high)
+    
+    def gap_percentile(self, q: float) -> Optional[float]:
+        # Interpolated inside the histogram bucket holding the rank, clamped to
+        # the exact min/max.
+        if not self.gaps:
+            return None
+        rank = q / 100 * (self.gaps - 1)
+        cumulative = np.cumsum(self.gap_counts)
+        i = int(np.searchsorted(cumulative, rank, side="right"))
+        below = int(cumulative[i - 1]) if i else 0
+        low = GAP_EDGES_MS[i]
+        high = GAP_EDGES_MS[i + 1] if i + 1 < len(GAP_EDGES_MS) else self.gap_max
+        value = low + (high - low) * (rank - below + 0.5) / self.gap_counts[i]
+        return round(float(min(max(value, self.gap_min), self.gap_max)), 3)
+    
+    def result(self, percentiles: Sequence[float]) -> Dict[str, Any]:
+        starts = self.start_ms + np.arange(self.buckets, dtype=np.int64) * self.interval_ms
+        result: Dict[str, Any] = {
+            'events': self.events,
+            'interval_s': self.interval_ms / 1000,
+            'buckets': [from_epoch_ms(int(start)) for start in starts],
+            'counts': self.counts.tolist(),
+            'rate_per_s': {
+                'mean': round(self.events / (self.buckets * self.interval_ms / 1000), 6),
+                'max': round(int(self.counts.max()) / (self.interval_ms / 1000), 6),
+            },
+            'inter_arrival_ms': {
+                'count': self.gaps,
+                'mean': round(self.gap_sum / self.gaps, 3) if self.gaps else None,
+                'min': self.gap_min,
+                'max': self.gap_max,
+                **{f"p{q:g}": self.gap_percentile(q) for q in percentiles},
+            },
+        }
+        if self.by_source:
+            result['by_source'] = {
+                name: self.source_counts[i].tolist() for name, i in sorted(self.source_ids.items())
+            }
+        return result
+
+
+def analyze(
+    db_path: str,
+    topic: str,
+    start: datetime,
+    end: datetime,
+    interval_s: float,
+    by_source: bool = False,
+    percentiles: Sequence[float] = (50, 95, 99),
+    chunk: int = CHUNK_ROWS
+) -> Dict[str, Any]:
+    # Blocking; run it in a worker thread. Its own read-only connection streams
+    # the topic's rows in timestamp order (SQLite sorts, spilling to disk for a
+    # large range), CHUNK_ROWS at a time, into EventRateAnalysis.
+    start_ms, end_ms = to_epoch_ms(start), to_epoch_ms(end)
+    interval_ms = int(interval_s * 1000)
+    if interval_ms <= 0 or end_ms <= start_ms:
+        raise ValueError("interval and range must be positive")
+    if -(-(end_ms - start_ms) // interval_ms) > MAX_CELLS:
+        raise ValueError(f"Too many buckets (limit {MAX_CELLS}); use a longer interval or a shorter range")
+    
+    analysis = EventRateAnalysis(start_ms, end_ms, interval_ms, by_source)
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(
+            f"""
+            SELECT ts, source FROM (
+                SELECT {EPOCH_MS} AS ts, source FROM processed_events WHERE topic GLOB ?
+            )
+            WHERE ts >= ? AND ts < ?
+            ORDER BY ts
+            """,
+            (topic, start_ms, end_ms)
+        )
+        while True:
+            rows = cursor.fetchmany(chunk)
+            if not rows:
+                break
+            timestamps = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            analysis.add(timestamps, [row[1] for row in rows] if by_source else None)
+    finally:
+        conn.close()
+    
+    return {
+        'topic': topic,
+        'since': from_epoch_ms(start_ms),
+        'until': from_epoch_ms(end_ms),
+        **analysis.result(percentiles),
+    }
@@ -0,0 +1,271 @@
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from typing import IO, Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pydantic import ValidationError
+
+from src import codec
+from src.dedup_store import DedupStore
+from src.fingerprint import FingerprintIndex
+from src.models import Event, EventRecord
+from src.replication import ChangeLog
+from src.rollups import RollupStore
+from src.search import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+# Saved offset of each file, in store_state under this prefix + absolute path.
+STATE_PREFIX = "bulk_import:"
+# Invalid lines reported per chunk.
+MAX_ERRORS = 5
+
+# (topic, event_id, timestamp, source, payload, fingerprint or None)
+Row = Tuple[str, str, str, str, bytes, Optional[bytes]]
+
+_fingerprints: Optional[FingerprintIndex] = None
+
+
+def _init_worker(fingerprint_topics: Sequence[str]):
+    global _fingerprints
+    _fingerprints = FingerprintIndex(fingerprint_topics) if fingerprint_topics else None
+
+
+def parse_chunk(lines: List[bytes], first_line: int) -> Tuple[List[Row], int, List[str]]:
+    # Runs in a pool worker: JSON decode, the same validation as /publish and
+    # the same payload bytes and fingerprint a published event gets. Returns
+    # plain tuples, which pickle much faster than records.
+    records = []
+    invalid = 0
+    errors = []
+    for number, line in enumerate(lines, first_line):
+        if not line.strip():
+            continue
+        try:
+            event = Event(**codec.loads(line))
+        except (ValueError, TypeError, ValidationError) as e:
+            invalid += 1
+            if len(errors) < MAX_ERRORS:
+                errors.append(f"line {number}: {str(e).splitlines()[0]}")
+            continue
+        canonical = _fingerprints is not None and _fingerprints.applies(event.topic)
+        records.append(EventRecord.from_event(event, canonical=canonical))
+    
+    if _fingerprints is not None:
+        _fingerprints.stamp(records)
+    rows = [(r.topic, r.event_id, r.timestamp, r.source, r.payload, r.fingerprint) for r in records]
+    return rows, invalid, errors
+
+
+def open_archive(path: Path) -> IO[bytes]:
+    # gzip by magic number, whatever the file is called.
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    return gzip.open(path, "rb") if magic == b"\x1f\x8b" else open(path, "rb")
+
+
+def read_chunks(f: IO[bytes], chunk_lines: int) -> Iterator[Tuple[List[bytes], int]]:
+    # (lines, offset after them). Offsets are positions in the decompressed
+    # stream, so seek() resumes after the last committed chunk; for gzip that
+    # seek decompresses up to the offset, without parsing anything.
+    lines = []
+    for line in f:
+        lines.append(line)
+        if len(lines) >= chunk_lines:
+            yield lines, f.tell()
+            lines = []
+    if lines:
+        yield lines, f.tell()
+
+
+def build_store(db_path: str) -> Tuple[DedupStore, Optional[FingerprintIndex]]:
+    # The writers the service registers, from the same environment, so imported
+    # events are indexed and rolled up exactly as consumed ones. Dedup windows
+    # only keep keys in memory; the service loads them at its next start.
+    store = DedupStore(db_path=db_path)
+    store.add_writer(SearchIndex(
+        topics=os.getenv("SEARCH_TOPICS", "*"),
+        fields=[f for f in os.getenv("SEARCH_FIELDS", "").split(",") if f.strip()],
+    ))
+    store.add_writer(RollupStore(
+        minute_retention=timedelta(hours=float(os.getenv("ROLLUP_MINUTE_RETENTION_HOURS", "48")))
+    ))
+    store.add_writer(ChangeLog(
+        store,
+        enabled=bool(os.getenv("REPLICATION_ROLE", "")),
+        retain=int(os.getenv("REPLICATION_RETAIN", "1000000")),
+    ))
+    fingerprints = None
+    topics = [t.strip() for t in os.getenv("DEDUP_FINGERPRINT_TOPICS", "").split(",") if t.strip()]
+    if topics:
+        fingerprints = FingerprintIndex(topics)
+        store.add_writer(fingerprints)
+        store.set_fingerprints(fingerprints)
+    return store, fingerprints
+
+
+class BulkImporter:
+    # Archives straight into the dedup store, for backfills that would take
+    # days through POST /publish. The reader stays up to `workers * 2` chunks
+    # ahead of the writer; chunks are committed in file order, one
+    # transaction each through mark_processed_batch, so the first occurrence of
+    # a key (or of a fingerprint) wins exactly as it does for the consumer. The
+    # file offset is saved in the same transaction: a rerun after a crash
+    # resumes after the last committed chunk, and anything re-read is a
+    # duplicate anyway. Events are marked processed without running the
+    # consumer's handler.
+    
+    def __init__(
+        self,
+        store: DedupStore,
+        fingerprint_topics: Sequence[str] = (),
+        workers: int = 0,
+        chunk_lines: int = 50000
+    ):
+        self.store = store
+        self.fingerprint_topics = list(fingerprint_topics)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_lines = chunk_lines
+    
+    async def import_file(self, path: Path, pool: ProcessPoolExecutor, resume: bool = True) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        state = STATE_PREFIX + str(path.resolve())
+        offset = await self.store.get_state(state) if resume else 0
+        report = {'file': str(path), 'resumed_at': offset, 'lines': 0, 'imported': 0, 'duplicates': 0, 'invalid': 0}
+        started = time.monotonic()
+        
+        with open_archive(path) as f:
+            if offset:
+                f.seek(offset)
+            pending: Deque[Tuple[asyncio.Future, int, int]] = deque()
+            chunks = read_chunks(f, self.chunk_lines)
+            first_line = 1
+            while True:
+                # Keep the pool busy while the oldest chunk is written.
+                while len(pending) < self.workers * 2:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    lines, end = chunk
+                    future = loop.run_in_executor(pool, parse_chunk, lines, first_line)
+                    pending.append((future, end, len(lines)))
+                    first_line += len(lines)
+                if not pending:
+                    break
+                
+                future, end, count = pending.popleft()
+                rows, invalid, errors = await future
+                records = []
+                for topic, event_id, timestamp, source, payload, fingerprint in rows:
+                    record = EventRecord(topic, event_id, timestamp, source, payload)
+                    record.fingerprint = fingerprint
+                    records.append(record)
+                flags = await self.store.mark_processed_batch(records, state={state: end})
+                
+                imported = sum(flags)
+                report['lines'] += count
+                report['imported'] += imported
+                report['duplicates'] += len(flags) - imported
+                report['invalid'] += invalid
+                for error in errors:
+                    # Line numbers count from the resume offset.
+                    logger.warning(f"{path}: skipped {error}")
+                elapsed = time.monotonic() - started
+                logger.info(
+                    f"{path}: offset={end} lines={report['lines']} imported={report['imported']} "
+                    f"({report['lines'] / elapsed:.0f} lines/s)"
+                )
+        
+        elapsed = time.monotonic() - started
+        report['duration_s'] = round(elapsed, 3)
+        report['events_per_s'] = round(report['lines'] / elapsed, 1) if elapsed else None
+        return report
+    
+    async def run(self, paths: Sequence[Path], resume: bool = True, defer_indexes: bool = True) -> Dict[str, Any]:
+        started = time.monotonic()
+        files = []
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.fingerprint_topics,)
+        ) as pool:
+            indexes = await self.store.drop_secondary_indexes() if defer_indexes else []
+            try:
+                for path in paths:
+                    files.append(await self.import_file(path, pool, resume))
+            finally:
+                if indexes:
+                    built = time.monotonic()
+                    await self.store.restore_indexes(indexes)
+                    logger.info(f"Rebuilt {len(indexes)} indexes in {time.monotonic() - built:.1f}s")
+        
+        elapsed = time.monotonic() - started
+        lines = sum(f['lines'] for f in files)
+        return {
+            'files': files,
+            'lines': lines,
+            'imported': sum(f['imported'] for f in files),
+            'duplicates': sum(f['duplicates'] for f in files),
+            'invalid': sum(f['invalid'] for f in files),
+            'workers': self.workers,
+            'deferred_indexes': len(indexes),
+            'duration_s': round(elapsed, 3),
+            'events_per_s': round(lines / elapsed, 1) if elapsed else None,
+        }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Import NDJSON event archives (optionally gzip) into the dedup store. "
+                    "Run while the service is stopped."
+    )
+    parser.add_argument("files", nargs="+", type=Path)
+    parser.add_argument("--database", default=os.getenv("DATABASE_PATH", "data/dedup.db"))
+    parser.add_argument("--workers", type=int, default=0, help="Parser processes, 0 = one per CPU")
+    parser.add_argument("--chunk-lines", type=int, default=50000, help="Lines per transaction")
+    parser.add_argument("--restart", action="store_true", help="Ignore saved offsets and read files from the start")
+    parser.add_argument("--keep-indexes", action="store_true",
+                        help="Update secondary indexes row by row instead of rebuilding them at the end "
+                             "(cheaper when the import is small next to the database)")
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    store, fingerprints = build_store(args.database)
+    await store.initialize()
+    try:
+        importer = BulkImporter(
+            store,
+            fingerprint_topics=list(fingerprints.rules.rules) if fingerprints is not None else [],
+            workers=args.workers,
+            chunk_lines=args.chunk_lines,
+        )
+        report = await importer.run(args.files, resume=not args.restart, defer_indexes=not args.keep_indexes)
+        await store.checkpoint()
+        return report
+    finally:
+        await store.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
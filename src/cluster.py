@@ -0,0 +1,162 @@
+import asyncio
+import bisect
+import hashlib
+import hmac
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import httpx
+from src import codec
+
+logger = logging.getLogger(__name__)
+
+# Set on requests between nodes: the receiver handles them locally and never
+# forwards or fans out again.
+FORWARDED_HEADER = "X-Cluster-Forwarded"
+# Shared secret (CLUSTER_SECRET) sent with it, so clients cannot claim to be
+# a peer and skip the checks done where a request enters the cluster.
+SECRET_HEADER = "X-Cluster-Secret"
+
+
+def key_hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    # Consistent hashing with virtual nodes: each node owns the arcs ending at
+    # its vnode points, so adding or removing a node moves only ~1/N of the
+    # keys, all of them to or from that node.
+    
+    def __init__(self, nodes: Sequence[str], vnodes: int = 128):
+        if not nodes:
+            raise ValueError("HashRing needs at least one node")
+        self.nodes = sorted(set(nodes))
+        self.vnodes = vnodes
+        points = sorted(
+            (key_hash(f"{node}#{i}"), node)
+            for node in self.nodes
+            for i in range(vnodes)
+        )
+        self._points = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+    
+    def owner(self, topic: str, event_id: str) -> str:
+        index = bisect.bisect(self._points, key_hash(f"{topic}\x00{event_id}"))
+        return self._owners[index % len(self._owners)]
+    
+    def partition(self, keyed: Iterable[Tuple[str, str, Any]]) -> Dict[str, List[Any]]:
+        # (topic, event_id, item) -> {owner: [item, ...]}, input order kept per owner.
+        parts: Dict[str, List[Any]] = {}
+        for topic, event_id, item in keyed:
+            parts.setdefault(self.owner(topic, event_id), []).append(item)
+        return parts
+
+
+class Cluster:
+
+    def __init__(
+        self,
+        self_url: str,
+        nodes: Sequence[str],
+        vnodes: int = 128,
+        secret: str = "",
+        timeout: float = 10.0,
+        max_connections: int = 100,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.self_url = self_url.rstrip("/")
+        nodes = [node.rstrip("/") for node in nodes]
+        if self.self_url not in nodes:
+            raise ValueError(f"CLUSTER_SELF {self.self_url} is not in CLUSTER_NODES")
+        self.ring = HashRing(nodes, vnodes)
+        self.secret = secret
+        headers = {FORWARDED_HEADER: self.self_url}
+        if secret:
+            headers[SECRET_HEADER] = secret
+        # One pooled client for all peers: keep-alive connections are reused
+        # per host instead of a TCP (and thread) setup per forwarded batch.
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            headers=headers,
+            transport=transport,
+        )
+        self.stats = {
+            'forwarded_events': 0,
+            'forward_errors': 0,
+        }
+        logger.info(f"Cluster initialized: self={self.self_url}, nodes={self.ring.nodes}")
+    
+    @property
+    def peers(self) -> List[str]:
+        return [node for node in self.ring.nodes if node != self.self_url]
+    
+    def trusts(self, forwarded_from: Optional[str], secret: Optional[str]) -> bool:
+        # Whether a request carrying FORWARDED_HEADER really comes from a peer:
+        # it names one, and carries the shared secret when one is configured.
+        if forwarded_from is None or forwarded_from.rstrip("/") not in self.peers:
+            return False
+        if not self.secret:
+            return True
+        return secret is not None and hmac.compare_digest(secret.encode(), self.secret.encode())
+    
+    def owns(self, topic: str, event_id: str) -> bool:
+        return self.ring.owner(topic, event_id) == self.self_url
+    
+    async def close(self):
+        await self._client.aclose()
+    
+    async def forward(self, node: str, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        response = await self._client.post(
+            f"{node}/publish",
+            content=codec.dumps({"events": events}),
+            headers={"Content-Type": "application/json"},
+        )
+        response.raise_for_status()
+        self.stats['forwarded_events'] += len(events)
+        return response.json()
+    
+    async def forward_all(self, parts: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        # Sub-batches go out concurrently; a failed node is reported, not raised,
+        # so the caller can tell which part of the batch was not accepted.
+        nodes = list(parts)
+        results = await asyncio.gather(
+            *(self.forward(node, parts[node]) for node in nodes),
+            return_exceptions=True
+        )
+        outcome = {}
+        for node, result in zip(nodes, results):
+            if isinstance(result, Exception):
+                self.stats['forward_errors'] += 1
+                logger.error(f"Forwarding {len(parts[node])} events to {node} failed: {result!r}")
+            outcome[node] = result
+        return outcome
+    
+    async def gather(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # GET path on every peer; a peer that fails maps to its exception.
+        peers = self.peers
+        results = await asyncio.gather(
+            *(self._get_json(f"{node}{path}", params) for node in peers),
+            return_exceptions=True
+        )
+        return dict(zip(peers, results))
+    
+    async def _get_json(self, url: str, params: Optional[Dict[str, Any]]) -> Any:
+        response = await self._client.get(url, params=params)
+        response.raise_for_status()
+        return response.json()
+    
+    async def post_json(self, node: str, path: str, body: Any) -> Any:
+        response = await self._client.post(
+            f"{node}{path}",
+            content=codec.dumps(body),
+            headers={"Content-Type": "application/json"},
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'self': self.self_url,
+            'nodes': self.ring.nodes,
+            **self.stats,
+        }
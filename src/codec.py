@@ -0,0 +1,60 @@
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+import json
+import re
+
+# 20+ digits in a row: possibly an integer beyond 64 bits, which orjson would
+# read back as a float.
+_LONG_DIGITS = re.compile(rb"[0-9]{20}")
+_DIGITS = b"0123456789"
+
+
+def _json_dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, sort_keys=sort_keys).encode()
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits, which orjson refuses; json writes them
+            # exactly (and raises like orjson for types neither supports).
+            pass
+    return _json_dumps(obj)
+
+
+def dumps_exact(obj: Any) -> bytes:
+    # orjson hands back its working buffer, which can keep several KB of spare
+    # capacity; copy to an exact-size object before holding it long term.
+    if orjson is not None:
+        try:
+            return memoryview(orjson.dumps(obj)).tobytes()
+        except orjson.JSONEncodeError:
+            pass
+    return _json_dumps(obj)
+
+
+def dumps_canonical(obj: Any) -> bytes:
+    # Sorted keys, so equal payloads give equal bytes whatever the key order they
+    # arrived in (content fingerprints). Exact-size like dumps_exact.
+    if orjson is not None:
+        try:
+            return memoryview(orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)).tobytes()
+        except orjson.JSONEncodeError:
+            pass
+    return _json_dumps(obj, sort_keys=True)
+
+
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        # Counting digits (one C pass) rules out most payloads; only those with
+        # 20 or more pay for the regex.
+        if len(data) - len(data.translate(None, _DIGITS)) < 20 or not _LONG_DIGITS.search(data):
+            return orjson.loads(data)
+    return json.loads(data)
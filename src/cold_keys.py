@@ -0,0 +1,316 @@
+import asyncio
+import hashlib
+import importlib.util
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import aiosqlite
+from src.dedup_store import DedupStore
+from src.models import EventRecord
+
+# numpy, optional: the index is off without it. Imported on first use, since
+# importing it adds ~90 ms to the start of every process, index on or not.
+np: Any = None
+
+logger = logging.getLogger(__name__)
+
+# store_state entry naming the snapshot file this database was last merged into.
+COVERED_STATE = "cold_keys_rowid"
+# Rowid after which load() hashes rows into the delta, when below the snapshot's:
+# processed_events is a plain rowid table, so once its top rows are deleted
+# new rows get rowids the snapshot already claims to cover.
+RESCAN_STATE = "cold_keys_rescan"
+# Old-array elements merged per step, bounding the memory a rebuild takes.
+MERGE_CHUNK = 1 << 22
+
+
+def key_hash(topic: str, event_id: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(f"{topic}\x00{event_id}".encode(), digest_size=8).digest(),
+        "little"
+    )
+
+
+def available() -> bool:
+    return importlib.util.find_spec("numpy") is not None
+
+
+def _import_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+
+def merge_sorted(old: Any, new: Any, out: Any, chunk: int = MERGE_CHUNK):
+    # out = sorted(old + new) for sorted uint64 arrays; new holds no value of
+    # old. old and out may be memory-mapped: old is copied chunk by chunk to its
+    # place in out, so memory is new's size plus one chunk.
+    _import_numpy()
+    inserts = np.searchsorted(old, new)
+    out[inserts + np.arange(len(new))] = new
+    for start in range(0, len(old), chunk):
+        index = np.arange(start, min(start + chunk, len(old)))
+        # Each old element moves right by the number of new ones before it.
+        out[index + np.searchsorted(inserts, index, side="right")] = old[start:start + chunk]
+
+
+class ColdKeyIndex:
+    # Negative dedup lookups without SQLite for the bulk of the keys. 64-bit
+    # hashes of every key up to a rowid live in a sorted uint64 array,
+    # memory-mapped from a .npy snapshot; keys inserted since are hashed into
+    # the in-memory delta. One vectorized searchsorted answers a whole batch:
+    # a key in neither is known to be new and never reaches SQLite, a hit (a
+    # real duplicate, or a key deleted since, or a hash collision) goes on to
+    # SQLite, which stays the record and decides exactly. A DedupStore key index
+    # and writer.
+    #
+    # The delta is folded into a new snapshot every `interval` once it holds
+    # min_delta keys: the old array and the sorted delta are merged into a new
+    # file in a worker thread, swapped in, and the old file removed. The
+    # snapshot's rowid is saved in store_state as well, so a database restored
+    # from elsewhere does not trust a snapshot it does not match.
+    
+    def __init__(
+        self,
+        store: DedupStore,
+        directory: str,
+        interval: float = 3600.0,
+        min_delta: int = 100000,
+        chunk: int = 50000
+    ):
+        self.store = store
+        self.directory = Path(directory)
+        self.interval = interval
+        self.min_delta = min_delta
+        self.chunk = chunk
+        self.loaded = False
+        self.running = False
+        self.array: Any = None
+        self.covered = 0
+        self.delta: Set[int] = set()
+        self.stats = {
+            'lookups': 0,
+            'sqlite_skipped': 0,
+            'builds': 0,
+            'last_build_s': None,
+        }
+        self._db: Optional[aiosqlite.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self._building = False
+        # While a build runs: the rowid it will cover, and the lowest rescan
+        # start flagged by inserts after its delta was frozen.
+        self._freezing: Optional[int] = None
+        self._rescan_after_freeze: Optional[int] = None
+    
+    def _path(self, covered: int) -> Path:
+        return self.directory / f"cold_keys-{covered:020d}.npy"
+    
+    def _contains(self, hashes: List[int]) -> List[bool]:
+        if not len(self.array):
+            return [False] * len(hashes)
+        query = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+        index = np.searchsorted(self.array, query)
+        found = self.array[np.minimum(index, len(self.array) - 1)] == query
+        return found.tolist()
+    
+    def lookup(self, keys: List[Tuple[str, str]]) -> Tuple[Set[Tuple[str, str]], List[Tuple[str, str]]]:
+        # DedupStore key index: never answers "existing", only rules keys out.
+        if not self.loaded:
+            return set(), keys
+        hashes = [key_hash(topic, event_id) for topic, event_id in keys]
+        delta = self.delta
+        rest = [
+            key for key, h, cold in zip(keys, hashes, self._contains(hashes))
+            if cold or h in delta
+        ]
+        self.stats['lookups'] += len(keys)
+        self.stats['sqlite_skipped'] += len(keys) - len(rest)
+        return set(), rest
+    
+    def forget(self, keys: List[Tuple[str, str]]):
+        self.delta.difference_update(key_hash(topic, event_id) for topic, event_id in keys)
+    
+    async def create_schema(self, db: aiosqlite.Connection):
+        self._db = db
+        # Known before load(), so write_batch can flag reused rowids meanwhile.
+        cursor = await db.execute("SELECT value FROM store_state WHERE name = ?", (COVERED_STATE,))
+        row = await cursor.fetchone()
+        self.covered = row[0] if row else 0
+        logger.info(f"ColdKeyIndex initialized in {self.directory}")
+    
+    async def write_batch(self, db: aiosqlite.Connection, records: List[EventRecord], processed_at: str):
+        self.delta.update(key_hash(r.topic, r.event_id) for r in records)
+        await self._check_reuse(db, len(records))
+    
+    async def import_batch(self, db: aiosqlite.Connection, rows: List[Tuple[str, str, str, str, str]]):
+        self.delta.update(key_hash(row[0], row[1]) for row in rows)
+        await self._check_reuse(db, len(rows))
+    
+    async def _check_reuse(self, db: aiosqlite.Connection, count: int):
+        # Inside the insert transaction: the batch took rowids up to MAX(rowid),
+        # each new row the maximum plus one. Rows at or below the snapshot's
+        # rowid are in no snapshot, so the next load() must rescan from below
+        # them. (count may include ignored rows: the rescan starts lower.)
+        bound = max(self.covered, self._freezing or 0)
+        if not bound:
+            return
+        cursor = await db.execute("SELECT MAX(rowid) FROM processed_events")
+        first = ((await cursor.fetchone())[0] or 0) - count + 1
+        if first <= bound:
+            rescan = max(0, first - 1)
+            await db.execute(
+                """
+                INSERT INTO store_state (name, value) VALUES (?, ?)
+                ON CONFLICT (name) DO UPDATE SET value = MIN(value, excluded.value)
+                """,
+                (RESCAN_STATE, rescan)
+            )
+            if self._freezing is not None:
+                self._rescan_after_freeze = min(rescan, self._rescan_after_freeze or rescan)
+    
+    async def prune(self, db: aiosqlite.Connection, cutoff: str):
+        # Deleted keys stay in the array; a hit on one is settled by SQLite.
+        pass
+    
+    async def load(self, progress: Optional[Callable[[int, int], None]] = None):
+        # Warm-up step: map the snapshot this database matches and hash the rows
+        # inserted after it into the delta. Inserts meanwhile land in the delta
+        # through write_batch as well; a set takes them twice harmlessly.
+        _import_numpy()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        covered = await self.store.get_state(COVERED_STATE)
+        path = self._path(covered)
+        if covered and path.exists():
+            self.array = np.load(path, mmap_mode="r")
+        else:
+            if covered:
+                logger.warning(f"Cold key snapshot {path.name} missing, rebuilding from the table")
+            self.array = np.empty(0, dtype=np.uint64)
+            covered = 0
+        self.covered = covered
+        
+        cursor = await self._db.execute("SELECT MAX(rowid) FROM processed_events")
+        head = (await cursor.fetchone())[0] or 0
+        after = min(covered, await self.store.get_state(RESCAN_STATE, covered))
+        start = after
+        while True:
+            cursor = await self._db.execute(
+                "SELECT rowid, topic, event_id FROM processed_events WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (after, self.chunk)
+            )
+            rows = await cursor.fetchall()
+            self.delta.update(key_hash(topic, event_id) for _, topic, event_id in rows)
+            if len(rows) < self.chunk:
+                break
+            after = rows[-1][0]
+            if progress is not None:
+                progress(after - start, head - start)
+        self.loaded = True
+        logger.info(f"ColdKeyIndex loaded: {len(self.array)} cold keys, {len(self.delta)} in delta")
+    
+    async def start(self):
+        self.running = True
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        while self.running:
+            await asyncio.sleep(self.interval)
+            try:
+                if self.loaded and len(self.delta) >= self.min_delta:
+                    await self.build()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cold key snapshot build failed: {e}", exc_info=True)
+    
+    async def build(self) -> int:
+        # Folds the current delta into a new snapshot; returns its size.
+        if self._building:
+            return len(self.array)
+        self._building = True
+        try:
+            started = time.monotonic()
+            # Inserts hold the store lock while writing the delta, so under it
+            # the delta and MAX(rowid) describe the same rows.
+            async with self.store.transaction() as db:
+                cursor = await db.execute("SELECT MAX(rowid) FROM processed_events")
+                covered = (await cursor.fetchone())[0] or 0
+                frozen = set(self.delta)
+                self._freezing = covered
+            
+            path = await asyncio.to_thread(self._write, frozen, covered)
+            async with self.store.transaction() as db:
+                await db.execute(
+                    "INSERT OR REPLACE INTO store_state (name, value) VALUES (?, ?)",
+                    (COVERED_STATE, covered)
+                )
+                # Rows reusing rowids before the freeze are in the new snapshot;
+                # only those inserted since still need a rescan.
+                if self._rescan_after_freeze is None:
+                    await db.execute("DELETE FROM store_state WHERE name = ?", (RESCAN_STATE,))
+                else:
+                    await db.execute(
+                        "INSERT OR REPLACE INTO store_state (name, value) VALUES (?, ?)",
+                        (RESCAN_STATE, self._rescan_after_freeze)
+                    )
+            
+            old = self._path(self.covered)
+            self.array = np.load(path, mmap_mode="r")
+            self.covered = covered
+            self.delta -= frozen
+            if old != path and old.exists():
+                old.unlink()
+            self.stats['builds'] += 1
+            self.stats['last_build_s'] = round(time.monotonic() - started, 3)
+            logger.info(
+                f"Cold key snapshot rebuilt: {len(self.array)} keys up to rowid {covered} "
+                f"in {self.stats['last_build_s']}s"
+            )
+            return len(self.array)
+        finally:
+            self._building = False
+            self._freezing = None
+            self._rescan_after_freeze = None
+    
+    def _write(self, frozen: Set[int], covered: int) -> Path:
+        # Runs in a worker thread; numpy releases the GIL for the heavy parts.
+        old = self.array
+        new = np.fromiter(frozen, dtype=np.uint64, count=len(frozen))
+        new.sort()
+        if len(old):
+            # Keys deleted and inserted again are in both.
+            index = np.searchsorted(old, new)
+            new = new[old[np.minimum(index, len(old) - 1)] != new]
+        
+        path = self._path(covered)
+        tmp = path.with_suffix(".tmp")
+        out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.uint64, shape=(len(old) + len(new),))
+        merge_sorted(old, new, out)
+        out.flush()
+        del out
+        with open(tmp, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        return path
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'loaded': self.loaded,
+            'cold_keys': len(self.array) if self.array is not None else 0,
+            'delta_keys': len(self.delta),
+            'covered_rowid': self.covered,
+            **self.stats,
+        }
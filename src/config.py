@@ -0,0 +1,70 @@
+import fnmatch
+import logging
+import os
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def parse_topic_map(raw: Optional[str], cast: Callable[[str], T]) -> Dict[str, T]:
+    # "system.alert=1,user.*=4" -> {"system.alert": 1, "user.*": 4}
+    rules: Dict[str, T] = {}
+    if not raw:
+        return rules
+    
+    for item in raw.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        pattern, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Invalid topic setting '{item}', expected pattern=value")
+        rules[pattern.strip()] = cast(value.strip())
+    return rules
+
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(value: str) -> float:
+    # "90" / "90s" / "10m" / "2h" / "7d" -> seconds
+    value = value.strip().lower()
+    if value and value[-1] in DURATION_UNITS:
+        return float(value[:-1]) * DURATION_UNITS[value[-1]]
+    return float(value)
+
+
+def env_topic_map(name: str, cast: Callable[[str], T]) -> Dict[str, T]:
+    return parse_topic_map(os.getenv(name), cast)
+
+
+class TopicRules(Generic[T]):
+    
+    def __init__(self, rules: Optional[Dict[str, T]] = None, default: Any = None):
+        self.rules = dict(rules or {})
+        self.default = default
+        self._cache: Dict[str, T] = {}
+    
+    def get(self, topic: str) -> T:
+        try:
+            return self._cache[topic]
+        except KeyError:
+            pass
+        
+        # An exact topic wins over patterns; patterns are tried in the order given.
+        if topic in self.rules:
+            value = self.rules[topic]
+        else:
+            value = next(
+                (v for pattern, v in self.rules.items() if fnmatch.fnmatchcase(topic, pattern)),
+                self.default
+            )
+        
+        if len(self._cache) < 65536:
+            self._cache[topic] = value
+        return value
+    
+    def __bool__(self) -> bool:
+        return bool(self.rules)
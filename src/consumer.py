@@ -1,26 +1,55 @@
 import asyncio
 import logging
-from typing import Dict, Any
-from src.event_queue import EventQueue
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from src.event_queue import EventQueue, AdaptiveBatchSizer
 from src.dedup_store import DedupStore
-from src.models import Event
+from src.models import EventRecord
 
 logger = logging.getLogger(__name__)
 
+# Tries of a batch's dedup transaction before it is put back on the queue.
+MARK_ATTEMPTS = 4
+MARK_RETRY_DELAY = 0.1
+
 
 class EventConsumer:
-    
-    def __init__(self, queue: EventQueue, dedup_store: DedupStore):
+
+    def __init__(
+        self,
+        queue: EventQueue,
+        dedup_store: DedupStore,
+        min_batch: int = 1,
+        max_batch: int = 500,
+        max_wait: float = 1.0
+    ):
         self.queue = queue
         self.dedup_store = dedup_store
+        self.batch_sizer = AdaptiveBatchSizer(min_batch, max_batch)
+        self.max_wait = max_wait
         self.running = False
         self._task = None
+        self._processing = False
+        self._listeners: List[Callable[[List[EventRecord]], None]] = []
+        # RetryScheduler; without one a failed handler run is only logged.
+        self.retries: Optional[Any] = None
         self.stats = {
             'processed': 0,
             'duplicates': 0,
+            'failed': 0,
+            'requeued': 0,
         }
         logger.info("EventConsumer initialized")
     
+    def add_listener(self, listener: Callable[[List[EventRecord]], None]):
+        # Called with every batch of successfully handled events; must not block.
+        self._listeners.append(listener)
+    
+    def set_retries(self, retries: Any):
+        # Failed events go to retries.schedule([(event, error), ...]) after the
+        # batch; their dedup keys stay marked while they are retried. Handled
+        # ones go to retries.complete(events), clearing their in-flight rows.
+        self.retries = retries
+    
     async def start(self):
         if self.running:
             logger.warning("Consumer already running")
@@ -44,18 +73,62 @@ class EventConsumer:
         
         logger.info("EventConsumer stopped")
     
+    async def drain(self, timeout: float = 30.0) -> Dict[str, Any]:
+        # Stop the regular loop and flush what is still queued in full-size
+        # batches until the queue is empty or the deadline passes. The deadline
+        # is checked between batches, so a started batch is always committed.
+        # Callers must stop enqueueing first.
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + timeout
+        
+        self.running = False
+        if self._task:
+            if not self._processing:
+                # Idle means parked on an empty queue: safe to cancel.
+                self._task.cancel()
+            done, _ = await asyncio.wait({self._task}, timeout=max(0.0, deadline - loop.time()))
+            if not done:
+                logger.warning("Consumer batch still running at drain deadline")
+            self._task = None
+        
+        drained = 0
+        while not self.queue.is_empty() and loop.time() < deadline:
+            batch = await self.queue.dequeue_batch(self.batch_sizer.max_size, max_wait=0)
+            if not batch:
+                break
+            await self._process_batch(batch)
+            drained += len(batch)
+        
+        remaining = self.queue.qsize()
+        report = {
+            'drained': drained,
+            'remaining': remaining,
+            'duration_s': loop.time() - started,
+            'timed_out': remaining > 0,
+        }
+        if remaining:
+            logger.warning(f"Drain deadline reached: drained={drained}, remaining={remaining}")
+        else:
+            logger.info(f"Drain complete: drained={drained} in {report['duration_s']:.2f}s")
+        return report
+    
     async def _consume_loop(self):
         logger.info("Consumer loop started")
         
         while self.running:
             try:
-                try:
-                    event = await asyncio.wait_for(self.queue.dequeue(), timeout=1.0)
-                except asyncio.TimeoutError:
+                batch = await self.queue.dequeue_batch(self.batch_sizer.size, self.max_wait)
+                self.batch_sizer.update(len(batch))
+                if not batch:
                     continue
                 
-                await self._process_event(event)
-                
+                self._processing = True
+                try:
+                    await self._process_batch(batch)
+                finally:
+                    self._processing = False
+            
             except asyncio.CancelledError:
                 logger.info("Consumer loop cancelled")
                 break
@@ -65,48 +138,92 @@ class EventConsumer:
         
         logger.info("Consumer loop ended")
     
-    async def _process_event(self, event: Event):
-        try:
-            is_dup = await self.dedup_store.is_duplicate(event.topic, event.event_id)
-            
-            if is_dup:
-                self.stats['duplicates'] += 1
-                logger.warning(
-                    f"Duplicate event detected and dropped: "
-                    f"topic={event.topic}, event_id={event.event_id}, source={event.source}"
+    async def _mark_batch(self, events: List[EventRecord]) -> Optional[List[bool]]:
+        # Store errors (a locked or full disk) are retried with backoff; a
+        # batch that still fails goes back on the queue rather than being lost.
+        for attempt in range(MARK_ATTEMPTS):
+            try:
+                return await self.dedup_store.mark_processed_batch(events)
+            except Exception as e:
+                logger.error(
+                    f"Error marking batch of {len(events)} events (attempt {attempt + 1}/{MARK_ATTEMPTS}): {e}",
+                    exc_info=True
                 )
-                return
-            
-            marked = await self.dedup_store.mark_processed(
-                topic=event.topic,
-                event_id=event.event_id,
-                timestamp=event.timestamp,
-                source=event.source
+                if attempt + 1 < MARK_ATTEMPTS:
+                    await asyncio.sleep(MARK_RETRY_DELAY * 2 ** attempt)
+        
+        requeued = await self.queue.enqueue_batch(events)
+        self.stats['requeued'] += requeued
+        if requeued < len(events):
+            logger.error(f"Queue full: {len(events) - requeued} events of a failed batch dropped")
+        return None
+    
+    async def _process_batch(self, events: List[EventRecord]):
+        marked = await self._mark_batch(events)
+        if marked is None:
+            return
+        
+        fresh = []
+        for event, is_new in zip(events, marked):
+            if is_new:
+                fresh.append(event)
+                continue
+            self.stats['duplicates'] += 1
+            logger.warning(
+                f"Duplicate event detected and dropped: "
+                f"topic={event.topic}, event_id={event.event_id}, source={event.source}"
             )
-            
-            if not marked:
-                self.stats['duplicates'] += 1
-                logger.warning(
-                    f"Duplicate event detected (race condition): "
-                    f"topic={event.topic}, event_id={event.event_id}"
+        
+        results = await asyncio.gather(
+            *(self.handle_event(event) for event in fresh),
+            return_exceptions=True
+        )
+        handled = []
+        failed: List[Tuple[EventRecord, BaseException]] = []
+        for event, outcome in zip(fresh, results):
+            if isinstance(outcome, Exception):
+                logger.error(
+                    f"Error processing event {event.topic}/{event.event_id}: {outcome}",
+                    exc_info=outcome
                 )
-                return
-            
-            await self._handle_event(event)
+                failed.append((event, outcome))
+                continue
+            handled.append(event)
             self.stats['processed'] += 1
-            
-            logger.info(
+            logger.debug(
                 f"Event processed successfully: "
                 f"topic={event.topic}, event_id={event.event_id}, source={event.source}"
             )
-            
-        except Exception as e:
-            logger.error(
-                f"Error processing event {event.topic}/{event.event_id}: {e}",
-                exc_info=True
-            )
+        
+        if handled:
+            if self.retries is not None:
+                try:
+                    await self.retries.complete(handled)
+                except Exception as e:
+                    # Left in flight: run once more after a restart.
+                    logger.error(f"Error completing {len(handled)} events: {e}", exc_info=True)
+            self._notify(handled)
+        if failed:
+            self.stats['failed'] += len(failed)
+            if self.retries is not None:
+                try:
+                    await self.retries.schedule(failed)
+                except Exception as e:
+                    logger.error(f"Error scheduling retries for {len(failed)} events: {e}", exc_info=True)
+        
+        logger.info(
+            f"Batch processed: size={len(events)}, new={len(fresh)}, "
+            f"duplicates={len(events) - len(fresh)}"
+        )
+    
+    def _notify(self, events: List[EventRecord]):
+        for listener in self._listeners:
+            try:
+                listener(events)
+            except Exception as e:
+                logger.error(f"Error in consumer listener {listener}: {e}", exc_info=True)
     
-    async def _handle_event(self, event: Event):
+    async def handle_event(self, event: EventRecord):
         await asyncio.sleep(0.01)
         
         logger.debug(f"Handling event: {event.topic}/{event.event_id}")
@@ -115,6 +232,9 @@ class EventConsumer:
         return {
             'processed': self.stats['processed'],
             'duplicates': self.stats['duplicates'],
+            'failed': self.stats['failed'],
+            'requeued': self.stats['requeued'],
             'running': self.running,
             'queue_size': self.queue.qsize(),
+            'batch_size': self.batch_sizer.size,
         }
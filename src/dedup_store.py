@@ -1,27 +1,102 @@
 import aiosqlite
 import asyncio
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional, Set, List, Tuple
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional, Set, List, Tuple
 from datetime import datetime
+from src.models import EventRecord
 
 logger = logging.getLogger(__name__)
 
+# Keys per IN (...) lookup; two bound parameters each, well under SQLite's limit.
+LOOKUP_CHUNK = 400
+
 
 class DedupStore:
-    
+
     def __init__(self, db_path: str = "data/dedup.db"):
         self.db_path = db_path
         self._ensure_data_dir()
         self._lock = asyncio.Lock()
+        self._db: Optional[aiosqlite.Connection] = None
+        self._reader: Optional[aiosqlite.Connection] = None
+        self._writers: List[Any] = []
+        self._key_indexes: List[Any] = []
+        self._fingerprints: Optional[Any] = None
+        self._commit_listeners: List[Callable[[Optional[Set[str]]], None]] = []
         logger.info(f"DedupStore initialized with database: {db_path}")
     
     def _ensure_data_dir(self):
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
     
+    def add_writer(self, writer: Any):
+        # Writers keep derived tables (search index, rollups) in step with
+        # processed_events. Each provides:
+        #   async create_schema(db)                     - run once by initialize()
+        #   async write_batch(db, records, processed_at) - newly processed records,
+        #                                                 inside the insert transaction
+        #   async prune(db, cutoff)                     - inside cleanup_old_events()
+        #   async import_batch(db, rows)                - keys from import_keys(),
+        #                                                 inside its transaction
+        # Register writers before initialize().
+        self._writers.append(writer)
+    
+    def add_key_index(self, index: Any):
+        # Membership answered without SQLite for some keys (DedupWindows,
+        # ColdKeyIndex). Provides:
+        #   lookup(keys) -> (existing, rest)  - keys it is authoritative for are
+        #                                       answered itself (absent when in
+        #                                       neither); rest go to the next index,
+        #                                       then SQLite
+        #   forget(keys)                      - inserts rolled back after write_batch
+        # Consulted in the order added.
+        self._key_indexes.append(index)
+    
+    def _lookup_indexes(self, keys: List[Tuple[str, str]]) -> Tuple[Set[Tuple[str, str]], List[Tuple[str, str]]]:
+        existing: Set[Tuple[str, str]] = set()
+        for index in self._key_indexes:
+            if not keys:
+                break
+            found, keys = index.lookup(keys)
+            existing |= found
+        return existing, keys
+    
+    def _forget(self, keys: List[Tuple[str, str]]):
+        for index in self._key_indexes:
+            index.forget(keys)
+    
+    def set_fingerprints(self, index: Any):
+        # Content dedup for some topics (FingerprintIndex, also added as a
+        # writer). Provides:
+        #   async get_existing(keys) -> set   - stored (topic, fingerprint) pairs
+        # Records whose fingerprint is set are duplicates when it is already stored.
+        self._fingerprints = index
+    
+    def add_commit_listener(self, listener: Callable[[Optional[Set[str]]], None]):
+        # Called after every commit that changed processed_events, with the
+        # topics it touched or None when any topic may have changed (cleanup).
+        # Runs on the event loop; must not block.
+        self._commit_listeners.append(listener)
+    
+    def _committed(self, topics: Optional[Set[str]]):
+        for listener in self._commit_listeners:
+            try:
+                listener(topics)
+            except Exception as e:
+                logger.error(f"Error in commit listener {listener}: {e}", exc_info=True)
+    
     async def initialize(self):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
+        # One long-lived connection: opening a connection per call costs a thread
+        # start and a file open, and a cancelled open leaks its worker thread.
+        connection = aiosqlite.connect(self.db_path)
+        connection.daemon = True
+        self._db = await connection
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("PRAGMA synchronous=NORMAL")
+        
+        async with self._lock:
+            await self._db.execute("""
                 CREATE TABLE IF NOT EXISTS processed_events (
                     topic TEXT NOT NULL,
                     event_id TEXT NOT NULL,
@@ -32,29 +107,138 @@ class DedupStore:
                 )
             """)
             
-            await db.execute("""
+            await self._db.execute("""
                 CREATE INDEX IF NOT EXISTS idx_topic 
                 ON processed_events(topic)
             """)
             
-            await db.execute("""
+            await self._db.execute("""
                 CREATE INDEX IF NOT EXISTS idx_processed_at 
                 ON processed_events(processed_at)
             """)
             
-            await db.commit()
+            await self._db.execute("""
+                CREATE TABLE IF NOT EXISTS store_state (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+            
+            for writer in self._writers:
+                await writer.create_schema(self._db)
+            
+            await self._db.commit()
+        
+        # Reads outside _lock go through a second, read-only connection: on the
+        # writer's they would see the rows of a transaction still in progress,
+        # which may yet roll back. Under WAL a reader sees the last commit.
+        reader = aiosqlite.connect(Path(self.db_path).resolve().as_uri() + "?mode=ro", uri=True)
+        reader.daemon = True
+        self._reader = await reader
         
         logger.info("DedupStore database initialized")
     
-    async def is_duplicate(self, topic: str, event_id: str) -> bool:
+    @property
+    def reader(self) -> aiosqlite.Connection:
+        # For queries of other components that must not see uncommitted rows.
+        return self._reader
+    
+    async def warm(self, progress: Optional[Callable[[int, int], None]] = None, chunk: int = 50000):
+        # Walk the (topic, event_id) index so its pages are in the OS cache before
+        # the first dedup lookups. Done in keyset chunks so publish lookups can
+        # interleave on the shared connection instead of waiting for a full scan.
+        cursor = await self._reader.execute("SELECT MAX(rowid) FROM processed_events")
+        total = (await cursor.fetchone())[0] or 0
+        
+        last: Tuple[str, str] = ("", "")
+        done = 0
+        while True:
+            # OFFSET walks the index without returning rows: one key per chunk.
+            cursor = await self._reader.execute(
+                """
+                SELECT topic, event_id FROM processed_events
+                WHERE (topic, event_id) > (?, ?)
+                ORDER BY topic, event_id
+                LIMIT 1 OFFSET ?
+                """,
+                (*last, chunk - 1)
+            )
+            row = await cursor.fetchone()
+            if row is None:
+                break
+            last = (row[0], row[1])
+            done += chunk
+            if progress:
+                progress(min(done, total), total)
+        if progress:
+            progress(total, total)
+        
+        # Compile the lookup statement shapes used by /publish and the consumer.
+        await self.get_existing([("", "")] * 2)
+        await self.get_existing(("", str(i)) for i in range(LOOKUP_CHUNK))
+        logger.info(f"DedupStore index warmed (~{total} keys)")
+    
+    async def integrity_check(self):
+        cursor = await self._db.execute("PRAGMA quick_check")
+        rows = await cursor.fetchall()
+        if rows != [("ok",)]:
+            raise RuntimeError(f"Database integrity check failed: {rows[:5]}")
+        logger.info("DedupStore integrity check passed")
+    
+    async def checkpoint(self):
+        # Copy the WAL into the main file and fsync it. With synchronous=NORMAL
+        # commits are durable against a process crash but not a power loss until
+        # a checkpoint has run.
         async with self._lock:
-            async with aiosqlite.connect(self.db_path) as db:
-                cursor = await db.execute(
-                    "SELECT 1 FROM processed_events WHERE topic = ? AND event_id = ? LIMIT 1",
-                    (topic, event_id)
-                )
-                result = await cursor.fetchone()
-                return result is not None
+            cursor = await self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            busy, log_frames, checkpointed = await cursor.fetchone()
+        
+        logger.info(f"DedupStore checkpoint: frames={log_frames}, checkpointed={checkpointed}, busy={busy}")
+    
+    async def close(self):
+        if self._db is None:
+            return
+        
+        async with self._lock:
+            await self._reader.close()
+            await self._db.close()
+            self._reader = None
+            self._db = None
+        
+        logger.info("DedupStore database closed")
+    
+    async def is_duplicate(self, topic: str, event_id: str) -> bool:
+        if self._key_indexes:
+            existing, rest = self._lookup_indexes([(topic, event_id)])
+            if not rest:
+                return bool(existing)
+        cursor = await self._reader.execute(
+            "SELECT 1 FROM processed_events WHERE topic = ? AND event_id = ? LIMIT 1",
+            (topic, event_id)
+        )
+        result = await cursor.fetchone()
+        return result is not None
+    
+    async def get_existing(self, keys: Iterable[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+        keys = list(dict.fromkeys(keys))
+        existing = set()
+        if self._key_indexes:
+            existing, keys = self._lookup_indexes(keys)
+        
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[start:start + LOOKUP_CHUNK]
+            placeholders = ",".join("(?, ?)" for _ in chunk)
+            params = [value for key in chunk for value in key]
+            # Joined from the VALUES side so each key is a primary-key probe; a
+            # row-value IN (VALUES ...) is planned as a scan of the whole table.
+            cursor = await self._reader.execute(
+                f"SELECT p.topic, p.event_id FROM (VALUES {placeholders}) AS v "
+                f"JOIN processed_events AS p ON p.topic = v.column1 AND p.event_id = v.column2",
+                params
+            )
+            existing.update(await cursor.fetchall())
+        
+        return existing
     
     async def mark_processed(
         self, 
@@ -64,35 +248,234 @@ class DedupStore:
         source: str
     ) -> bool:
         async with self._lock:
-            async with aiosqlite.connect(self.db_path) as db:
-                try:
-                    processed_at = datetime.utcnow().isoformat()
-                    await db.execute(
-                        """
-                        INSERT INTO processed_events 
-                        (topic, event_id, timestamp, source, processed_at)
-                        VALUES (?, ?, ?, ?, ?)
-                        """,
-                        (topic, event_id, timestamp, source, processed_at)
-                    )
-                    await db.commit()
-                    return True
-                except aiosqlite.IntegrityError:
+            try:
+                processed_at = datetime.utcnow().isoformat()
+                cursor = await self._db.execute(
+                    """
+                    INSERT INTO processed_events 
+                    (topic, event_id, timestamp, source, processed_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (topic, event_id) DO NOTHING
+                    """,
+                    (topic, event_id, timestamp, source, processed_at)
+                )
+                if not cursor.rowcount:
+                    await self._db.commit()
                     return False
+                if self._writers:
+                    records = [EventRecord(topic, event_id, timestamp, source)]
+                    for writer in self._writers:
+                        await writer.write_batch(self._db, records, processed_at)
+                await self._db.commit()
+                self._committed({topic})
+                return True
+            except Exception:
+                await self._db.rollback()
+                self._forget([(topic, event_id)])
+                raise
     
-    async def get_processed_count(self) -> int:
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("SELECT COUNT(*) FROM processed_events")
-            result = await cursor.fetchone()
-            return result[0] if result else 0
+    async def mark_processed_batch(
+        self,
+        events: List[EventRecord],
+        state: Optional[Dict[str, int]] = None
+    ) -> List[bool]:
+        # One flag per input event, True only for the first occurrence of a key not
+        # already stored - what mark_processed would return called once per event.
+        # state is saved in the same transaction, as in import_keys.
+        async with self._lock:
+            existing = await self.get_existing((e.topic, e.event_id) for e in events)
+            fingerprints: Set[Tuple[str, bytes]] = set()
+            if self._fingerprints is not None:
+                fingerprints = await self._fingerprints.get_existing(
+                    (e.topic, e.fingerprint) for e in events if e.fingerprint is not None
+                )
+            
+            flags = []
+            rows = []
+            fresh = []
+            processed_at = datetime.utcnow().isoformat()
+            for event in events:
+                key = (event.topic, event.event_id)
+                if key in existing:
+                    flags.append(False)
+                    continue
+                if self._fingerprints is not None and event.fingerprint is not None:
+                    content = (event.topic, event.fingerprint)
+                    if content in fingerprints:
+                        flags.append(False)
+                        continue
+                    fingerprints.add(content)
+                existing.add(key)
+                flags.append(True)
+                fresh.append(event)
+                rows.append((event.topic, event.event_id, event.timestamp, event.source, processed_at))
+            
+            if rows or state:
+                try:
+                    if rows:
+                        fresh = await self._insert_fresh(fresh, rows)
+                        if len(fresh) < len(rows):
+                            # Keys stored by another connection (or missed by
+                            # a key index) since the lookup: duplicates too.
+                            inserted = {id(e) for e in fresh}
+                            flags = [
+                                flag and id(event) in inserted
+                                for event, flag in zip(events, flags)
+                            ]
+                        if fresh:
+                            for writer in self._writers:
+                                await writer.write_batch(self._db, fresh, processed_at)
+                    if state:
+                        await self._db.executemany(
+                            "INSERT OR REPLACE INTO store_state (name, value) VALUES (?, ?)",
+                            list(state.items())
+                        )
+                    await self._db.commit()
+                except Exception:
+                    await self._db.rollback()
+                    self._forget([(e.topic, e.event_id) for e in fresh])
+                    raise
+                if fresh:
+                    self._committed({e.topic for e in fresh})
+            
+            return flags
     
-    async def get_topics(self) -> List[str]:
-        async with aiosqlite.connect(self.db_path) as db:
+    async def _insert_fresh(self, fresh: List[EventRecord], rows: List[Tuple[str, str, str, str, str]]) -> List[EventRecord]:
+        # Inserts rows, skipping keys already stored, and returns the records
+        # actually inserted. A conflict leaves the rest of the batch in place
+        # instead of failing it. New rows of a rowid table get rowids above the
+        # current maximum, which identifies them when some were skipped.
+        cursor = await self._db.execute("SELECT MAX(rowid) FROM processed_events")
+        top = (await cursor.fetchone())[0] or 0
+        cursor = await self._db.executemany(
+            """
+            INSERT INTO processed_events 
+            (topic, event_id, timestamp, source, processed_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (topic, event_id) DO NOTHING
+            """,
+            rows
+        )
+        if cursor.rowcount == len(rows):
+            return fresh
+        
+        cursor = await self._db.execute(
+            "SELECT topic, event_id FROM processed_events WHERE rowid > ?", (top,)
+        )
+        inserted = set(await cursor.fetchall())
+        for event in fresh:
+            if (event.topic, event.event_id) not in inserted:
+                logger.warning(f"Key stored concurrently, treated as duplicate: {event.topic}/{event.event_id}")
+        return [e for e in fresh if (e.topic, e.event_id) in inserted]
+    
+    async def get_keys_after(
+        self,
+        after: Tuple[str, str],
+        limit: int
+    ) -> List[Tuple[str, str, str, str, str]]:
+        # Keyset page over the primary key, for walking the whole store in chunks.
+        cursor = await self._reader.execute(
+            """
+            SELECT topic, event_id, timestamp, source, processed_at
+            FROM processed_events
+            WHERE (topic, event_id) > (?, ?)
+            ORDER BY topic, event_id
+            LIMIT ?
+            """,
+            (*after, limit)
+        )
+        return await cursor.fetchall()
+    
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        # Exclusive use of the shared connection for one transaction, so writes
+        # from outside this class never interleave with a batch in progress.
+        async with self._lock:
+            try:
+                yield self._db
+                await self._db.commit()
+            except BaseException:
+                await self._db.rollback()
+                raise
+    
+    async def import_keys(
+        self,
+        rows: List[Tuple[str, str, str, str, str]],
+        state: Optional[Dict[str, int]] = None
+    ) -> int:
+        # Dedup history from another node (rebalance, replication): keys only,
+        # write_batch is not run since the events were indexed where they were
+        # processed; writers that track keys get import_batch. state is saved in
+        # the same transaction, e.g. a replication offset, so it never runs ahead
+        # of or behind the rows.
+        async with self.transaction() as db:
+            cursor = await db.executemany(
+                """
+                INSERT OR IGNORE INTO processed_events 
+                (topic, event_id, timestamp, source, processed_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                rows
+            )
+            for writer in self._writers:
+                await writer.import_batch(db, rows)
+            if state:
+                await db.executemany(
+                    "INSERT OR REPLACE INTO store_state (name, value) VALUES (?, ?)",
+                    list(state.items())
+                )
+            imported = cursor.rowcount
+        if imported:
+            self._committed({row[0] for row in rows})
+        return imported
+    
+    async def get_state(self, name: str, default: int = 0) -> int:
+        cursor = await self._reader.execute("SELECT value FROM store_state WHERE name = ?", (name,))
+        row = await cursor.fetchone()
+        return row[0] if row else default
+    
+    async def delete_keys(self, keys: List[Tuple[str, str]]) -> int:
+        async with self.transaction() as db:
+            cursor = await db.executemany(
+                "DELETE FROM processed_events WHERE topic = ? AND event_id = ?",
+                keys
+            )
+            deleted = cursor.rowcount
+        if deleted:
+            self._committed({key[0] for key in keys})
+        return deleted
+    
+    async def drop_secondary_indexes(self) -> List[str]:
+        # For bulk loads: every plain index (not primary keys or unique ones,
+        # which dedup and upserts need) is dropped and its SQL returned for
+        # restore_indexes(), so each is built once after the load instead of
+        # updated row by row. initialize() also recreates them if a load dies.
+        async with self.transaction() as db:
             cursor = await db.execute(
-                "SELECT DISTINCT topic FROM processed_events ORDER BY topic"
+                "SELECT name, sql FROM sqlite_master "
+                "WHERE type = 'index' AND sql IS NOT NULL AND sql NOT LIKE 'CREATE UNIQUE%'"
             )
-            results = await cursor.fetchall()
-            return [row[0] for row in results]
+            indexes = await cursor.fetchall()
+            for name, _ in indexes:
+                await db.execute(f'DROP INDEX IF EXISTS "{name}"')
+        return [sql for _, sql in indexes]
+    
+    async def restore_indexes(self, statements: List[str]):
+        async with self.transaction() as db:
+            for sql in statements:
+                await db.execute(sql.replace("CREATE INDEX ", "CREATE INDEX IF NOT EXISTS ", 1))
+    
+    async def get_processed_count(self) -> int:
+        cursor = await self._reader.execute("SELECT COUNT(*) FROM processed_events")
+        result = await cursor.fetchone()
+        return result[0] if result else 0
+    
+    async def get_topics(self) -> List[str]:
+        cursor = await self._reader.execute(
+            "SELECT DISTINCT topic FROM processed_events ORDER BY topic"
+        )
+        results = await cursor.fetchall()
+        return [row[0] for row in results]
     
     async def get_events_by_topic(
         self, 
@@ -109,31 +492,31 @@ class DedupStore:
         if limit:
             query += f" LIMIT {limit}"
         
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(query, (topic,))
-            return await cursor.fetchall()
+        cursor = await self._reader.execute(query, (topic,))
+        return await cursor.fetchall()
     
     async def get_count_by_topic(self, topic: str) -> int:
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(
-                "SELECT COUNT(*) FROM processed_events WHERE topic = ?",
-                (topic,)
-            )
-            result = await cursor.fetchone()
-            return result[0] if result else 0
+        cursor = await self._reader.execute(
+            "SELECT COUNT(*) FROM processed_events WHERE topic = ?",
+            (topic,)
+        )
+        result = await cursor.fetchone()
+        return result[0] if result else 0
     
     async def cleanup_old_events(self, days: int = 30):
         cutoff = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
         cutoff_iso = cutoff.isoformat()
         
         async with self._lock:
-            async with aiosqlite.connect(self.db_path) as db:
-                cursor = await db.execute(
-                    "DELETE FROM processed_events WHERE processed_at < ?",
-                    (cutoff_iso,)
-                )
-                deleted = cursor.rowcount
-                await db.commit()
-                
-                if deleted > 0:
-                    logger.info(f"Cleaned up {deleted} old events (older than {days} days)")
+            cursor = await self._db.execute(
+                "DELETE FROM processed_events WHERE processed_at < ?",
+                (cutoff_iso,)
+            )
+            deleted = cursor.rowcount
+            for writer in self._writers:
+                await writer.prune(self._db, cutoff_iso)
+            await self._db.commit()
+            
+            if deleted > 0:
+                self._committed(None)
+                logger.info(f"Cleaned up {deleted} old events (older than {days} days)")
@@ -0,0 +1,171 @@
+import asyncio
+import bisect
+import logging
+import sys
+import threading
+import time
+from collections import Counter, deque
+from types import FrameType
+from typing import Any, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the lag histogram buckets; the last bucket is open.
+LAG_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def collapse(frame: Optional[FrameType], limit: int = 128) -> str:
+    # Root first, ';'-separated: one line of the collapsed-stack format that
+    # flamegraph.pl, speedscope and inferno read.
+    names = []
+    while frame is not None and len(names) < limit:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class LoopMonitor:
+    # Event-loop lag and slow callbacks. A task on the loop wakes every
+    # `interval` and records how late it woke into a histogram. A watchdog
+    # thread watches that heartbeat: once it is `slow_threshold` overdue the
+    # loop is stuck in one callback, and the loop thread's stack is captured
+    # while it still is, which names the blocking coroutine or call. Costs
+    # one wake-up per interval on the loop and nothing per request.
+    
+    def __init__(self, interval: float = 0.1, slow_threshold: float = 0.1, keep: int = 50):
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.counts = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.samples = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.slow: Deque[Dict[str, Any]] = deque(maxlen=keep)
+        self.slow_count = 0
+        self.running = False
+        self._beat = 0.0
+        self._stall: Optional[Dict[str, Any]] = None
+        self.loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+    
+    async def start(self):
+        self.running = True
+        self.loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+    
+    async def stop(self):
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+    
+    async def _run(self):
+        while self.running:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.record(max(0.0, now - expected) * 1000)
+            self._beat = now
+    
+    def record(self, lag_ms: float):
+        self.counts[bisect.bisect_left(LAG_BUCKETS_MS, lag_ms)] += 1
+        self.samples += 1
+        self.total_ms += lag_ms
+        self.max_ms = max(self.max_ms, lag_ms)
+        stall, self._stall = self._stall, None
+        if lag_ms >= self.slow_threshold * 1000:
+            self.slow_count += 1
+            entry = {
+                'at': time.time(),
+                'lag_ms': round(lag_ms, 1),
+                'stack': stall['stack'] if stall else None,
+            }
+            self.slow.append(entry)
+            logger.warning(
+                f"Event loop blocked for {lag_ms:.0f} ms"
+                + (f" in {stall['stack'].rsplit(';', 1)[-1]}" if stall else "")
+            )
+    
+    def _watch(self):
+        # One capture per stall: the first time the heartbeat is overdue.
+        captured = None
+        while self.running:
+            time.sleep(self.interval / 2)
+            beat = self._beat
+            if beat == captured or time.monotonic() - beat < self.interval + self.slow_threshold:
+                continue
+            frame = sys._current_frames().get(self.loop_thread)
+            if frame is not None:
+                self._stall = {'stack': collapse(frame)}
+                captured = beat
+    
+    def percentile(self, q: float) -> Optional[float]:
+        # Upper bound of the bucket holding the q-th sample.
+        if not self.samples:
+            return None
+        rank = q * self.samples
+        seen = 0
+        for bound, count in zip(LAG_BUCKETS_MS + (None,), self.counts):
+            seen += count
+            if seen >= rank:
+                return float(bound) if bound is not None else self.max_ms
+        return self.max_ms
+    
+    def get_stats(self, detail: bool = False) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            'samples': self.samples,
+            'mean_ms': round(self.total_ms / self.samples, 3) if self.samples else None,
+            'p50_ms': self.percentile(0.5),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max_ms, 1),
+            'slow_callbacks': self.slow_count,
+        }
+        if detail:
+            stats['interval_s'] = self.interval
+            stats['slow_threshold_ms'] = self.slow_threshold * 1000
+            stats['histogram'] = {
+                (f"le_{bound}ms" if bound is not None else "inf"): count
+                for bound, count in zip(LAG_BUCKETS_MS + (None,), self.counts)
+            }
+            stats['recent_slow'] = list(self.slow)
+        return stats
+
+
+def sample_stacks(seconds: float, hz: float = 100.0, loop_thread: Optional[int] = None) -> Counter:
+    # Statistical profiler: every 1/hz seconds the stack of every thread (or
+    # only loop_thread) is read through sys._current_frames and counted by its
+    # collapsed form. Nothing is traced in between, so the profiled code runs
+    # at full speed; run it off the loop (asyncio.to_thread).
+    me = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks: Counter = Counter()
+    period = 1.0 / hz
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        for ident, frame in sys._current_frames().items():
+            if ident == me or (loop_thread is not None and ident != loop_thread):
+                continue
+            thread = names.get(ident) or f"thread-{ident}"
+            stacks[f"{thread};{collapse(frame)}"] += 1
+        time.sleep(max(0.0, period - (time.monotonic() - started)))
+    return stacks
+
+
+def format_collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
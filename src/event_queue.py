@@ -1,19 +1,60 @@
 import asyncio
 import logging
-from typing import List
-from src.models import Event
+from typing import Dict, List, Optional, Union
+from src.config import TopicRules
+from src.models import EventRecord
+from src.ring_buffer import RingBuffer
+from src.scheduling import FairScheduler
 
 logger = logging.getLogger(__name__)
 
 
 class EventQueue:
     
-    def __init__(self, maxsize: int = 10000):
-        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+    # fifo: asyncio.Queue. fair: per-topic DRR sub-queues (src/scheduling.py).
+    # ring: preallocated ring buffer with bulk put/get and one consumer wake-up
+    # per enqueued batch (src/ring_buffer.py).
+    MODES = ("fifo", "fair", "ring")
+    
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        mode: str = "fifo",
+        topic_weights: Optional[Dict[str, float]] = None,
+        topic_priorities: Optional[Dict[str, int]] = None,
+        topic_capacities: Optional[Dict[str, int]] = None
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown queue mode '{mode}', expected one of {self.MODES}")
+        
         self.maxsize = maxsize
-        logger.info(f"EventQueue initialized with max size: {maxsize}")
+        self.mode = mode
+        self.queue: Optional[asyncio.Queue] = None
+        self._buffer: Optional[Union[FairScheduler, RingBuffer]] = None
+        self._not_empty = asyncio.Event()
+        
+        if mode == "fifo":
+            self.queue = asyncio.Queue(maxsize=maxsize)
+        elif mode == "fair":
+            self._buffer = FairScheduler(
+                maxsize,
+                weights=TopicRules(topic_weights, default=1.0),
+                priorities=TopicRules(topic_priorities, default=0),
+                capacities=TopicRules(topic_capacities, default=maxsize),
+            )
+        else:
+            self._buffer = RingBuffer(maxsize)
+        
+        logger.info(f"EventQueue initialized with max size: {maxsize}, mode: {mode}")
     
-    async def enqueue(self, event: Event) -> bool:
+    async def enqueue(self, event: EventRecord) -> bool:
+        if self._buffer is not None:
+            if self._buffer.put(event):
+                self._wake()
+                return True
+            logger.warning(f"Queue full, dropping event: {event.topic}/{event.event_id}")
+            return False
+        
         try:
             self.queue.put_nowait(event)
             return True
@@ -21,21 +62,99 @@ class EventQueue:
             logger.warning(f"Queue full, dropping event: {event.topic}/{event.event_id}")
             return False
     
-    async def enqueue_batch(self, events: List[Event]) -> int:
+    async def enqueue_batch(self, events: List[EventRecord]) -> int:
+        if isinstance(self._buffer, RingBuffer):
+            enqueued = self._buffer.put_many(events)
+            if enqueued:
+                self._wake()
+            if enqueued < len(events):
+                logger.warning(f"Queue full, dropping {len(events) - enqueued} events")
+            return enqueued
+        
         enqueued = 0
         for event in events:
             if await self.enqueue(event):
                 enqueued += 1
         return enqueued
     
-    async def dequeue(self) -> Event:
+    async def dequeue(self) -> EventRecord:
+        if self._buffer is not None:
+            while not self._buffer.qsize():
+                self._not_empty.clear()
+                await self._not_empty.wait()
+            if isinstance(self._buffer, RingBuffer):
+                return self._buffer.get()
+            return self._buffer.get_many(1)[0]
+        
         return await self.queue.get()
     
+    async def dequeue_batch(self, max_items: int, max_wait: float = 1.0) -> List[EventRecord]:
+        # Only an empty queue is waited on (and only once per batch); anything
+        # already queued is handed over immediately, up to max_items.
+        if self._buffer is not None:
+            if not self._buffer.qsize():
+                self._not_empty.clear()
+                try:
+                    await asyncio.wait_for(self._not_empty.wait(), timeout=max_wait)
+                except asyncio.TimeoutError:
+                    return []
+            return self._buffer.get_many(max_items)
+        
+        if self.queue.empty():
+            try:
+                first = await asyncio.wait_for(self.queue.get(), timeout=max_wait)
+            except asyncio.TimeoutError:
+                return []
+            batch = [first]
+        else:
+            batch = []
+        
+        while len(batch) < max_items:
+            try:
+                batch.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+    
+    def _wake(self):
+        # Setting an already-set Event is a no-op, so a burst of puts costs one
+        # wake-up until the consumer next finds the buffer empty and clears it.
+        if not self._not_empty.is_set():
+            self._not_empty.set()
+    
     def qsize(self) -> int:
+        if self._buffer is not None:
+            return self._buffer.qsize()
         return self.queue.qsize()
     
     def is_empty(self) -> bool:
-        return self.queue.empty()
+        return self.qsize() == 0
     
     def is_full(self) -> bool:
+        if self._buffer is not None:
+            return self._buffer.full()
         return self.queue.full()
+    
+    def topic_sizes(self) -> Dict[str, int]:
+        if isinstance(self._buffer, FairScheduler):
+            return self._buffer.topic_sizes()
+        return {}
+
+
+class AdaptiveBatchSizer:
+    
+    def __init__(self, min_size: int = 1, max_size: int = 500):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.size = min_size
+    
+    def update(self, batch_len: int) -> int:
+        # A full batch means a backlog is building: grow so each round trip to the
+        # dedup store carries more events. A batch under half full means the
+        # consumer has caught up: shrink so new events are not held behind a
+        # large batch.
+        if batch_len >= self.size:
+            self.size = min(self.max_size, self.size * 2)
+        elif batch_len < self.size // 2:
+            self.size = max(self.min_size, self.size // 2)
+        return self.size
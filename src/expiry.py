@@ -0,0 +1,288 @@
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+import aiosqlite
+from src.config import TopicRules
+from src.dedup_store import LOOKUP_CHUNK, DedupStore
+from src.models import EventRecord
+
+logger = logging.getLogger(__name__)
+
+
+def epoch(processed_at: str) -> float:
+    # processed_at is naive UTC (datetime.utcnow().isoformat()).
+    return datetime.fromisoformat(processed_at).replace(tzinfo=timezone.utc).timestamp()
+
+
+class TimingWheel:
+    # Hierarchical timing wheel: `levels` wheels of `slots` buckets, level L
+    # covering slots**(L+1) ticks. Adding is O(1); advancing one tick empties
+    # one level-0 bucket and, at level boundaries, re-spreads one bucket of the
+    # next level down. Deadlines past the top level wait in an overflow list.
+    
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 4, now: Optional[float] = None):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.current = int((time.time() if now is None else now) // tick)
+        self.size = 0
+        self._spans = [slots ** level for level in range(levels + 1)]
+        self._wheels: List[List[List[Tuple[int, Hashable]]]] = [
+            [[] for _ in range(slots)] for _ in range(levels)
+        ]
+        self._overflow: List[Tuple[int, Hashable]] = []
+    
+    def add(self, deadline: float, item: Hashable) -> bool:
+        # False when the deadline has already passed; the item is not kept.
+        due = math.ceil(deadline / self.tick)
+        if due <= self.current:
+            return False
+        self._place(due, item)
+        self.size += 1
+        return True
+    
+    def _place(self, due: int, item: Hashable):
+        delta = due - self.current
+        for level in range(self.levels):
+            if delta < self._spans[level + 1]:
+                self._wheels[level][(due // self._spans[level]) % self.slots].append((due, item))
+                return
+        self._overflow.append((due, item))
+    
+    def advance(self, now: float) -> List[Hashable]:
+        # Items whose deadline is at or before `now`.
+        target = int(now // self.tick)
+        expired: List[Hashable] = []
+        while self.current < target:
+            self.current += 1
+            tick = self.current
+            for level in range(self.levels - 1, 0, -1):
+                span = self._spans[level]
+                if tick % span == 0:
+                    index = (tick // span) % self.slots
+                    bucket = self._wheels[level][index]
+                    if bucket:
+                        self._wheels[level][index] = []
+                        self._cascade(bucket, expired)
+            if self._overflow and tick % self._spans[self.levels - 1] == 0:
+                overflow, self._overflow = self._overflow, []
+                self._cascade(overflow, expired)
+            
+            index = tick % self.slots
+            bucket = self._wheels[0][index]
+            if bucket:
+                self._wheels[0][index] = []
+                expired.extend(item for _, item in bucket)
+        self.size -= len(expired)
+        return expired
+    
+    def _cascade(self, bucket: List[Tuple[int, Hashable]], expired: List[Hashable]):
+        for due, item in bucket:
+            if due <= self.current:
+                expired.append(item)
+            else:
+                self._place(due, item)
+
+
+class DedupWindows:
+    # Per-topic dedup windows. Keys of windowed topics are held in memory and
+    # in a timing wheel by processed_at + window; expired keys are deleted from
+    # disk in batches and then dropped from memory, so those topics only ever
+    # hold one window's worth of keys. Keys with a pending retry or a dead
+    # letter are kept for another window instead. Once load() has run, a key of
+    # a windowed topic that is not in memory is known to be new (DedupStore key
+    # index); keys that are still go to SQLite, which has the final say. Topics
+    # without a window keep their keys until cleanup_old_events. Registered as a
+    # DedupStore writer so keys are tracked as they are inserted.
+    
+    def __init__(
+        self,
+        store: DedupStore,
+        windows: Dict[str, float],
+        tick: float = 1.0,
+        batch_size: int = 5000
+    ):
+        self.store = store
+        self.rules: TopicRules[Optional[float]] = TopicRules(windows)
+        self.tick = tick
+        self.batch_size = batch_size
+        self.wheel = TimingWheel(tick=tick)
+        self.keys: Set[Tuple[str, str]] = set()
+        self.loaded = False
+        self.running = False
+        self.stats = {
+            'loaded': 0,
+            'expired': 0,
+            'deleted': 0,
+            'held': 0,
+        }
+        self._db: Optional[aiosqlite.Connection] = None
+        self._cutoff = ""
+        self._due: List[Tuple[str, str]] = []
+        self._topics: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+    
+    def _track(self, topic: str, event_id: str, processed_at: float):
+        window = self.rules.get(topic)
+        if window is None:
+            return
+        key = (topic, event_id)
+        if key in self.keys:
+            return
+        # One shared string per topic instead of one per event.
+        key = (self._topics.setdefault(topic, topic), event_id)
+        self.keys.add(key)
+        if not self.wheel.add(processed_at + window, key):
+            self._due.append(key)
+    
+    def lookup(self, keys: List[Tuple[str, str]]) -> Tuple[Set[Tuple[str, str]], List[Tuple[str, str]]]:
+        # DedupStore key index: once loaded, keys of windowed topics missing from
+        # memory are new. Hits are only candidates (the row may be mid-expiry or
+        # rolled back), so they go on to SQLite with the other topics.
+        if not self.loaded:
+            return set(), keys
+        rest = [key for key in keys if key in self.keys or self.rules.get(key[0]) is None]
+        return set(), rest
+    
+    def forget(self, keys: List[Tuple[str, str]]):
+        # The insert was rolled back; the wheel entry stays and expires harmlessly.
+        self.keys.difference_update(keys)
+    
+    async def create_schema(self, db: aiosqlite.Connection):
+        self._db = db
+        # Everything inserted from here on is tracked by write_batch/import_batch;
+        # load() reads the rows from before.
+        self._cutoff = datetime.utcnow().isoformat()
+        logger.info(f"DedupWindows initialized: {self.rules.rules}")
+    
+    async def write_batch(self, db: aiosqlite.Connection, records: List[EventRecord], processed_at: str):
+        at = epoch(processed_at)
+        for record in records:
+            self._track(record.topic, record.event_id, at)
+    
+    async def import_batch(self, db: aiosqlite.Connection, rows: List[Tuple[str, str, str, str, str]]):
+        for topic, event_id, _, _, processed_at in rows:
+            self._track(topic, event_id, epoch(processed_at))
+    
+    async def prune(self, db: aiosqlite.Connection, cutoff: str):
+        pass
+    
+    async def load(self, progress: Optional[Callable[[int, int], None]] = None, chunk: int = 50000):
+        # Warm-up step: track keys that were on disk at initialize().
+        topics = [topic for topic in await self.store.get_topics() if self.rules.get(topic) is not None]
+        for done, topic in enumerate(topics):
+            after = ""
+            while True:
+                cursor = await self._db.execute(
+                    """
+                    SELECT event_id, processed_at FROM processed_events
+                    WHERE topic = ? AND event_id > ? AND processed_at < ?
+                    ORDER BY event_id LIMIT ?
+                    """,
+                    (topic, after, self._cutoff, chunk)
+                )
+                rows = await cursor.fetchall()
+                for event_id, processed_at in rows:
+                    self._track(topic, event_id, epoch(processed_at))
+                self.stats['loaded'] += len(rows)
+                if len(rows) < chunk:
+                    break
+                after = rows[-1][0]
+            if progress is not None:
+                progress(done + 1, len(topics))
+        self.loaded = True
+        logger.info(f"DedupWindows loaded {self.stats['loaded']} keys from {len(topics)} topics")
+    
+    async def start(self):
+        self.running = True
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        while self.running:
+            try:
+                await self.expire()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Dedup window expiry failed: {e}", exc_info=True)
+            await asyncio.sleep(self.tick)
+    
+    async def expire(self, now: Optional[float] = None) -> int:
+        expired = self.wheel.advance(time.time() if now is None else now)
+        if self._due:
+            expired.extend(self._due)
+            self._due = []
+        self.stats['expired'] += len(expired)
+        
+        # Batches keep each transaction, and so each wait for the consumer, short.
+        # Memory keeps a key until it is gone from disk, so a repeat arriving
+        # meanwhile is still checked against SQLite rather than taken as new.
+        deleted = 0
+        tables = await self._failure_tables() if expired else []
+        for start in range(0, len(expired), self.batch_size):
+            batch = expired[start:start + self.batch_size]
+            held = await self._held(batch, tables)
+            if held:
+                self._rearm(held, now)
+                batch = [key for key in batch if key not in held]
+            deleted += await self.store.delete_keys(batch)
+            self.keys.difference_update(batch)
+        self.stats['deleted'] += deleted
+        if deleted:
+            logger.debug(f"Expired {deleted} dedup keys")
+        return deleted
+    
+    async def _failure_tables(self) -> List[str]:
+        # EventRetries' tables, when it is registered.
+        cursor = await self.store.reader.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('event_retries', 'dead_letters')"
+        )
+        return [row[0] for row in await cursor.fetchall()]
+    
+    async def _held(self, keys: List[Tuple[str, str]], tables: List[str]) -> Set[Tuple[str, str]]:
+        # Keys whose event has not been handled yet (in flight, waiting for a
+        # retry or dead-lettered). Deleting their row would let a redelivered copy
+        # in as new while the first is still pending.
+        held: Set[Tuple[str, str]] = set()
+        for table in tables:
+            for start in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[start:start + LOOKUP_CHUNK]
+                placeholders = ",".join("(?, ?)" for _ in chunk)
+                cursor = await self.store.reader.execute(
+                    f"SELECT t.topic, t.event_id FROM (VALUES {placeholders}) AS v "
+                    f"JOIN {table} AS t ON t.topic = v.column1 AND t.event_id = v.column2",
+                    [value for key in chunk for value in key]
+                )
+                held.update(await cursor.fetchall())
+        return held
+    
+    def _rearm(self, keys: Set[Tuple[str, str]], now: Optional[float]):
+        # Checked again one window later.
+        now = time.time() if now is None else now
+        for key in keys:
+            self.wheel.add(now + max(self.rules.get(key[0]) or 0, self.tick), key)
+        self.stats['held'] += len(keys)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'windows': self.rules.rules,
+            'tracked': len(self.keys),
+            'loaded': self.loaded,
+            'keys_loaded': self.stats['loaded'],
+            'expired': self.stats['expired'],
+            'deleted': self.stats['deleted'],
+            'held': self.stats['held'],
+        }
@@ -0,0 +1,103 @@
+import hashlib
+import logging
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+import aiosqlite
+from src import codec
+from src.config import TopicRules
+from src.models import EventRecord
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SIZE = 16
+
+# Keys per VALUES lookup, as in DedupStore.
+LOOKUP_CHUNK = 400
+
+
+def fingerprint_batch(records: Sequence[EventRecord]) -> List[bytes]:
+    # blake2b-128 over (topic, source, timestamp) as a JSON array followed by the
+    # payload bytes. Payloads must be canonical (EventRecord.from_event with
+    # canonical=True); one pass over the batch with the hasher bound locally.
+    blake2b = hashlib.blake2b
+    dumps = codec.dumps
+    return [
+        blake2b(dumps((r.topic, r.source, r.timestamp)) + r.payload, digest_size=DIGEST_SIZE).digest()
+        for r in records
+    ]
+
+
+class FingerprintIndex:
+    # Content dedup for producers that regenerate event_id on retry: for the
+    # configured topics an event is also a duplicate when an event with the same
+    # (topic, source, timestamp, payload) is stored. Kept by DedupStore as a
+    # writer; event_fingerprints maps (topic, fingerprint) to the event_id it was
+    # stored under, and lookups join back to processed_events so keys deleted
+    # there (dedup windows, rebalance) stop matching at once.
+    
+    def __init__(self, topics: Iterable[str]):
+        self.rules: TopicRules[bool] = TopicRules({pattern: True for pattern in topics}, default=False)
+        self._db: Optional[aiosqlite.Connection] = None
+    
+    def applies(self, topic: str) -> bool:
+        return self.rules.get(topic)
+    
+    def stamp(self, records: Sequence[EventRecord]):
+        # Sets record.fingerprint on records of fingerprinted topics.
+        selected = [record for record in records if self.rules.get(record.topic)]
+        for record, digest in zip(selected, fingerprint_batch(selected)):
+            record.fingerprint = digest
+    
+    async def create_schema(self, db: aiosqlite.Connection):
+        self._db = db
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS event_fingerprints (
+                topic TEXT NOT NULL,
+                fingerprint BLOB NOT NULL,
+                event_id TEXT NOT NULL,
+                processed_at TEXT NOT NULL,
+                PRIMARY KEY (topic, fingerprint)
+            ) WITHOUT ROWID
+        """)
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_fingerprints_processed_at
+            ON event_fingerprints(processed_at)
+        """)
+        logger.info(f"FingerprintIndex initialized for topics: {list(self.rules.rules)}")
+    
+    async def write_batch(self, db: aiosqlite.Connection, records: List[EventRecord], processed_at: str):
+        rows = [
+            (record.topic, record.fingerprint, record.event_id, processed_at)
+            for record in records if record.fingerprint is not None
+        ]
+        if rows:
+            # REPLACE: an older row whose event was deleted no longer matches.
+            await db.executemany(
+                """
+                INSERT OR REPLACE INTO event_fingerprints (topic, fingerprint, event_id, processed_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                rows
+            )
+    
+    async def import_batch(self, db: aiosqlite.Connection, rows: List[Tuple[str, str, str, str, str]]):
+        # Imported keys carry no payload to fingerprint.
+        pass
+    
+    async def prune(self, db: aiosqlite.Connection, cutoff: str):
+        await db.execute("DELETE FROM event_fingerprints WHERE processed_at < ?", (cutoff,))
+    
+    async def get_existing(self, keys: Iterable[Tuple[str, bytes]]) -> Set[Tuple[str, bytes]]:
+        keys = list(dict.fromkeys(keys))
+        existing: Set[Tuple[str, bytes]] = set()
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[start:start + LOOKUP_CHUNK]
+            placeholders = ",".join("(?, ?)" for _ in chunk)
+            params = [value for key in chunk for value in key]
+            cursor = await self._db.execute(
+                f"SELECT f.topic, f.fingerprint FROM (VALUES {placeholders}) AS v "
+                f"JOIN event_fingerprints AS f ON f.topic = v.column1 AND f.fingerprint = v.column2 "
+                f"JOIN processed_events AS p ON p.topic = f.topic AND p.event_id = f.event_id",
+                params
+            )
+            existing.update(await cursor.fetchall())
+        return existing
@@ -7,20 +7,46 @@ if __name__ == "__main__":
 
 import asyncio
 import logging
+import math
+import os
+import socket
+import time
 from contextlib import asynccontextmanager
-from datetime import datetime
-from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 
 from src.models import (
-    Event, EventBatch, PublishResponse, 
-    EventsResponse, StatsResponse
+    Event, EventBatch, EventRecord, PublishResponse, 
+    EventsResponse, StatsResponse, SearchResponse,
+    RollupsResponse, ClusterKeys
 )
 from src.event_queue import EventQueue
 from src.dedup_store import DedupStore
 from src.consumer import EventConsumer
+from src.config import env_topic_map, parse_duration
+from src.subscriptions import SubscriptionHub
+from src.search import ORDERS, SearchIndex
+from src.rollups import GROUPINGS, RESOLUTIONS, RollupStore
+from src.warmup import Warmup
+from src.replication import ROLES, ChangeLog, ChangelogTrimmed, Replicator
+from src.snapshot import Snapshotter
+from src.expiry import DedupWindows
+from src.fingerprint import FingerprintIndex
+from src import cold_keys
+from src.cold_keys import ColdKeyIndex
+from src.response_cache import ResponseCache
+from src.rate_limit import AdmissionControl
+from src.http_encoding import encode_body, json_response, preferred_encoding
+from src import analytics, codec
+from src.retry import RetryScheduler
+from src.diagnostics import LoopMonitor, format_collapsed, sample_stacks
+from src import runtime
+
+if TYPE_CHECKING:
+    from src.cluster import Cluster
 
 logging.basicConfig(
     level=logging.INFO,
@@ -31,36 +57,230 @@ logger = logging.getLogger(__name__)
 queue: EventQueue
 dedup_store: DedupStore
 consumer: EventConsumer
+retries: RetryScheduler
+subscriptions: SubscriptionHub
+search_index: SearchIndex
+rollups: RollupStore
+warmup: Warmup
+cluster: Optional["Cluster"] = None
+changelog: ChangeLog
+replicator: Optional[Replicator] = None
+replication_role: str = ""
+snapshotter: Snapshotter
+dedup_windows: Optional[DedupWindows] = None
+fingerprints: Optional[FingerprintIndex] = None
+cold_key_index: Optional[ColdKeyIndex] = None
+response_cache: ResponseCache
+admission: AdmissionControl
+loop_monitor: LoopMonitor
+profile_lock: asyncio.Lock
 start_time: datetime
 received_count: int = 0
+draining: bool = False
+drain_report: Optional[dict] = None
+drain_lock: asyncio.Lock
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global queue, dedup_store, consumer, start_time, received_count
+    global queue, dedup_store, consumer, subscriptions, search_index, rollups, start_time, received_count
+    global draining, drain_report, drain_lock, warmup, cluster
+    global changelog, replicator, replication_role, snapshotter, dedup_windows, fingerprints, response_cache
+    global admission, loop_monitor, profile_lock, retries, cold_key_index
     
     logger.info("Starting Log Aggregator service...")
     
     start_time = datetime.utcnow()
     received_count = 0
+    draining = False
+    drain_report = None
+    drain_lock = asyncio.Lock()
+    profile_lock = asyncio.Lock()
+    loop_monitor = LoopMonitor(
+        interval=float(os.getenv("LOOP_MONITOR_INTERVAL", "0.1")),
+        slow_threshold=float(os.getenv("SLOW_CALLBACK_MS", "100")) / 1000,
+    )
+    await loop_monitor.start()
     
-    dedup_store = DedupStore(db_path="data/dedup.db")
-    await dedup_store.initialize()
+    dedup_store = DedupStore(db_path=os.getenv("DATABASE_PATH", "data/dedup.db"))
+    search_index = SearchIndex(
+        topics=os.getenv("SEARCH_TOPICS", "*"),
+        fields=[f for f in os.getenv("SEARCH_FIELDS", "").split(",") if f.strip()],
+    )
+    dedup_store.add_writer(search_index)
+    rollups = RollupStore(
+        minute_retention=timedelta(hours=float(os.getenv("ROLLUP_MINUTE_RETENTION_HOURS", "48")))
+    )
+    dedup_store.add_writer(rollups)
+    replication_role = os.getenv("REPLICATION_ROLE", "")
+    if replication_role and replication_role not in ROLES:
+        raise ValueError(f"Unknown REPLICATION_ROLE '{replication_role}', expected one of {ROLES}")
+    changelog = ChangeLog(
+        dedup_store,
+        enabled=bool(replication_role),
+        retain=int(os.getenv("REPLICATION_RETAIN", "1000000")),
+    )
+    dedup_store.add_writer(changelog)
+    windows = env_topic_map("DEDUP_WINDOWS", parse_duration)
+    dedup_windows = None
+    if windows:
+        dedup_windows = DedupWindows(
+            dedup_store,
+            windows,
+            tick=float(os.getenv("DEDUP_WINDOW_TICK", "1")),
+            batch_size=int(os.getenv("DEDUP_WINDOW_BATCH", "5000")),
+        )
+        dedup_store.add_writer(dedup_windows)
+        dedup_store.add_key_index(dedup_windows)
+    cold_key_index = None
+    cold_dir = os.getenv("COLD_KEYS_DIR", "")
+    if cold_dir and not cold_keys.available():
+        logger.warning("COLD_KEYS_DIR is set but numpy is not installed; cold-key snapshot disabled")
+    elif cold_dir:
+        cold_key_index = ColdKeyIndex(
+            dedup_store,
+            cold_dir,
+            interval=float(os.getenv("COLD_KEYS_INTERVAL", "3600")),
+            min_delta=int(os.getenv("COLD_KEYS_MIN_DELTA", "100000")),
+        )
+        dedup_store.add_writer(cold_key_index)
+        dedup_store.add_key_index(cold_key_index)
+    fingerprint_topics = [t.strip() for t in os.getenv("DEDUP_FINGERPRINT_TOPICS", "").split(",") if t.strip()]
+    fingerprints = None
+    if fingerprint_topics:
+        fingerprints = FingerprintIndex(fingerprint_topics)
+        dedup_store.add_writer(fingerprints)
+        dedup_store.set_fingerprints(fingerprints)
+    response_cache = ResponseCache(
+        max_entries=int(os.getenv("RESPONSE_CACHE_ENTRIES", "1024")),
+        max_bytes=int(os.getenv("RESPONSE_CACHE_BYTES", str(32 * 1024 * 1024))),
+    )
+    dedup_store.add_commit_listener(response_cache.invalidate)
     
-    queue = EventQueue(maxsize=10000)
+    queue = EventQueue(
+        maxsize=10000,
+        mode=os.getenv("QUEUE_MODE", "fifo"),
+        topic_weights=env_topic_map("QUEUE_TOPIC_WEIGHTS", float),
+        topic_priorities=env_topic_map("QUEUE_TOPIC_PRIORITIES", int),
+        topic_capacities=env_topic_map("QUEUE_TOPIC_CAPACITY", int),
+    )
     
     consumer = EventConsumer(queue, dedup_store)
+    # Handler failures; a writer for its tables, so added before initialize().
+    retries = RetryScheduler(
+        dedup_store,
+        consumer.handle_event,
+        max_attempts=int(os.getenv("RETRY_MAX_ATTEMPTS", "5")),
+        base_delay=float(os.getenv("RETRY_BASE_DELAY", "1")),
+        max_delay=float(os.getenv("RETRY_MAX_DELAY", "300")),
+    )
+    dedup_store.add_writer(retries)
+    consumer.set_retries(retries)
+    await dedup_store.initialize()
+    snapshotter = Snapshotter(
+        dedup_store.db_path,
+        os.getenv("SNAPSHOT_DIR", "data/snapshots"),
+        pages_per_step=int(os.getenv("SNAPSHOT_PAGES_PER_STEP", "256")),
+        step_pause=float(os.getenv("SNAPSHOT_STEP_PAUSE", "0.01")),
+    )
+    
+    admission = AdmissionControl(
+        source_rates=env_topic_map("PUBLISH_SOURCE_RATES", float),
+        topic_rates=env_topic_map("PUBLISH_TOPIC_RATES", float),
+        burst=float(os.getenv("PUBLISH_BURST_SECONDS", "1")),
+        max_keys=int(os.getenv("PUBLISH_RATE_KEYS", "10000")),
+    )
+    
+    subscriptions = SubscriptionHub(
+        history_size=int(os.getenv("SUBSCRIBE_HISTORY", "10000")),
+        buffer_size=int(os.getenv("SUBSCRIBE_BUFFER", "1000")),
+    )
+    
+    consumer.add_listener(subscriptions.publish)
+    consumer.add_listener(changelog.notify)
+    retries.add_listener(subscriptions.publish)
+    await retries.start()
     await consumer.start()
     
+    replicator = None
+    if replication_role == "standby":
+        replicator = Replicator(
+            primary_url=os.getenv("REPLICATION_PRIMARY", ""),
+            store=dedup_store,
+            standby_id=os.getenv("REPLICATION_STANDBY_ID", socket.gethostname()),
+            batch_size=int(os.getenv("REPLICATION_BATCH", "5000")),
+        )
+        await replicator.start()
+    
+    cluster = None
+    nodes = [node.strip() for node in os.getenv("CLUSTER_NODES", "").split(",") if node.strip()]
+    if nodes:
+        # Imported here so single-node deployments do not pay for httpx.
+        from src.cluster import Cluster
+        cluster = Cluster(
+            self_url=os.getenv("CLUSTER_SELF", ""),
+            nodes=nodes,
+            vnodes=int(os.getenv("CLUSTER_VNODES", "128")),
+            secret=os.getenv("CLUSTER_SECRET", ""),
+        )
+        if not cluster.secret:
+            logger.warning(
+                "CLUSTER_SECRET is not set: a client naming a peer in X-Cluster-Forwarded "
+                "skips rate limits and can import dedup keys"
+            )
+    
+    # Everything above is constant-time, so the service is live right away;
+    # warm-up scales with the database and runs behind GET /ready.
+    warmup = Warmup()
+    warmup.add_step("dedup_index", dedup_store.warm)
+    if dedup_windows is not None:
+        await dedup_windows.start()
+        warmup.add_step("dedup_windows", dedup_windows.load)
+    if cold_key_index is not None:
+        await cold_key_index.start()
+        warmup.add_step("cold_keys", cold_key_index.load)
+    if os.getenv("WARMUP_INTEGRITY_CHECK", "false").lower() in ("1", "true", "yes"):
+        warmup.add_step("integrity_check", lambda progress: dedup_store.integrity_check())
+    warmup.add_step("openapi", lambda progress: asyncio.to_thread(app.openapi))
+    warmup.start()
+    
     logger.info("Log Aggregator service started successfully")
     
     yield
     
     logger.info("Shutting down Log Aggregator service...")
-    await consumer.stop()
+    await warmup.stop()
+    if dedup_windows is not None:
+        await dedup_windows.stop()
+    if cold_key_index is not None:
+        await cold_key_index.stop()
+    if replicator is not None:
+        await replicator.stop()
+    await snapshotter.stop()
+    await drain()
+    await retries.stop()
+    if cluster is not None:
+        await cluster.close()
+    await dedup_store.close()
+    await loop_monitor.stop()
     logger.info("Log Aggregator service stopped")
 
 
+async def drain() -> dict:
+    # Refuse new events, flush the queue through the consumer within
+    # DRAIN_TIMEOUT seconds, then checkpoint the dedup store to disk. Runs from
+    # POST /drain (e.g. a pre-stop hook) and again, as a no-op, at shutdown.
+    global draining, drain_report
+    
+    async with drain_lock:
+        if drain_report is None:
+            draining = True
+            report = await consumer.drain(timeout=float(os.getenv("DRAIN_TIMEOUT", "30")))
+            await dedup_store.checkpoint()
+            drain_report = report
+    return drain_report
+
+
 app = FastAPI(
     title="Log Aggregator Service",
     description="Pub-Sub log aggregator with idempotent processing and deduplication",
@@ -79,42 +299,144 @@ async def root():
             "publish": "POST /publish",
             "events": "GET /events?topic=...",
             "stats": "GET /stats",
-            "health": "GET /health"
+            "subscribe": "GET /subscribe?topic=...",
+            "search": "GET /search?q=...",
+            "rollups": "GET /rollups?topic=...",
+            "analytics": "GET /analytics?topic=...",
+            "health": "GET /health",
+            "ready": "GET /ready",
+            "drain": "POST /drain",
+            "cluster_rebalance": "POST /cluster/rebalance",
+            "replication": "GET /replication",
+            "snapshot": "POST /snapshot",
+            "dead_letters": "GET /dlq",
+            "redrive": "POST /dlq/redrive"
         }
     }
 
 
+async def publish_local(events: List[Event]) -> Tuple[int, int]:
+    existing = await dedup_store.get_existing((e.topic, e.event_id) for e in events)
+    
+    duplicates = 0
+    fresh = []
+    for event in events:
+        if (event.topic, event.event_id) in existing:
+            duplicates += 1
+            logger.info(
+                f"Duplicate rejected at publish: "
+                f"topic={event.topic}, event_id={event.event_id}"
+            )
+            continue
+        canonical = fingerprints is not None and fingerprints.applies(event.topic)
+        fresh.append(EventRecord.from_event(event, canonical=canonical))
+    
+    if fingerprints is not None:
+        # Content duplicates of stored events; duplicates within the batch are
+        # left to the consumer, as for keys.
+        fingerprints.stamp(fresh)
+        stored = await fingerprints.get_existing(
+            (r.topic, r.fingerprint) for r in fresh if r.fingerprint is not None
+        )
+        if stored:
+            kept = []
+            for record in fresh:
+                if (record.topic, record.fingerprint) in stored:
+                    duplicates += 1
+                    logger.info(
+                        f"Duplicate content rejected at publish: "
+                        f"topic={record.topic}, event_id={record.event_id}"
+                    )
+                    continue
+                kept.append(record)
+            fresh = kept
+    
+    accepted = await queue.enqueue_batch(fresh)
+    if accepted < len(fresh):
+        logger.warning(f"Failed to enqueue {len(fresh) - accepted} events")
+    return accepted, duplicates
+
+
+async def publish_cluster(events: List[Event]) -> Tuple[int, int]:
+    # Split by owner; the local part is published directly and the rest goes
+    # to the owners concurrently, one sub-batch per node.
+    parts = cluster.ring.partition((e.topic, e.event_id, e) for e in events)
+    local = parts.pop(cluster.self_url, [])
+    remote = {node: [e.model_dump() for e in node_events] for node, node_events in parts.items()}
+    
+    (accepted, duplicates), outcome = await asyncio.gather(
+        publish_local(local),
+        cluster.forward_all(remote)
+    )
+    
+    failed = []
+    for node, result in outcome.items():
+        if isinstance(result, Exception):
+            failed.append(node)
+            continue
+        accepted += result["accepted"]
+        duplicates += result["duplicates"]
+    
+    if failed:
+        # The rest of the batch is already accepted; a retry of the whole batch
+        # is safe because those events are rejected as duplicates.
+        raise HTTPException(
+            status_code=503,
+            detail=f"Owner nodes unavailable: {failed}, retry the batch",
+            headers={"Retry-After": "1"}
+        )
+    return accepted, duplicates
+
+
 @app.post("/publish", response_model=PublishResponse)
-async def publish_events(event_or_batch: Event | EventBatch):
+async def publish_events(
+    event_or_batch: Event | EventBatch,
+    x_cluster_forwarded: Optional[str] = Header(None),
+    x_cluster_secret: Optional[str] = Header(None)
+):
     global received_count
     
+    if draining:
+        raise HTTPException(
+            status_code=503,
+            detail="Service is draining, not accepting events",
+            headers={"Retry-After": "5"}
+        )
+    
+    if replication_role == "standby":
+        raise HTTPException(
+            status_code=503,
+            detail="Standby node, publish to the primary or promote this node",
+            headers={"Retry-After": "1"}
+        )
+    
     if isinstance(event_or_batch, Event):
         events = [event_or_batch]
     else:
         events = event_or_batch.events
     
-    received = len(events)
-    received_count += received
+    # A peer's forward is handled as sent; anything else, whatever its headers,
+    # enters the cluster here.
+    forwarded = cluster is not None and cluster.trusts(x_cluster_forwarded, x_cluster_secret)
+    if not forwarded:
+        # Limited where the client sent it; forwarded parts were admitted there.
+        wait = admission.admit(events)
+        if wait > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Publish rate limit exceeded for this source or topic",
+                headers={"Retry-After": str(math.ceil(min(wait, 3600)))}
+            )
     
-    accepted = 0
-    duplicates = 0
+    received = len(events)
+    if not forwarded:
+        # Counted where the client sent it, so cluster-wide sums count it once.
+        received_count += received
     
-    for event in events:
-        is_dup = await dedup_store.is_duplicate(event.topic, event.event_id)
-        
-        if is_dup:
-            duplicates += 1
-            logger.info(
-                f"Duplicate rejected at publish: "
-                f"topic={event.topic}, event_id={event.event_id}"
-            )
-            continue
-        
-        enqueued = await queue.enqueue(event)
-        if enqueued:
-            accepted += 1
-        else:
-            logger.warning(f"Failed to enqueue event: {event.topic}/{event.event_id}")
+    if cluster is not None and not forwarded:
+        accepted, duplicates = await publish_cluster(events)
+    else:
+        accepted, duplicates = await publish_local(events)
     
     logger.info(
         f"Published: received={received}, accepted={accepted}, duplicates={duplicates}"
@@ -128,39 +450,237 @@ async def publish_events(event_or_batch: Event | EventBatch):
     )
 
 
+async def gather_peers(path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    results = await cluster.gather(path, params)
+    failed = [node for node, result in results.items() if isinstance(result, Exception)]
+    if failed:
+        raise HTTPException(status_code=503, detail=f"Cluster nodes unavailable: {failed}")
+    return results
+
+
+def cacheable(x_cluster_forwarded: Optional[str]) -> bool:
+    # Versions only cover this node's commits; scatter-gather results are not cached.
+    return response_cache.enabled and (cluster is None or x_cluster_forwarded is not None)
+
+
 @app.get("/events", response_model=EventsResponse)
 async def get_events(
     topic: str = Query(..., description="Topic to filter events"),
-    limit: Optional[int] = Query(100, ge=1, le=1000, description="Maximum number of events to return")
+    limit: Optional[int] = Query(100, ge=1, le=1000, description="Maximum number of events to return"),
+    x_cluster_forwarded: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None)
 ):
+    # Rows are serialized straight to JSON bytes: at limit=1000 building Event
+    # models and re-validating them against response_model was most of the
+    # request. response_model still documents the shape.
+    encoding = preferred_encoding(accept_encoding)
+    headers = None
+    cached = cacheable(x_cluster_forwarded)
+    if cached:
+        # Unchanged since the client's copy, or since the cached body was built:
+        # answered without touching SQLite. Bodies are cached encoded.
+        key = ("events", topic, limit, encoding)
+        version = response_cache.version(topic)
+        headers = {"ETag": response_cache.etag(version)}
+        if response_cache.not_modified(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        hit = response_cache.get(key, version)
+        if hit is not None:
+            return json_response(*hit, headers=headers)
+    
     try:
         event_tuples = await dedup_store.get_events_by_topic(topic, limit)
         
-        events = []
-        for event_id, timestamp, source, processed_at in event_tuples:
-            events.append(
-                Event(
-                    topic=topic,
-                    event_id=event_id,
-                    timestamp=timestamp,
-                    source=source,
-                    payload={"processed_at": processed_at}
+        if cluster is not None and x_cluster_forwarded is None:
+            # Each node returns its newest `limit`; the merged newest `limit` is
+            # among them.
+            for result in (await gather_peers("/events", {"topic": topic, "limit": limit})).values():
+                event_tuples.extend(
+                    (e["event_id"], e["timestamp"], e["source"], e["payload"]["processed_at"])
+                    for e in result["events"]
                 )
-            )
+            event_tuples = sorted(event_tuples, key=lambda row: row[3], reverse=True)[:limit]
         
-        return EventsResponse(
-            topic=topic,
-            count=len(events),
-            events=events
-        )
+        body = codec.dumps({
+            "topic": topic,
+            "count": len(event_tuples),
+            "events": [
+                {
+                    "topic": topic,
+                    "event_id": event_id,
+                    "timestamp": timestamp,
+                    "source": source,
+                    "payload": {"processed_at": processed_at},
+                }
+                for event_id, timestamp, source, processed_at in event_tuples
+            ],
+        })
+        body, body_encoding = encode_body(body, encoding)
+        if cached:
+            response_cache.put(key, version, (body, body_encoding), len(body))
+        return json_response(body, body_encoding, headers=headers)
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting events for topic {topic}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/search", response_model=SearchResponse)
+async def search_events(
+    q: str = Query(..., min_length=1, description="Search terms, all must match"),
+    topic: Optional[str] = Query(None, description="Only events of this topic"),
+    since: Optional[str] = Query(None, description="Only events processed at or after this ISO8601 time"),
+    limit: int = Query(50, ge=1, le=1000, description="Maximum number of results"),
+    order: str = Query("time", description=f"One of {ORDERS}: newest first or best match first"),
+    raw: bool = Query(False, description="Pass q to FTS5 unquoted (operators, column filters)"),
+    accept_encoding: Optional[str] = Header(None)
+):
+    if not search_index.enabled:
+        raise HTTPException(status_code=503, detail="Full-text search is not available")
+    
+    if since:
+        since = parse_utc(since, "since").isoformat()
+    
+    started = time.perf_counter()
+    try:
+        hits = await search_index.search(q, topic=topic, since=since, limit=limit, order=order, raw=raw)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    body = codec.dumps({
+        "query": q,
+        "order": order,
+        "count": len(hits),
+        "took_ms": (time.perf_counter() - started) * 1000,
+        "results": hits,
+    })
+    return json_response(*encode_body(body, preferred_encoding(accept_encoding)))
+
+
+def parse_utc(value: str, name: str) -> datetime:
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be in ISO8601 format")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+@app.get("/rollups", response_model=RollupsResponse)
+async def get_rollups(
+    topic: Optional[str] = Query(None, description="Topic or glob pattern"),
+    source: Optional[str] = Query(None, description="Only this source"),
+    since: Optional[str] = Query(None, description="Start of range, ISO8601 (default: 24h ago)"),
+    until: Optional[str] = Query(None, description="End of range, ISO8601 (default: now)"),
+    resolution: Optional[str] = Query(None, description=f"One of {RESOLUTIONS} (default: by range and retention)"),
+    group_by: str = Query("topic", description=f"One of {GROUPINGS}"),
+    accept_encoding: Optional[str] = Header(None)
+):
+    end = parse_utc(until, "until") if until else datetime.utcnow()
+    start = parse_utc(since, "since") if since else end - timedelta(hours=24)
+    
+    if resolution is None:
+        # Minute buckets only exist inside the retention window.
+        resolution = "minute" if start >= datetime.utcnow() - rollups.minute_retention else "hour"
+    
+    try:
+        buckets = await rollups.query(resolution, start, end, topic=topic, source=source, group_by=group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    body = codec.dumps({
+        "resolution": resolution,
+        "since": start.isoformat(),
+        "until": end.isoformat(),
+        "count": len(buckets),
+        "buckets": buckets,
+    })
+    return json_response(*encode_body(body, preferred_encoding(accept_encoding)))
+
+
+@app.get("/analytics")
+async def get_analytics(
+    topic: str = Query(..., min_length=1, description="Topic or glob pattern"),
+    since: Optional[str] = Query(None, description="Start of range, ISO8601 (default: 7d before until)"),
+    until: Optional[str] = Query(None, description="End of range, ISO8601 (default: now)"),
+    interval: str = Query("5m", description="Bucket width, e.g. 30s, 5m, 1h"),
+    by: Optional[str] = Query(None, description="'source' for counts per source and bucket"),
+    percentiles: str = Query("50,95,99", description="Inter-arrival percentiles, comma-separated"),
+    accept_encoding: Optional[str] = Header(None)
+):
+    # Event-time analysis over the stored events themselves, for questions the
+    # rollups (processing time, fixed resolutions) do not answer.
+    if not analytics.available():
+        raise HTTPException(status_code=503, detail="Analytics needs numpy (pip install numpy)")
+    if by not in (None, "source"):
+        raise HTTPException(status_code=400, detail="by must be 'source'")
+    
+    end = parse_utc(until, "until") if until else datetime.utcnow()
+    start = parse_utc(since, "since") if since else end - timedelta(days=7)
+    try:
+        interval_s = parse_duration(interval)
+        quantiles = [float(q) for q in percentiles.split(",") if q.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="interval must be a duration and percentiles numbers")
+    if any(not 0 <= q <= 100 for q in quantiles):
+        raise HTTPException(status_code=400, detail="percentiles must be between 0 and 100")
+    
+    started = time.perf_counter()
+    try:
+        result = await asyncio.to_thread(
+            analytics.analyze,
+            dedup_store.db_path, topic, start, end, interval_s,
+            by_source=by == "source", percentiles=quantiles
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    result["took_ms"] = (time.perf_counter() - started) * 1000
+    return json_response(*encode_body(codec.dumps(result), preferred_encoding(accept_encoding)))
+
+
+@app.get("/subscribe")
+async def subscribe(
+    topic: str = Query("*", description="Topic or glob pattern to follow"),
+    cursor: Optional[int] = Query(None, description="Resume after this event id"),
+    last_event_id: Optional[int] = Header(None)
+):
+    # Server-Sent Events; browsers resend the last id as Last-Event-ID on reconnect.
+    resume_from = last_event_id if last_event_id is not None else cursor
+    subscriber = subscriptions.subscribe(topic, resume_from)
+    
+    async def stream():
+        try:
+            async for chunk in subscriber.stream():
+                yield chunk
+        finally:
+            subscriptions.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/stats", response_model=StatsResponse)
-async def get_stats():
+async def get_stats(
+    x_cluster_forwarded: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    cached = cacheable(x_cluster_forwarded)
+    headers = None
+    if cached:
+        # The ETag covers the counters but not the uptime fields, which a 304
+        # leaves at the client's copy.
+        version = response_cache.version()
+        headers = {"ETag": response_cache.etag(version, received_count, consumer.stats['duplicates'])}
+        if response_cache.not_modified(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+    
     try:
         uptime = (datetime.utcnow() - start_time).total_seconds()
         uptime_hours = int(uptime // 3600)
@@ -168,35 +688,272 @@ async def get_stats():
         uptime_seconds = int(uptime % 60)
         uptime_human = f"{uptime_hours}h {uptime_minutes}m {uptime_seconds}s"
         
-        unique_processed = await dedup_store.get_processed_count()
-        topics = await dedup_store.get_topics()
+        # COUNT(*) and DISTINCT topic scan the table; cached until the next commit.
+        store_stats = response_cache.get("stats", version) if cached else None
+        if store_stats is None:
+            store_stats = (await dedup_store.get_processed_count(), await dedup_store.get_topics())
+            if cached:
+                response_cache.put("stats", version, store_stats, 64 + sum(len(t) for t in store_stats[1]))
+        unique_processed, topics = store_stats
+        topics = list(topics)
         consumer_stats = consumer.get_stats()
         duplicate_dropped = consumer_stats['duplicates']
+        received = received_count
+        nodes = None
+        
+        if cluster is not None and x_cluster_forwarded is None:
+            nodes = {cluster.self_url: unique_processed}
+            merged_topics = set(topics)
+            for node, result in (await gather_peers("/stats")).items():
+                received += result["received"]
+                unique_processed += result["unique_processed"]
+                duplicate_dropped += result["duplicate_dropped"]
+                merged_topics.update(result["topics"])
+                nodes[node] = result["unique_processed"]
+            topics = sorted(merged_topics)
         
-        return StatsResponse(
-            received=received_count,
+        response = StatsResponse(
+            received=received,
             unique_processed=unique_processed,
             duplicate_dropped=duplicate_dropped,
             topics=topics,
             uptime_seconds=uptime,
-            uptime_human=uptime_human
+            uptime_human=uptime_human,
+            nodes=nodes
         )
+        if headers is not None:
+            return Response(content=response.model_dump_json(), media_type="application/json", headers=headers)
+        return response
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting stats: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/drain")
+async def drain_events():
+    return await drain()
+
+
+@app.post("/snapshot", status_code=202)
+async def start_snapshot(incremental: bool = Query(True, description="Write only pages changed since the last snapshot")):
+    # Consistent online copy of the dedup database, taken in a worker thread;
+    # poll GET /snapshot for progress and the result.
+    if not snapshotter.start(incremental):
+        raise HTTPException(status_code=409, detail="A snapshot is already running")
+    return snapshotter.get_status()
+
+
+@app.get("/snapshot")
+async def snapshot_status():
+    return snapshotter.get_status()
+
+
+def require_cluster() -> "Cluster":
+    if cluster is None:
+        raise HTTPException(status_code=400, detail="Cluster mode is not enabled (CLUSTER_NODES)")
+    return cluster
+
+
+@app.post("/cluster/keys")
+async def import_cluster_keys(
+    body: ClusterKeys,
+    x_cluster_forwarded: Optional[str] = Header(None),
+    x_cluster_secret: Optional[str] = Header(None)
+):
+    # Receiving side of a rebalance: dedup history for keys this node now owns.
+    if not require_cluster().trusts(x_cluster_forwarded, x_cluster_secret):
+        raise HTTPException(status_code=403, detail="Only cluster peers may import keys")
+    imported = await dedup_store.import_keys([tuple(row) for row in body.rows])
+    return {"received": len(body.rows), "imported": imported}
+
+
+@app.post("/cluster/rebalance")
+async def rebalance_cluster(batch_size: int = Query(5000, ge=1, le=50000)):
+    # Run on every node after CLUSTER_NODES changed: dedup keys this node no
+    # longer owns are copied to their new owner, then deleted here.
+    require_cluster()
+    moved = kept = 0
+    after = ("", "")
+    
+    while True:
+        rows = await dedup_store.get_keys_after(after, batch_size)
+        if not rows:
+            break
+        after = (rows[-1][0], rows[-1][1])
+        
+        parts = cluster.ring.partition((row[0], row[1], row) for row in rows)
+        kept += len(parts.pop(cluster.self_url, []))
+        for node, node_rows in parts.items():
+            try:
+                await cluster.post_json(node, "/cluster/keys", {"rows": node_rows})
+            except Exception as e:
+                logger.error(f"Rebalance to {node} failed after moving {moved} keys: {e!r}")
+                raise HTTPException(
+                    status_code=502,
+                    detail=f"Rebalance to {node} failed after moving {moved} keys, safe to rerun"
+                )
+            await dedup_store.delete_keys([(row[0], row[1]) for row in node_rows])
+            moved += len(node_rows)
+    
+    logger.info(f"Rebalance complete: moved={moved}, kept={kept}")
+    return {"moved": moved, "kept": kept}
+
+
+@app.get("/replication/changes")
+async def replication_changes(
+    after: int = Query(0, ge=0, description="Last offset applied by the standby (acknowledges it)"),
+    limit: int = Query(5000, ge=1, le=50000),
+    wait: float = Query(0.0, ge=0.0, le=30.0, description="Long-poll seconds when there is nothing new"),
+    standby: Optional[str] = Query(None, description="Standby id, for lag reporting")
+):
+    if not changelog.enabled:
+        raise HTTPException(status_code=400, detail="Replication is not enabled (REPLICATION_ROLE)")
+    
+    if standby:
+        changelog.ack(standby, after)
+    try:
+        changes, head = await changelog.read_after(after, limit, wait)
+    except ChangelogTrimmed as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    await changelog.trim()
+    
+    return {"changes": changes, "head": head}
+
+
+@app.post("/replication/promote")
+async def promote_standby(timeout: float = Query(5.0, ge=0.0, le=300.0, description="Seconds to catch up first")):
+    # Turns a standby into a primary: a last catch-up from the old primary if it
+    # still answers, then replication stops and /publish is accepted.
+    global replicator, replication_role
+    
+    if replication_role != "standby" or replicator is None:
+        raise HTTPException(status_code=400, detail="Only a standby can be promoted")
+    
+    started = time.perf_counter()
+    caught_up = await replicator.catch_up(timeout)
+    status = replicator.get_status()
+    await replicator.stop()
+    replicator = None
+    # Standbys of the new primary follow its own log.
+    await changelog.enable()
+    replication_role = "primary"
+    
+    logger.warning(f"Promoted to primary at offset {status['offset']}, caught_up={caught_up}")
+    return {
+        "role": replication_role,
+        "offset": status["offset"],
+        "caught_up": caught_up,
+        "lag_at_promotion": status["lag"],
+        "duration_s": time.perf_counter() - started,
+    }
+
+
+@app.get("/replication")
+async def replication_status():
+    return {
+        "role": replication_role or None,
+        "changelog": await changelog.get_status() if changelog.enabled else None,
+        "replicator": replicator.get_status() if replicator is not None else None,
+    }
+
+
+@app.get("/dlq")
+async def list_dead_letters(
+    topic: Optional[str] = Query(None, description="Only this topic"),
+    after: int = Query(0, ge=0, description="Last id of the previous page"),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    # Events whose handler failed RETRY_MAX_ATTEMPTS times, oldest first.
+    entries = await retries.dead_letters(topic=topic, after=after, limit=limit)
+    return {
+        "total": retries.dead_count,
+        "entries": entries,
+        "next_after": entries[-1]["id"] if len(entries) == limit else None,
+    }
+
+
+@app.post("/dlq/redrive")
+async def redrive_dead_letters(
+    ids: Optional[List[int]] = Query(None, description="Dead-letter ids; all (of topic) when omitted"),
+    topic: Optional[str] = Query(None, description="Only this topic"),
+    limit: int = Query(1000, ge=1, le=100000)
+):
+    # Hands dead letters back to the handler now, with a fresh attempt budget.
+    redriven = await retries.redrive(ids=ids, topic=topic, limit=limit)
+    return {"redriven": redriven, "remaining": retries.dead_count}
+
+
+@app.get("/debug/loop")
+async def debug_loop():
+    # Lag histogram and the most recent slow callbacks with the loop thread's
+    # stack captured while it was blocked.
+    return loop_monitor.get_stats(detail=True)
+
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+async def debug_profile(
+    seconds: float = Query(5.0, gt=0, le=60.0, description="How long to sample"),
+    hz: float = Query(100.0, gt=0, le=1000.0, description="Samples per second"),
+    threads: str = Query("loop", description="'loop' for the event loop thread, 'all' for every thread")
+):
+    # Collapsed stacks ("frame;frame;frame count" per line) for flamegraph.pl or
+    # speedscope. The sampler runs in a worker thread; the loop keeps serving.
+    # Opt-in: it exposes code paths and costs CPU while it runs.
+    if os.getenv("DEBUG_PROFILE", "false").lower() not in ("1", "true", "yes"):
+        raise HTTPException(status_code=404, detail="Profiling is disabled (DEBUG_PROFILE)")
+    if threads not in ("loop", "all"):
+        raise HTTPException(status_code=400, detail="threads must be 'loop' or 'all'")
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    
+    async with profile_lock:
+        loop_thread = loop_monitor.loop_thread if threads == "loop" else None
+        stacks = await asyncio.to_thread(sample_stacks, seconds, hz, loop_thread)
+    return PlainTextResponse(format_collapsed(stacks))
+
+
+@app.get("/ready")
+async def readiness_check():
+    # Liveness is /health; this answers "send me traffic": warm-up done and not
+    # draining.
+    progress = warmup.progress()
+    ready = warmup.ready and not draining
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else ("draining" if draining else "starting"),
+            "warmup": progress,
+        }
+    )
+
+
 @app.get("/health")
 async def health_check():
     return {
-        "status": "healthy",
+        "status": "draining" if draining else "healthy",
+        "ready": warmup.ready and not draining,
         "consumer_running": consumer.running,
         "queue_size": queue.qsize(),
+        "queue_mode": queue.mode,
+        "drain": drain_report,
+        "cluster": cluster.get_stats() if cluster is not None else None,
+        "dedup_windows": dedup_windows.get_stats() if dedup_windows is not None else None,
+        "cold_keys": cold_key_index.get_stats() if cold_key_index is not None else None,
+        "response_cache": response_cache.get_stats(),
+        "rate_limits": admission.get_stats(),
+        "loop_lag": loop_monitor.get_stats(),
+        "retries": retries.get_stats(),
+        "runtime": runtime.describe(),
+        "replication": {
+            "role": replication_role or None,
+            "lag": replicator.get_status()["lag"] if replicator is not None else None,
+        },
         "timestamp": datetime.utcnow().isoformat()
     }
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8080)
+    sys.exit(runtime.main())
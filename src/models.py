@@ -1,7 +1,9 @@
+import sys
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from pydantic import BaseModel, Field, validator
 from enum import Enum
+from src import codec
 
 
 class EventPayload(BaseModel):
@@ -40,6 +42,50 @@ class Event(BaseModel):
         }
 
 
+class EventRecord:
+    # Compact form an event travels in between /publish and the handler: no
+    # pydantic machinery, interned topic/source (few distinct values, shared by
+    # every queued event) and the payload kept as the serialized bytes.
+    # fingerprint is set at /publish for topics deduplicated by content.
+    
+    __slots__ = ("topic", "event_id", "timestamp", "source", "payload", "fingerprint")
+    
+    def __init__(self, topic: str, event_id: str, timestamp: str, source: str, payload: bytes = b"{}"):
+        self.topic = sys.intern(topic)
+        self.event_id = event_id
+        self.timestamp = timestamp
+        self.source = sys.intern(source)
+        self.payload = payload
+        self.fingerprint: Optional[bytes] = None
+    
+    @classmethod
+    def from_event(cls, event: "Event", canonical: bool = False) -> "EventRecord":
+        # canonical: payload serialized with sorted keys, ready to fingerprint.
+        if not event.payload:
+            payload = b"{}"
+        elif canonical:
+            payload = codec.dumps_canonical(event.payload)
+        else:
+            payload = codec.dumps_exact(event.payload)
+        return cls(event.topic, event.event_id, event.timestamp, event.source, payload)
+    
+    def payload_dict(self) -> Dict[str, Any]:
+        return codec.loads(self.payload)
+    
+    def to_event(self) -> "Event":
+        # Fields were validated when the record was built; skip re-validation.
+        return Event.model_construct(
+            topic=self.topic,
+            event_id=self.event_id,
+            timestamp=self.timestamp,
+            source=self.source,
+            payload=self.payload_dict()
+        )
+    
+    def __repr__(self) -> str:
+        return f"EventRecord(topic={self.topic!r}, event_id={self.event_id!r})"
+
+
 class EventBatch(BaseModel):
     events: List[Event] = Field(..., min_items=1, description="List of events")
 
@@ -64,3 +110,43 @@ class StatsResponse(BaseModel):
     topics: List[str]
     uptime_seconds: float
     uptime_human: str
+    nodes: Optional[Dict[str, int]] = None
+
+
+class SearchHit(BaseModel):
+    topic: str
+    event_id: str
+    timestamp: str
+    source: str
+    processed_at: str
+    snippet: str
+    score: Optional[float] = None
+
+
+class SearchResponse(BaseModel):
+    query: str
+    order: str
+    count: int
+    took_ms: float
+    results: List[SearchHit]
+
+
+class RollupBucket(BaseModel):
+    bucket: str
+    topic: str
+    source: Optional[str] = None
+    count: int
+    sources: Optional[int] = None
+
+
+class RollupsResponse(BaseModel):
+    resolution: str
+    since: str
+    until: str
+    count: int
+    buckets: List[RollupBucket]
+
+
+class ClusterKeys(BaseModel):
+    # (topic, event_id, timestamp, source, processed_at) rows from processed_events.
+    rows: List[Tuple[str, str, str, str, str]]
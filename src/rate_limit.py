@@ -0,0 +1,125 @@
+import logging
+import math
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.config import TopicRules
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBuckets:
+    # One token bucket per key (a source or a topic), rate in events/s from glob
+    # rules, capacity `burst` seconds of rate. Buckets refill lazily when touched
+    # and may go into debt: a request is admitted once the bucket holds
+    # min(cost, capacity), so a batch larger than the burst still gets through,
+    # then keeps later requests out until the debt is repaid. Kept in LRU order
+    # so idle keys are cheap to find: a bucket idle long enough to have refilled
+    # is dropped without changing any outcome, and past max_keys the least
+    # recently used one goes (which can only forgive a debt).
+    
+    def __init__(self, rates: Dict[str, float], burst: float = 1.0, max_keys: int = 10000):
+        self.rules: TopicRules[Optional[float]] = TopicRules(rates)
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> [tokens, updated, rate]
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+    
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+    
+    def _bucket(self, key: str, rate: float, now: float) -> List[float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._evict(now)
+            bucket = self._buckets[key] = [rate * self.burst, now, rate]
+            return bucket
+        bucket[0] = min(rate * self.burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        self._buckets.move_to_end(key)
+        return bucket
+    
+    def _evict(self, now: float):
+        # At most a couple of entries per insert: O(1) amortized.
+        for _ in range(2):
+            if not self._buckets:
+                return
+            key, (tokens, updated, rate) = next(iter(self._buckets.items()))
+            full = rate * self.burst
+            if len(self._buckets) < self.max_keys and tokens + (now - updated) * rate < full:
+                return
+            del self._buckets[key]
+    
+    def wait(self, costs: Dict[str, int], now: float) -> float:
+        # Seconds until every key can take its cost; 0 when admitted now.
+        wait = 0.0
+        for key, cost in costs.items():
+            rate = self.rules.get(key)
+            if rate is None:
+                continue
+            if rate <= 0:
+                return math.inf
+            bucket = self._bucket(key, rate, now)
+            need = min(cost, rate * self.burst)
+            if bucket[0] < need:
+                wait = max(wait, (need - bucket[0]) / rate)
+        return wait
+    
+    def consume(self, costs: Dict[str, int], now: float):
+        for key, cost in costs.items():
+            rate = self.rules.get(key)
+            if rate is not None:
+                self._bucket(key, rate, now)[0] -= cost
+    
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionControl:
+    # Per-source and per-topic limits for /publish, all or nothing per request:
+    # a batch is admitted only when every source and topic in it is within its
+    # rate, and only then are tokens taken. A source with no matching rule is
+    # not limited.
+    
+    def __init__(
+        self,
+        source_rates: Dict[str, float],
+        topic_rates: Dict[str, float],
+        burst: float = 1.0,
+        max_keys: int = 10000
+    ):
+        self.sources = TokenBuckets(source_rates, burst, max_keys)
+        self.topics = TokenBuckets(topic_rates, burst, max_keys)
+        self.enabled = bool(self.sources or self.topics)
+        self.stats = {
+            'admitted': 0,
+            'rejected': 0,
+            'rejected_events': 0,
+        }
+    
+    def admit(self, events: Sequence[Any], now: Optional[float] = None) -> float:
+        # 0 when admitted, else seconds until it would be (inf for a zero rate).
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        sources = Counter(event.source for event in events) if self.sources else {}
+        topics = Counter(event.topic for event in events) if self.topics else {}
+        
+        wait = max(self.sources.wait(sources, now), self.topics.wait(topics, now))
+        if wait > 0:
+            self.stats['rejected'] += 1
+            self.stats['rejected_events'] += len(events)
+            return wait
+        
+        self.sources.consume(sources, now)
+        self.topics.consume(topics, now)
+        self.stats['admitted'] += 1
+        return 0.0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            **self.stats,
+            'buckets': len(self.sources) + len(self.topics),
+        }
@@ -0,0 +1,291 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import aiosqlite
+from src.dedup_store import DedupStore
+
+logger = logging.getLogger(__name__)
+
+ROLES = ("primary", "standby")
+OFFSET_STATE = "replication_offset"
+
+
+class ChangelogTrimmed(Exception):
+    pass
+
+
+class ChangeLog:
+    # Ordered log of dedup inserts for shipping to a standby. A trigger on
+    # processed_events appends to it, so every insert path (consumer batches,
+    # rebalance imports, applied replication) is logged in its own transaction.
+    # seq is the replication offset.
+    
+    def __init__(self, store: DedupStore, enabled: bool = True, retain: int = 1000000):
+        self.store = store
+        self.enabled = enabled
+        self.retain = retain
+        self.acks: Dict[str, Dict[str, float]] = {}
+        self._changed = asyncio.Event()
+        self._last_trim = 0.0
+    
+    async def create_schema(self, db: aiosqlite.Connection):
+        if not self.enabled:
+            # The trigger lives in the database file; drop it so a node taken out
+            # of replication stops paying for the log.
+            await db.execute("DROP TRIGGER IF EXISTS changelog_ai")
+            return
+        await self._install(db)
+    
+    async def enable(self):
+        # Starts logging on a running node, e.g. a standby promoted to primary
+        # that was not logging, so standbys of its own can follow it.
+        if self.enabled:
+            return
+        async with self.store.transaction() as db:
+            await self._install(db)
+        self.enabled = True
+    
+    async def _install(self, db: aiosqlite.Connection):
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS changelog (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                source TEXT NOT NULL,
+                processed_at TEXT NOT NULL
+            )
+        """)
+        
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS changelog_ai AFTER INSERT ON processed_events BEGIN
+                INSERT INTO changelog (topic, event_id, timestamp, source, processed_at)
+                VALUES (new.topic, new.event_id, new.timestamp, new.source, new.processed_at);
+            END
+        """)
+        logger.info(f"ChangeLog initialized with retention: {self.retain}")
+    
+    async def write_batch(self, db: aiosqlite.Connection, records: List[Any], processed_at: str):
+        # Rows come from the trigger; standbys are woken after commit by notify().
+        pass
+    
+    async def prune(self, db: aiosqlite.Connection, cutoff: str):
+        pass
+    
+    async def import_batch(self, db: aiosqlite.Connection, rows: List[Tuple[str, str, str, str, str]]):
+        # Imported rows are logged by the trigger like any other insert.
+        pass
+    
+    def notify(self, *args: Any):
+        self._changed.set()
+    
+    async def bounds(self) -> Tuple[int, int]:
+        # (earliest seq still held, head seq); (head + 1, head) when empty.
+        # Reads use the store's read-only connection: only committed changes
+        # may reach a standby, a rolled-back seq is handed out again.
+        cursor = await self.store.reader.execute(
+            "SELECT (SELECT MIN(seq) FROM changelog), "
+            "(SELECT seq FROM sqlite_sequence WHERE name = 'changelog')"
+        )
+        earliest, head = await cursor.fetchone()
+        head = head or 0
+        return (earliest if earliest is not None else head + 1), head
+    
+    async def read_after(self, offset: int, limit: int, wait: float = 0.0) -> Tuple[List[Tuple], int]:
+        earliest, head = await self.bounds()
+        if offset < earliest - 1:
+            raise ChangelogTrimmed(f"Offset {offset} is before the earliest retained change {earliest}")
+        
+        if offset >= head and wait > 0:
+            # Long poll: park until the consumer commits something new.
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+        
+        cursor = await self.store.reader.execute(
+            """
+            SELECT seq, topic, event_id, timestamp, source, processed_at
+            FROM changelog WHERE seq > ? ORDER BY seq LIMIT ?
+            """,
+            (offset, limit)
+        )
+        rows = await cursor.fetchall()
+        _, head = await self.bounds()
+        return rows, head
+    
+    def ack(self, standby: str, offset: int):
+        self.acks[standby] = {'offset': offset, 'at': time.monotonic()}
+    
+    async def trim(self, min_interval: float = 10.0):
+        # Keep the newest `retain` changes. A standby further behind than that
+        # has to be re-seeded from a backup.
+        now = time.monotonic()
+        if now - self._last_trim < min_interval:
+            return
+        self._last_trim = now
+        
+        _, head = await self.bounds()
+        cutoff = head - self.retain
+        if cutoff <= 0:
+            return
+        async with self.store.transaction() as db:
+            cursor = await db.execute("DELETE FROM changelog WHERE seq <= ?", (cutoff,))
+        if cursor.rowcount > 0:
+            logger.info(f"ChangeLog trimmed {cursor.rowcount} changes up to seq {cutoff}")
+    
+    async def get_status(self) -> Dict[str, Any]:
+        earliest, head = await self.bounds()
+        now = time.monotonic()
+        return {
+            'head': head,
+            'earliest': earliest,
+            'standbys': {
+                standby: {
+                    'acked': int(ack['offset']),
+                    'lag': head - int(ack['offset']),
+                    'last_seen_seconds': round(now - ack['at'], 3),
+                }
+                for standby, ack in self.acks.items()
+            },
+        }
+
+
+class Replicator:
+    # Standby side: pulls the primary's changelog in batches and applies it.
+    # The `after` of each pull is the acknowledgement of everything before it;
+    # the applied offset is stored with the rows, so a restart resumes exactly.
+    
+    def __init__(
+        self,
+        primary_url: str,
+        store: DedupStore,
+        standby_id: str,
+        batch_size: int = 5000,
+        poll_wait: float = 1.0,
+        client: Optional[Any] = None
+    ):
+        self.primary_url = primary_url.rstrip("/")
+        self.store = store
+        self.standby_id = standby_id
+        self.batch_size = batch_size
+        self.poll_wait = poll_wait
+        self.offset = 0
+        self.primary_head = 0
+        self.applied = 0
+        self.connected = False
+        self.last_error: Optional[str] = None
+        self.last_contact: Optional[float] = None
+        self.running = False
+        self._client = client
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(timeout=self.poll_wait + 10.0)
+        self.offset = await self.store.get_state(OFFSET_STATE)
+        self.running = True
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Replicator started: primary={self.primary_url}, offset={self.offset}")
+    
+    async def stop(self):
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        logger.info(f"Replicator stopped at offset {self.offset}")
+    
+    async def _run(self):
+        while self.running:
+            try:
+                await self.pull(wait=self.poll_wait)
+            except asyncio.CancelledError:
+                raise
+            except ChangelogTrimmed as e:
+                logger.error(f"Replication stopped, standby needs a re-seed: {e}")
+                self.last_error = str(e)
+                self.running = False
+            except Exception as e:
+                if self.connected or self.last_error is None:
+                    logger.warning(f"Replication pull from {self.primary_url} failed: {e!r}")
+                self.connected = False
+                self.last_error = repr(e)
+                await asyncio.sleep(1.0)
+    
+    async def pull(self, wait: float = 0.0) -> int:
+        response = await self._client.get(
+            f"{self.primary_url}/replication/changes",
+            params={
+                "after": self.offset,
+                "limit": self.batch_size,
+                "wait": wait,
+                "standby": self.standby_id,
+            },
+        )
+        if response.status_code == 410:
+            raise ChangelogTrimmed(response.json().get("detail"))
+        response.raise_for_status()
+        body = response.json()
+        
+        self.connected = True
+        self.last_error = None
+        self.last_contact = time.monotonic()
+        self.primary_head = body["head"]
+        
+        changes = body["changes"]
+        if changes:
+            offset = changes[-1][0]
+            await self.store.import_keys(
+                [tuple(change[1:]) for change in changes],
+                state={OFFSET_STATE: offset}
+            )
+            self.offset = offset
+            self.applied += len(changes)
+        return len(changes)
+    
+    async def catch_up(self, timeout: float) -> bool:
+        # Used on promotion: pull without waiting until the primary reports no
+        # more changes, it stops answering, or the timeout passes.
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if await asyncio.wait_for(self.pull(), timeout=max(0.01, deadline - time.monotonic())) == 0:
+                    return True
+            except Exception as e:
+                logger.warning(f"Final catch-up with {self.primary_url} failed: {e!r}")
+                return False
+        return False
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'primary': self.primary_url,
+            'running': self.running,
+            'connected': self.connected,
+            'offset': self.offset,
+            'primary_head': self.primary_head,
+            'lag': max(0, self.primary_head - self.offset),
+            'applied': self.applied,
+            'last_contact_seconds': (
+                round(time.monotonic() - self.last_contact, 3) if self.last_contact is not None else None
+            ),
+            'last_error': self.last_error,
+        }
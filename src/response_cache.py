@@ -0,0 +1,101 @@
+import logging
+import secrets
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    # Read-endpoint results keyed by query and validated by version instead of
+    # by time. DedupStore reports each commit with the topics it touched, which
+    # bumps those topics' counters and the global generation; an entry is only
+    # served while the version it was built under is current, so a hit is never
+    # staler than the last commit. Bounded by entry count and bytes, LRU.
+    # Versions are read before the query runs: a commit landing mid-query bumps
+    # them, so that result is never served as current.
+    
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = max_entries > 0
+        self.generation = 0
+        self.bytes = 0
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'not_modified': 0,
+            'evictions': 0,
+        }
+        self._resets = 0
+        self._topics: Dict[str, int] = {}
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, Any, int]]" = OrderedDict()
+        # Versions restart at zero with the process; the boot id keeps ETags
+        # handed out before a restart from matching.
+        self._boot = secrets.token_hex(4)
+    
+    def invalidate(self, topics: Optional[Iterable[str]] = None):
+        # DedupStore commit listener; None when any topic may have changed.
+        self.generation += 1
+        if topics is None:
+            self._resets += 1
+            self._topics.clear()
+            self._entries.clear()
+            self.bytes = 0
+            return
+        for topic in topics:
+            self._topics[topic] = self._topics.get(topic, 0) + 1
+    
+    def version(self, topic: Optional[str] = None) -> Hashable:
+        # Per topic for /events; the generation alone for whole-store results.
+        if topic is None:
+            return self.generation
+        return (self._resets, self._topics.get(topic, 0))
+    
+    def etag(self, version: Hashable, *extra: Any) -> str:
+        parts = version if isinstance(version, tuple) else (version,)
+        return '"' + "-".join(str(part) for part in (self._boot, *parts, *extra)) + '"'
+    
+    def not_modified(self, if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate.startswith("W/"):
+                candidate = candidate[2:]
+            if candidate == etag or candidate == "*":
+                self.stats['not_modified'] += 1
+                return True
+        return False
+    
+    def get(self, key: Hashable, version: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            self.stats['misses'] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return entry[1]
+    
+    def put(self, key: Hashable, version: Hashable, value: Any, size: int):
+        if not self.enabled or size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous[2]
+        self._entries[key] = (version, value, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+            self.stats['evictions'] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'generation': self.generation,
+            **self.stats,
+            'hit_ratio': round(self.stats['hits'] / lookups, 3) if lookups else None,
+        }
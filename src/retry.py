@@ -0,0 +1,366 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+import aiosqlite
+from src.dedup_store import DedupStore
+from src.models import EventRecord
+
+logger = logging.getLogger(__name__)
+
+# Handler runs started at once when many retries come due together.
+RETRY_BATCH = 100
+
+
+class RetryScheduler:
+    # Retries events whose handler raised, off the consumer path: due times sit
+    # in an in-memory heap and one task sleeps until the earliest, so a failing
+    # event never holds up the next batch. Delays grow exponentially (with
+    # jitter) up to max_delay; after max_attempts failed runs the event moves to
+    # dead_letters until re-driven. Both tables keep the whole record, so pending
+    # retries and dead letters survive a restart.
+    #
+    # The dedup key stays taken throughout: a redelivered copy is a duplicate
+    # of an event still held here, not a lost one. The event only counts as
+    # processed (and reaches the listeners) once a handler run succeeds.
+    #
+    # Kept by DedupStore as a writer: every newly marked event gets an
+    # in-flight event_retries row in the dedup transaction, deleted through
+    # complete() once its first handler run succeeds. An event marked but not
+    # handled when the process died is therefore still on disk, and start()
+    # runs it again: handling is at-least-once.
+    
+    def __init__(
+        self,
+        store: DedupStore,
+        handler: Callable[[EventRecord], Awaitable[Any]],
+        max_attempts: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 300.0
+    ):
+        self.store = store
+        self.handler = handler
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.running = False
+        self.dead_count = 0
+        self._db: Optional[aiosqlite.Connection] = None
+        # (due, seq, record, attempts so far); seq keeps equal due times FIFO.
+        self._heap: List[Tuple[float, int, EventRecord, int]] = []
+        self._seq = itertools.count()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[List[EventRecord]], None]] = []
+        self.stats = {
+            'scheduled': 0,
+            'recovered': 0,
+            'failed_attempts': 0,
+            'dead_lettered': 0,
+            'redriven': 0,
+        }
+    
+    def add_listener(self, listener: Callable[[List[EventRecord]], None]):
+        # Called with events handled on a retry, like EventConsumer.add_listener.
+        self._listeners.append(listener)
+    
+    async def create_schema(self, db: aiosqlite.Connection):
+        self._db = db
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS event_retries (
+                topic TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                source TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                attempts INTEGER NOT NULL,
+                due_at REAL NOT NULL,
+                error TEXT,
+                PRIMARY KEY (topic, event_id)
+            ) WITHOUT ROWID
+        """)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS dead_letters (
+                id INTEGER PRIMARY KEY,
+                topic TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                source TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                attempts INTEGER NOT NULL,
+                error TEXT,
+                failed_at TEXT NOT NULL,
+                UNIQUE (topic, event_id)
+            )
+        """)
+        logger.info(f"RetryScheduler initialized with max_attempts: {self.max_attempts}")
+    
+    async def write_batch(self, db: aiosqlite.Connection, records: List[EventRecord], processed_at: str):
+        # In-flight rows, due at once if found by start() after a crash.
+        now = time.time()
+        await db.executemany(
+            """
+            INSERT OR REPLACE INTO event_retries
+            (topic, event_id, timestamp, source, payload, attempts, due_at, error)
+            VALUES (?, ?, ?, ?, ?, 0, ?, NULL)
+            """,
+            [(r.topic, r.event_id, r.timestamp, r.source, r.payload, now) for r in records]
+        )
+    
+    async def prune(self, db: aiosqlite.Connection, cutoff: str):
+        # Pending retries and dead letters are kept until handled or re-driven,
+        # however old their key is.
+        pass
+    
+    async def import_batch(self, db: aiosqlite.Connection, rows: List[Tuple[str, str, str, str, str]]):
+        pass
+    
+    def delay(self, attempts: int) -> float:
+        # Seconds before the next run after `attempts` failed ones: base * 2^(n-1),
+        # capped, with up to half of it taken off at random so events that
+        # failed together do not all come back together.
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return delay * (0.5 + random.random() / 2)
+    
+    async def start(self):
+        # Pending retries from before a restart go back on the heap as they
+        # were, with events that were in flight. Call before the consumer starts.
+        cursor = await self._db.execute(
+            "SELECT topic, event_id, timestamp, source, payload, attempts, due_at FROM event_retries"
+        )
+        for topic, event_id, timestamp, source, payload, attempts, due_at in await cursor.fetchall():
+            record = EventRecord(topic, event_id, timestamp, source, payload)
+            heapq.heappush(self._heap, (due_at, next(self._seq), record, attempts))
+        cursor = await self._db.execute("SELECT COUNT(*) FROM dead_letters")
+        self.dead_count = (await cursor.fetchone())[0]
+        
+        self.running = True
+        self._task = asyncio.create_task(self._run())
+        if self._heap:
+            logger.info(f"Resumed {len(self._heap)} pending retries and interrupted events")
+    
+    async def stop(self):
+        # Runs in flight are cancelled; their rows are still in event_retries.
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def complete(self, records: Sequence[EventRecord]):
+        # First handler runs that succeeded: their in-flight rows go.
+        async with self.store.transaction() as db:
+            await db.executemany(
+                "DELETE FROM event_retries WHERE topic = ? AND event_id = ?",
+                [(r.topic, r.event_id) for r in records]
+            )
+    
+    async def schedule(self, failures: Sequence[Tuple[EventRecord, BaseException]]):
+        # First failures, straight from the consumer.
+        await self._record_failures([(record, 1, error) for record, error in failures])
+        self.stats['scheduled'] += len(failures)
+    
+    async def _record_failures(self, failures: Sequence[Tuple[EventRecord, int, BaseException]]):
+        # One transaction: retries are (re)scheduled, exhausted ones dead-lettered.
+        now = time.time()
+        retry = []
+        dead = []
+        for record, attempts, error in failures:
+            if attempts < self.max_attempts:
+                retry.append((record, attempts, now + self.delay(attempts), repr(error)))
+            else:
+                dead.append((record, attempts, repr(error)))
+        
+        failed_at = datetime.utcnow().isoformat()
+        async with self.store.transaction() as db:
+            if retry:
+                await db.executemany(
+                    """
+                    INSERT OR REPLACE INTO event_retries
+                    (topic, event_id, timestamp, source, payload, attempts, due_at, error)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    [(r.topic, r.event_id, r.timestamp, r.source, r.payload, attempts, due, error)
+                     for r, attempts, due, error in retry]
+                )
+            if dead:
+                await db.executemany(
+                    """
+                    INSERT OR REPLACE INTO dead_letters
+                    (topic, event_id, timestamp, source, payload, attempts, error, failed_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    [(r.topic, r.event_id, r.timestamp, r.source, r.payload, attempts, error, failed_at)
+                     for r, attempts, error in dead]
+                )
+                await db.executemany(
+                    "DELETE FROM event_retries WHERE topic = ? AND event_id = ?",
+                    [(r.topic, r.event_id) for r, _, _ in dead]
+                )
+        
+        for record, attempts, due, _ in retry:
+            heapq.heappush(self._heap, (due, next(self._seq), record, attempts))
+        self.stats['dead_lettered'] += len(dead)
+        self.dead_count += len(dead)
+        for record, attempts, _ in dead:
+            logger.error(f"Event dead-lettered after {attempts} attempts: {record.topic}/{record.event_id}")
+        if retry:
+            self._wake.set()
+    
+    async def _run(self):
+        while self.running:
+            try:
+                if not self._heap:
+                    self._wake.clear()
+                    await self._wake.wait()
+                    continue
+                wait = self._heap[0][0] - time.time()
+                if wait > 0:
+                    # Woken early when something due sooner is scheduled.
+                    self._wake.clear()
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                
+                now = time.time()
+                due = []
+                while self._heap and self._heap[0][0] <= now and len(due) < RETRY_BATCH:
+                    _, _, record, attempts = heapq.heappop(self._heap)
+                    due.append((record, attempts))
+                await self._retry(due)
+            
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in retry loop: {e}", exc_info=True)
+                await asyncio.sleep(1.0)
+    
+    async def _retry(self, due: List[Tuple[EventRecord, int]]):
+        results = await asyncio.gather(
+            *(self.handler(record) for record, _ in due),
+            return_exceptions=True
+        )
+        handled = []
+        failed = []
+        for (record, attempts), outcome in zip(due, results):
+            if isinstance(outcome, Exception):
+                logger.warning(
+                    f"Attempt {attempts + 1} of {record.topic}/{record.event_id} failed: {outcome}"
+                )
+                failed.append((record, attempts + 1, outcome))
+                continue
+            handled.append(record)
+        self.stats['failed_attempts'] += len(failed)
+        
+        if handled:
+            async with self.store.transaction() as db:
+                await db.executemany(
+                    "DELETE FROM event_retries WHERE topic = ? AND event_id = ?",
+                    [(r.topic, r.event_id) for r in handled]
+                )
+            self.stats['recovered'] += len(handled)
+            self._notify(handled)
+        if failed:
+            await self._record_failures(failed)
+    
+    def _notify(self, events: List[EventRecord]):
+        for listener in self._listeners:
+            try:
+                listener(events)
+            except Exception as e:
+                logger.error(f"Error in retry listener {listener}: {e}", exc_info=True)
+    
+    async def dead_letters(
+        self,
+        topic: Optional[str] = None,
+        after: int = 0,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        # Page in id order; pass the last id back as `after` for the next one.
+        where = "WHERE id > ?" + (" AND topic = ?" if topic else "")
+        params: List[Any] = [after] + ([topic] if topic else [])
+        cursor = await self._db.execute(
+            f"""
+            SELECT id, topic, event_id, timestamp, source, payload, attempts, error, failed_at
+            FROM dead_letters {where} ORDER BY id LIMIT ?
+            """,
+            (*params, limit)
+        )
+        return [
+            {
+                'id': row[0],
+                'topic': row[1],
+                'event_id': row[2],
+                'timestamp': row[3],
+                'source': row[4],
+                'payload': EventRecord(row[1], row[2], row[3], row[4], row[5]).payload_dict(),
+                'attempts': row[6],
+                'error': row[7],
+                'failed_at': row[8],
+            }
+            for row in await cursor.fetchall()
+        ]
+    
+    async def redrive(
+        self,
+        ids: Optional[Sequence[int]] = None,
+        topic: Optional[str] = None,
+        limit: int = 1000
+    ) -> int:
+        # Moves dead letters (the given ids, else the oldest `limit`, optionally
+        # of one topic) back to event_retries, due now with a fresh attempt
+        # budget. They go straight to the handler: their keys are still marked.
+        if ids:
+            placeholders = ",".join("?" for _ in ids)
+            where, params = f"WHERE id IN ({placeholders})", list(ids)
+        elif topic:
+            where, params = "WHERE topic = ?", [topic]
+        else:
+            where, params = "", []
+        
+        now = time.time()
+        async with self.store.transaction() as db:
+            cursor = await db.execute(
+                f"""
+                SELECT id, topic, event_id, timestamp, source, payload
+                FROM dead_letters {where} ORDER BY id LIMIT ?
+                """,
+                (*params, limit)
+            )
+            rows = await cursor.fetchall()
+            await db.executemany(
+                """
+                INSERT OR REPLACE INTO event_retries
+                (topic, event_id, timestamp, source, payload, attempts, due_at, error)
+                VALUES (?, ?, ?, ?, ?, 0, ?, NULL)
+                """,
+                [(*row[1:], now) for row in rows]
+            )
+            await db.executemany("DELETE FROM dead_letters WHERE id = ?", [(row[0],) for row in rows])
+        
+        for _, topic_, event_id, timestamp, source, payload in rows:
+            record = EventRecord(topic_, event_id, timestamp, source, payload)
+            heapq.heappush(self._heap, (now, next(self._seq), record, 0))
+        self.dead_count -= len(rows)
+        self.stats['redriven'] += len(rows)
+        if rows:
+            self._wake.set()
+            logger.info(f"Re-driven {len(rows)} dead letters")
+        return len(rows)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'pending': len(self._heap),
+            'dead_letters': self.dead_count,
+            'max_attempts': self.max_attempts,
+        }
@@ -0,0 +1,71 @@
+import logging
+from typing import Any, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class RingBuffer:
+    # Fixed-capacity FIFO over a preallocated slot list. Bulk put/get copy whole
+    # slices (at most two when wrapping) instead of touching one node per item.
+    # Everything runs on the event loop thread, so no locking is needed.
+    
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("RingBuffer capacity must be positive")
+        self.capacity = capacity
+        self._slots: List[Any] = [None] * capacity
+        self._head = 0
+        self._size = 0
+    
+    def put(self, item: Any) -> bool:
+        if self._size >= self.capacity:
+            return False
+        self._slots[(self._head + self._size) % self.capacity] = item
+        self._size += 1
+        return True
+    
+    def put_many(self, items: Sequence[Any]) -> int:
+        count = min(len(items), self.capacity - self._size)
+        if count <= 0:
+            return 0
+        
+        tail = (self._head + self._size) % self.capacity
+        first = min(count, self.capacity - tail)
+        self._slots[tail:tail + first] = items[:first]
+        if count > first:
+            self._slots[:count - first] = items[first:count]
+        self._size += count
+        return count
+    
+    def get(self) -> Any:
+        if not self._size:
+            raise IndexError("get from empty RingBuffer")
+        item = self._slots[self._head]
+        self._slots[self._head] = None
+        self._head = (self._head + 1) % self.capacity
+        self._size -= 1
+        return item
+    
+    def get_many(self, max_items: int) -> List[Any]:
+        count = min(max_items, self._size)
+        if count <= 0:
+            return []
+        
+        head = self._head
+        first = min(count, self.capacity - head)
+        items = self._slots[head:head + first]
+        # Clear taken slots so dequeued events are not kept alive by the buffer.
+        self._slots[head:head + first] = [None] * first
+        if count > first:
+            items += self._slots[:count - first]
+            self._slots[:count - first] = [None] * (count - first)
+        
+        self._head = (head + count) % self.capacity
+        self._size -= count
+        return items
+    
+    def qsize(self) -> int:
+        return self._size
+    
+    def full(self) -> bool:
+        return self._size >= self.capacity
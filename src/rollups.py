@@ -0,0 +1,170 @@
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import aiosqlite
+from src.models import EventRecord
+
+logger = logging.getLogger(__name__)
+
+RESOLUTIONS = ("minute", "hour")
+GROUPINGS = ("topic", "source")
+
+
+def minute_bucket(timestamp: str) -> str:
+    # "2025-10-23T10:30:12.5Z" -> "2025-10-23T10:30" (UTC). UTC and naive
+    # timestamps are sliced; only ones carrying an offset are parsed. The offset
+    # may follow the minutes directly ("10:30+05:00"), so the whole time part
+    # is checked.
+    time_part = timestamp[11:]
+    if len(timestamp) >= 16 and timestamp[10] == "T" and "+" not in time_part and "-" not in time_part:
+        return timestamp[:16]
+    parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.strftime("%Y-%m-%dT%H:%M")
+
+
+def hour_bucket(minute: str) -> str:
+    return minute[:13] + ":00"
+
+
+class RollupStore:
+    # Per-topic/source event counts in 1-minute and 1-hour buckets (by event
+    # timestamp), kept by DedupStore as a writer so they change in the same
+    # transaction as the dedup insert. Both tables are written on insert; minute
+    # rows older than minute_retention are then dropped, leaving only the hour
+    # rows for older periods.
+    
+    def __init__(self, minute_retention: timedelta = timedelta(hours=48), downsample_interval: float = 60.0):
+        self.minute_retention = minute_retention
+        self.downsample_interval = downsample_interval
+        self._db: Optional[aiosqlite.Connection] = None
+        self._last_downsample = 0.0
+        self._buckets: Dict[str, str] = {}
+    
+    async def create_schema(self, db: aiosqlite.Connection):
+        self._db = db
+        for table in ("rollup_minute", "rollup_hour"):
+            await db.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    bucket TEXT NOT NULL,
+                    topic TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (bucket, topic, source)
+                ) WITHOUT ROWID
+            """)
+        logger.info(f"RollupStore initialized with minute retention: {self.minute_retention}")
+    
+    def _minute_cutoff(self) -> str:
+        return (datetime.utcnow() - self.minute_retention).strftime("%Y-%m-%dT%H:%M")
+    
+    def _bucket(self, timestamp: str) -> str:
+        # A batch usually carries a handful of distinct timestamps per second.
+        bucket = self._buckets.get(timestamp)
+        if bucket is None:
+            if len(self._buckets) >= 10000:
+                self._buckets.clear()
+            bucket = self._buckets[timestamp] = minute_bucket(timestamp)
+        return bucket
+    
+    async def write_batch(self, db: aiosqlite.Connection, records: List[EventRecord], processed_at: str):
+        # Aggregate in memory first: one upsert per distinct bucket/topic/source
+        # instead of one per event.
+        minutes = Counter((self._bucket(r.timestamp), r.topic, r.source) for r in records)
+        hours: Counter = Counter()
+        for (minute, topic, source), count in minutes.items():
+            hours[(hour_bucket(minute), topic, source)] += count
+        
+        cutoff = self._minute_cutoff()
+        for table, counts in (("rollup_minute", minutes), ("rollup_hour", hours)):
+            rows = [
+                (bucket, topic, source, count)
+                for (bucket, topic, source), count in counts.items()
+                if table == "rollup_hour" or bucket >= cutoff
+            ]
+            if rows:
+                await db.executemany(
+                    f"""
+                    INSERT INTO {table} (bucket, topic, source, count)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (bucket, topic, source) DO UPDATE SET count = count + excluded.count
+                    """,
+                    rows
+                )
+        
+        now = time.monotonic()
+        if now - self._last_downsample >= self.downsample_interval:
+            self._last_downsample = now
+            await self.downsample(db)
+    
+    async def downsample(self, db: aiosqlite.Connection):
+        # Hour rows already hold these counts, so expired minute rows are dropped.
+        cursor = await db.execute("DELETE FROM rollup_minute WHERE bucket < ?", (self._minute_cutoff(),))
+        if cursor.rowcount > 0:
+            logger.info(f"Downsampled {cursor.rowcount} minute rollup rows")
+    
+    async def prune(self, db: aiosqlite.Connection, cutoff: str):
+        # Rollups are meant to outlive the raw events; cleanup leaves them alone.
+        pass
+    
+    async def import_batch(self, db: aiosqlite.Connection, rows: List[Tuple[str, str, str, str, str]]):
+        # Imported events were counted on the node that processed them.
+        pass
+    
+    async def query(
+        self,
+        resolution: str,
+        since: datetime,
+        until: datetime,
+        topic: Optional[str] = None,
+        source: Optional[str] = None,
+        group_by: str = "topic"
+    ) -> List[Dict[str, Any]]:
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution '{resolution}', expected one of {RESOLUTIONS}")
+        if group_by not in GROUPINGS:
+            raise ValueError(f"Unknown group_by '{group_by}', expected one of {GROUPINGS}")
+        
+        if resolution == "minute":
+            table, low, high = "rollup_minute", since.strftime("%Y-%m-%dT%H:%M"), until.strftime("%Y-%m-%dT%H:%M")
+        else:
+            table, low, high = "rollup_hour", since.strftime("%Y-%m-%dT%H:00"), until.strftime("%Y-%m-%dT%H:00")
+        
+        conditions = ["bucket >= ?", "bucket <= ?"]
+        params: List[Any] = [low, high]
+        if topic:
+            # Glob, like topic patterns elsewhere ("user.*").
+            conditions.append("topic GLOB ?")
+            params.append(topic)
+        if source:
+            conditions.append("source = ?")
+            params.append(source)
+        
+        if group_by == "topic":
+            columns, group = "bucket, topic, NULL, SUM(count), COUNT(*)", "GROUP BY bucket, topic"
+        else:
+            columns, group = "bucket, topic, source, count, NULL", ""
+        
+        cursor = await self._db.execute(
+            f"""
+            SELECT {columns} FROM {table}
+            WHERE {' AND '.join(conditions)}
+            {group}
+            ORDER BY bucket, topic
+            """,
+            params
+        )
+        rows = await cursor.fetchall()
+        return [
+            {
+                "bucket": row[0] + ":00Z",
+                "topic": row[1],
+                "source": row[2],
+                "count": row[3],
+                "sources": row[4],
+            }
+            for row in rows
+        ]
@@ -0,0 +1,95 @@
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+logger = logging.getLogger(__name__)
+
+LOOPS = ("auto", "asyncio", "uvloop")
+HTTP_PARSERS = ("auto", "h11", "httptools")
+
+# Set by the launcher for the server process and its workers, read by /health.
+RESOLVED_ENV = "RUNTIME_RESOLVED"
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def _flag(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes")
+
+
+def load_settings(env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    # Server settings from the environment, "auto" resolved to what is
+    # installed. Defaults are the fastest combination for the publish-heavy
+    # load benchmark (python -m benchmarks.runtime).
+    env = os.environ if env is None else env
+    loop = env.get("RUNTIME_LOOP", "auto")
+    http = env.get("RUNTIME_HTTP", "auto")
+    if loop not in LOOPS:
+        raise ValueError(f"Unknown RUNTIME_LOOP '{loop}', expected one of {LOOPS}")
+    if http not in HTTP_PARSERS:
+        raise ValueError(f"Unknown RUNTIME_HTTP '{http}', expected one of {HTTP_PARSERS}")
+    if loop == "auto":
+        loop = "uvloop" if _installed("uvloop") else "asyncio"
+    if http == "auto":
+        http = "httptools" if _installed("httptools") else "h11"
+    
+    limit = int(env.get("RUNTIME_LIMIT_CONCURRENCY", "0"))
+    return {
+        'host': env.get("HOST", "0.0.0.0"),
+        'port': int(env.get("PORT", "8080")),
+        'loop': loop,
+        'http': http,
+        'workers': int(env.get("RUNTIME_WORKERS", "1")),
+        'timeout_keep_alive': int(env.get("RUNTIME_KEEP_ALIVE", "5")),
+        'backlog': int(env.get("RUNTIME_BACKLOG", "2048")),
+        'limit_concurrency': limit if limit > 0 else None,
+        'access_log': _flag(env.get("RUNTIME_ACCESS_LOG", "false")),
+    }
+
+
+def describe() -> Dict[str, Any]:
+    # What this process runs with: the launcher's settings when started through
+    # it, and the event loop actually running either way.
+    try:
+        loop = type(asyncio.get_running_loop()).__module__.split(".")[0]
+    except RuntimeError:
+        loop = None
+    resolved = os.environ.get(RESOLVED_ENV)
+    return {
+        'launcher': json.loads(resolved) if resolved else None,
+        'running_loop': loop,
+        'pid': os.getpid(),
+    }
+
+
+def main() -> int:
+    import uvicorn
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    settings = load_settings()
+    if settings['workers'] > 1:
+        # Each worker has its own queue, consumer, counters and caches; only the
+        # SQLite file is shared. Scale out with cluster mode instead.
+        logger.warning(
+            f"RUNTIME_WORKERS={settings['workers']}: queue, /stats counters, dedup windows "
+            f"and the response cache are per worker process, and a key inserted by two "
+            f"workers at once fails one worker's whole batch"
+        )
+    os.environ[RESOLVED_ENV] = json.dumps(settings)
+    logger.info(f"Starting server: {settings}")
+    uvicorn.run("src.main:app", **settings)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import logging
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+from src.config import TopicRules
+from src.models import EventRecord
+
+logger = logging.getLogger(__name__)
+
+
+class FairScheduler:
+    # Per-topic sub-queues served by deficit round robin: on its turn a topic's
+    # deficit grows by its weight and it may send one event per whole unit of
+    # deficit, so a flooded topic gets its share and no more. Priority classes
+    # are strict (0 is served first); DRR applies within each class.
+    
+    def __init__(
+        self,
+        maxsize: int,
+        weights: Optional[TopicRules] = None,
+        priorities: Optional[TopicRules] = None,
+        capacities: Optional[TopicRules] = None
+    ):
+        self.maxsize = maxsize
+        self.weights = weights or TopicRules(default=1.0)
+        self.priorities = priorities or TopicRules(default=0)
+        self.capacities = capacities or TopicRules(default=maxsize)
+        if any(w <= 0 for w in [self.weights.default, *self.weights.rules.values()]):
+            raise ValueError("Topic weights must be positive")
+        self._queues: Dict[str, Deque[EventRecord]] = {}
+        self._deficit: Dict[str, float] = {}
+        self._active: Dict[int, "OrderedDict[str, None]"] = {}
+        self._size = 0
+    
+    def put(self, event: EventRecord) -> bool:
+        if self._size >= self.maxsize:
+            return False
+        
+        topic = event.topic
+        queue = self._queues.get(topic)
+        if queue is None:
+            queue = self._queues[topic] = deque()
+        
+        capacity = self.capacities.get(topic)
+        if capacity is not None and len(queue) >= capacity:
+            if not queue:
+                del self._queues[topic]
+            return False
+        
+        queue.append(event)
+        self._size += 1
+        
+        if len(queue) == 1:
+            priority = self.priorities.get(topic)
+            self._active.setdefault(priority, OrderedDict())[topic] = None
+            self._deficit[topic] = 0.0
+        return True
+    
+    def get_many(self, max_items: int) -> List[EventRecord]:
+        batch: List[EventRecord] = []
+        while len(batch) < max_items and self._size:
+            ring = self._active[min(p for p, r in self._active.items() if r)]
+            topic = next(iter(ring))
+            queue = self._queues[topic]
+            
+            # A topic still holding deficit is mid-turn (the last call stopped at
+            # max_items); only a fresh turn earns another quantum.
+            deficit = self._deficit[topic]
+            if deficit < 1:
+                deficit += self.weights.get(topic)
+            
+            while deficit >= 1 and queue and len(batch) < max_items:
+                batch.append(queue.popleft())
+                deficit -= 1
+                self._size -= 1
+            
+            if not queue:
+                del ring[topic]
+                del self._queues[topic]
+                del self._deficit[topic]
+            elif deficit < 1:
+                self._deficit[topic] = deficit
+                ring.move_to_end(topic)
+            else:
+                self._deficit[topic] = deficit
+        return batch
+    
+    def qsize(self) -> int:
+        return self._size
+    
+    def full(self) -> bool:
+        return self._size >= self.maxsize
+    
+    def topic_sizes(self) -> Dict[str, int]:
+        return {topic: len(queue) for topic, queue in self._queues.items()}
@@ -0,0 +1,245 @@
+import fnmatch
+import logging
+import sqlite3
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import aiosqlite
+from src import codec
+from src.models import EventRecord
+
+logger = logging.getLogger(__name__)
+
+ORDERS = ("time", "rank")
+
+
+def payload_text(payload: bytes, fields: Optional[Sequence[str]] = None) -> str:
+    # Scalar payload values joined into one document body. With fields set only
+    # those (dotted) paths are indexed, e.g. ("message", "error.code").
+    if payload == b"{}":
+        return ""
+    try:
+        data = codec.loads(payload)
+    except ValueError:
+        return ""
+    
+    if fields:
+        values = []
+        for field in fields:
+            value: Any = data
+            for part in field.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+            values.extend(_scalars(value))
+        return " ".join(values)
+    return " ".join(_scalars(data))
+
+
+def _scalars(value: Any) -> Iterator[str]:
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from _scalars(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _scalars(item)
+    elif value is not None:
+        yield str(value)
+
+
+def build_match(q: str) -> str:
+    # User text is quoted term by term, so FTS5 operators and punctuation in it
+    # are searched for literally; a trailing * keeps prefix search.
+    terms = []
+    for term in q.split():
+        prefix = term.endswith("*") and len(term) > 1
+        if prefix:
+            term = term[:-1]
+        quoted = '"' + term.replace('"', '""') + '"'
+        terms.append(quoted + "*" if prefix else quoted)
+    return " ".join(terms)
+
+
+class SearchIndex:
+    # Inverted index over processed events, kept by DedupStore as a writer: new
+    # events are indexed in the same transaction that records them, one
+    # executemany per consumer batch. search_docs holds the rows; event_search is
+    # an external-content FTS5 table over it, maintained by triggers.
+    
+    def __init__(self, topics: str = "*", fields: Optional[Sequence[str]] = None, rank_window: int = 10000):
+        self.topics = topics
+        self.rank_window = rank_window
+        self.fields = list(fields) if fields else None
+        self.enabled = False
+        self._db: Optional[aiosqlite.Connection] = None
+        self._matches: Dict[str, bool] = {}
+    
+    async def create_schema(self, db: aiosqlite.Connection):
+        self._db = db
+        try:
+            await db.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS event_search USING fts5(
+                    topic, source, event_id, body,
+                    content='search_docs', content_rowid='rowid'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Full-text search disabled, FTS5 unavailable: {e}")
+            return
+        
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS search_docs (
+                rowid INTEGER PRIMARY KEY,
+                topic TEXT NOT NULL,
+                source TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                body TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                processed_at TEXT NOT NULL
+            )
+        """)
+        
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_search_processed_at
+            ON search_docs(processed_at)
+        """)
+        
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS search_docs_ai AFTER INSERT ON search_docs BEGIN
+                INSERT INTO event_search(rowid, topic, source, event_id, body)
+                VALUES (new.rowid, new.topic, new.source, new.event_id, new.body);
+            END
+        """)
+        
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS search_docs_ad AFTER DELETE ON search_docs BEGIN
+                INSERT INTO event_search(event_search, rowid, topic, source, event_id, body)
+                VALUES ('delete', old.rowid, old.topic, old.source, old.event_id, old.body);
+            END
+        """)
+        
+        self.enabled = True
+        logger.info(f"SearchIndex initialized for topics: {self.topics}")
+    
+    def _indexed(self, topic: str) -> bool:
+        matched = self._matches.get(topic)
+        if matched is None:
+            if len(self._matches) >= 10000:
+                self._matches.clear()
+            matched = self._matches[topic] = fnmatch.fnmatchcase(topic, self.topics)
+        return matched
+    
+    async def write_batch(self, db: aiosqlite.Connection, records: List[EventRecord], processed_at: str):
+        if not self.enabled:
+            return
+        
+        rows = [
+            (r.topic, r.source, r.event_id, payload_text(r.payload, self.fields), r.timestamp, processed_at)
+            for r in records if self._indexed(r.topic)
+        ]
+        if rows:
+            await db.executemany(
+                """
+                INSERT INTO search_docs
+                (topic, source, event_id, body, timestamp, processed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                rows
+            )
+    
+    async def prune(self, db: aiosqlite.Connection, cutoff: str):
+        if self.enabled:
+            await db.execute("DELETE FROM search_docs WHERE processed_at < ?", (cutoff,))
+    
+    async def import_batch(self, db: aiosqlite.Connection, rows: List[Tuple[str, str, str, str, str]]):
+        # Imported keys carry no payload to index.
+        pass
+    
+    async def search(
+        self,
+        q: str,
+        topic: Optional[str] = None,
+        since: Optional[str] = None,
+        limit: int = 50,
+        order: str = "time",
+        raw: bool = False
+    ) -> List[Dict[str, Any]]:
+        if order not in ORDERS:
+            raise ValueError(f"Unknown order '{order}', expected one of {ORDERS}")
+        
+        match = q if raw else build_match(q)
+        if not match.strip():
+            raise ValueError("Empty search query")
+        
+        conditions = ["event_search MATCH ?"]
+        params: List[Any] = [match]
+        if topic:
+            conditions.append("d.topic = ?")
+            params.append(topic)
+        if since:
+            # Rows are appended in processed order, so a time bound is a rowid
+            # bound, which FTS5 applies while walking its doclists.
+            first = await self._db.execute(
+                "SELECT rowid FROM search_docs WHERE processed_at >= ? ORDER BY processed_at LIMIT 1",
+                (since,)
+            )
+            start = await first.fetchone()
+            if start is None:
+                return []
+            conditions.append("event_search.rowid >= ?")
+            params.append(start[0])
+        
+        try:
+            if order == "rank":
+                # bm25 has to score every candidate before the first row comes
+                # back, so ranking is done among the newest RANK_WINDOW matches.
+                bound = await self._db.execute(
+                    f"""
+                    SELECT event_search.rowid
+                    FROM event_search JOIN search_docs d ON d.rowid = event_search.rowid
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY event_search.rowid DESC
+                    LIMIT 1 OFFSET ?
+                    """,
+                    params + [self.rank_window - 1]
+                )
+                oldest = await bound.fetchone()
+                if oldest is not None:
+                    conditions.append("event_search.rowid >= ?")
+                    params.append(oldest[0])
+                score, order_by = "event_search.rank", "event_search.rank"
+            else:
+                # No score here: bm25 needs corpus-wide term counts, which costs
+                # more than the time-ordered lookup itself.
+                score, order_by = "NULL", "event_search.rowid DESC"
+            
+            cursor = await self._db.execute(
+                f"""
+                SELECT d.topic, d.event_id, d.timestamp, d.source, d.processed_at,
+                       snippet(event_search, 3, '[', ']', '...', 12), {score}
+                FROM event_search JOIN search_docs d ON d.rowid = event_search.rowid
+                WHERE {' AND '.join(conditions)}
+                ORDER BY {order_by}
+                LIMIT ?
+                """,
+                params + [limit]
+            )
+            rows = await cursor.fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Invalid search query: {e}")
+        
+        return [
+            {
+                "topic": row[0],
+                "event_id": row[1],
+                "timestamp": row[2],
+                "source": row[3],
+                "processed_at": row[4],
+                "snippet": row[5],
+                "score": -row[6] if row[6] is not None else None,
+            }
+            for row in rows
+        ]
+    
+    async def get_indexed_count(self) -> int:
+        if not self.enabled:
+            return 0
+        cursor = await self._db.execute("SELECT COUNT(*) FROM search_docs")
+        result = await cursor.fetchone()
+        return result[0] if result else 0
@@ -0,0 +1,147 @@
+import asyncio
+import fnmatch
+import logging
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+from src import codec
+from src.models import EventRecord
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_FRAME = b": keepalive\n\n"
+
+
+def build_frame(seq: int, record: EventRecord) -> bytes:
+    # The payload is already JSON bytes, so splice it in instead of decoding and
+    # re-encoding it for every event.
+    head = codec.dumps({
+        "topic": record.topic,
+        "event_id": record.event_id,
+        "timestamp": record.timestamp,
+        "source": record.source,
+    })
+    return b"".join((
+        b"id: ", str(seq).encode(), b"\nevent: ", record.topic.encode(),
+        b"\ndata: ", head[:-1], b',"payload":', record.payload, b"}\n\n",
+    ))
+
+
+class Subscriber:
+    
+    def __init__(self, pattern: str, buffer_size: int):
+        self.pattern = pattern
+        self.buffer_size = buffer_size
+        self.closed = False
+        self.close_reason: Optional[str] = None
+        self.delivered = 0
+        self._buffer: Deque[bytes] = deque()
+        self._ready = asyncio.Event()
+    
+    def matches(self, topic: str) -> bool:
+        return fnmatch.fnmatchcase(topic, self.pattern)
+    
+    def push(self, frame: bytes):
+        if self.closed:
+            return
+        if len(self._buffer) >= self.buffer_size:
+            # A subscriber this far behind is cut off rather than allowed to
+            # grow without bound; it reconnects with its last id and catches up
+            # from the hub history.
+            self.close("overflow")
+            return
+        self._buffer.append(frame)
+        self._ready.set()
+    
+    def close(self, reason: str):
+        if not self.closed:
+            self.closed = True
+            self.close_reason = reason
+            self._ready.set()
+    
+    async def stream(self, keepalive: float = 15.0) -> AsyncIterator[bytes]:
+        while True:
+            if self._buffer:
+                frames = list(self._buffer)
+                self._buffer.clear()
+                self.delivered += len(frames)
+                yield b"".join(frames)
+                continue
+            
+            if self.closed:
+                if self.close_reason == "overflow":
+                    yield b"event: overflow\ndata: {}\n\n"
+                return
+            
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield KEEPALIVE_FRAME
+
+
+class SubscriptionHub:
+    
+    def __init__(self, history_size: int = 10000, buffer_size: int = 1000):
+        self.history_size = history_size
+        self.buffer_size = buffer_size
+        # Cursors start at the current time in microseconds, so ids keep growing
+        # across restarts and a cursor from a previous run reads as a gap.
+        self._seq = time.time_ns() // 1000
+        self._history: Deque[Tuple[int, str, bytes]] = deque(maxlen=history_size)
+        self._subscribers: List[Subscriber] = []
+        self._by_topic: Dict[str, List[Subscriber]] = {}
+        self.published = 0
+        logger.info(f"SubscriptionHub initialized with history: {history_size}, buffer: {buffer_size}")
+    
+    def publish(self, records: List[EventRecord]):
+        for record in records:
+            self._seq += 1
+            frame = build_frame(self._seq, record)
+            self._history.append((self._seq, record.topic, frame))
+            for subscriber in self._subscribers_for(record.topic):
+                subscriber.push(frame)
+        self.published += len(records)
+    
+    def subscribe(self, pattern: str = "*", cursor: Optional[int] = None) -> Subscriber:
+        subscriber = Subscriber(pattern, self.buffer_size)
+        
+        if cursor is not None:
+            oldest = self._history[0][0] if self._history else self._seq + 1
+            if cursor < oldest - 1:
+                subscriber.push(
+                    b"event: gap\ndata: " + codec.dumps({"cursor": cursor, "oldest": oldest}) + b"\n\n"
+                )
+            for seq, topic, frame in self._history:
+                if seq > cursor and subscriber.matches(topic):
+                    subscriber.push(frame)
+        
+        self._subscribers.append(subscriber)
+        self._by_topic.clear()
+        logger.info(f"Subscriber added: pattern={pattern}, cursor={cursor}")
+        return subscriber
+    
+    def unsubscribe(self, subscriber: Subscriber):
+        subscriber.close("unsubscribed")
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+            self._by_topic.clear()
+            logger.info(
+                f"Subscriber removed: pattern={subscriber.pattern}, "
+                f"delivered={subscriber.delivered}, reason={subscriber.close_reason}"
+            )
+    
+    def _subscribers_for(self, topic: str) -> List[Subscriber]:
+        subscribers = self._by_topic.get(topic)
+        if subscribers is None:
+            if len(self._by_topic) >= 10000:
+                self._by_topic.clear()
+            subscribers = self._by_topic[topic] = [s for s in self._subscribers if s.matches(topic)]
+        return subscribers
+    
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'subscribers': len(self._subscribers),
+            'published': self.published,
+            'cursor': self._seq,
+        }
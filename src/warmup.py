@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A step gets a callback to report its own progress as (done, total).
+ProgressCallback = Callable[[int, int], None]
+WarmupStep = Callable[[ProgressCallback], Awaitable[Any]]
+
+
+class Warmup:
+    # Startup work that is not needed to serve requests correctly, only quickly
+    # (cache and index warming, integrity checks). Runs in the background after
+    # the service is live; ready flips once every step has succeeded.
+    
+    def __init__(self):
+        self.steps: List[Tuple[str, WarmupStep]] = []
+        self.ready = False
+        self.current: Optional[str] = None
+        self.current_progress: Tuple[int, int] = (0, 0)
+        self.completed: Dict[str, float] = {}
+        self.failed: Dict[str, str] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def add_step(self, name: str, step: WarmupStep):
+        self.steps.append((name, step))
+    
+    def start(self):
+        self.started_at = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+    
+    async def _run(self):
+        for name, step in self.steps:
+            self.current = name
+            self.current_progress = (0, 0)
+            started = time.monotonic()
+            try:
+                await step(self._report)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Warm-up step {name} failed: {e}", exc_info=True)
+                self.failed[name] = str(e)
+                continue
+            self.completed[name] = time.monotonic() - started
+            logger.info(f"Warm-up step {name} done in {self.completed[name]:.3f}s")
+        
+        self.current = None
+        self.finished_at = time.monotonic()
+        self.ready = not self.failed
+        if self.ready:
+            logger.info(f"Warm-up complete in {self.finished_at - self.started_at:.3f}s, service ready")
+        else:
+            logger.error(f"Warm-up finished with failed steps: {sorted(self.failed)}")
+    
+    def _report(self, done: int, total: int):
+        self.current_progress = (done, total)
+    
+    def progress(self) -> Dict[str, Any]:
+        done, total = self.current_progress
+        end = self.finished_at or time.monotonic()
+        return {
+            'ready': self.ready,
+            'steps_done': len(self.completed),
+            'steps_total': len(self.steps),
+            'current_step': self.current,
+            'current_progress': round(done / total, 3) if total else None,
+            'completed': {name: round(seconds, 3) for name, seconds in self.completed.items()},
+            'failed': self.failed,
+            'elapsed_seconds': round(end - self.started_at, 3) if self.started_at else 0.0,
+        }
@@ -67,7 +67,8 @@ def simulate_at_least_once_delivery():
     logger.info("Waiting for aggregator to be ready...")
     for i in range(30):
         try:
-            response = requests.get(f"{AGGREGATOR_URL}/health", timeout=2)
+            # /ready: live and warmed up (compose only gates on liveness).
+            response = requests.get(f"{AGGREGATOR_URL}/ready", timeout=2)
             if response.status_code == 200:
                 logger.info("Aggregator is ready!")
                 break
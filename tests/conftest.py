@@ -2,6 +2,42 @@ import pytest
 import pytest_asyncio
 import asyncio
 import os
+from src.dedup_store import DedupStore
+from src.models import EventRecord
+
+
+def make_records(count, topic="test.topic", prefix="evt"):
+    return [EventRecord(topic, f"{prefix}-{i}", "2025-10-23T10:00:00Z", "test") for i in range(count)]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "dedup.db")
+
+
+@pytest_asyncio.fixture
+async def open_store(db_path):
+    # Factory: a DedupStore (at db_path unless `path` or a built `store` is
+    # given) with each of `writers`, called with the store, registered as a
+    # writer and, with `indexes`, as a key index. Initialized; returns the store,
+    # followed by the components if there are any. Stores left open are closed
+    # after the test.
+    opened = []
+    
+    async def open_store(*writers, path=None, indexes=False, store=None):
+        store = store or DedupStore(db_path=path or db_path)
+        components = [make(store) for make in writers]
+        for component in components:
+            store.add_writer(component)
+            if indexes:
+                store.add_key_index(component)
+        await store.initialize()
+        opened.append(store)
+        return (store, *components) if components else store
+    
+    yield open_store
+    for store in opened:
+        await store.close()
 
 
 @pytest.fixture(scope="session")
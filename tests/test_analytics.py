@@ -0,0 +1,78 @@
+import pytest
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from src.dedup_store import DedupStore
+from src.models import EventRecord
+
+np = pytest.importorskip("numpy")
+
+from src.analytics import EventRateAnalysis, analyze
+
+START = datetime(2025, 10, 23, 10, 0, 0)
+
+def test_service_starts_without_importing_numpy():
+
+    code = "import sys, src.main; print('numpy' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+def test_chunks_match_whole_arrays():
+
+    rng = np.random.default_rng(3)
+    timestamps = np.sort(rng.integers(0, 3_600_000, 20000))
+    sources = rng.choice(["a", "b", "c"], len(timestamps))
+    whole = EventRateAnalysis(0, 3_600_000, 300_000, by_source=True)
+    whole.add(timestamps, sources.tolist())
+    chunked = EventRateAnalysis(0, 3_600_000, 300_000, by_source=True)
+    for start in range(0, len(timestamps), 777):
+        chunked.add(timestamps[start:start + 777], sources[start:start + 777].tolist())
+
+    assert whole.result([50, 95]) == chunked.result([50, 95])
+    result = chunked.result([50, 95, 99])
+    assert result["counts"] == np.bincount(timestamps // 300_000, minlength=12).tolist()
+    assert sum(result["by_source"]["b"]) == int((sources == "b").sum())
+
+    gaps = np.diff(timestamps)
+    assert result["inter_arrival_ms"]["count"] == len(gaps)
+    assert result["inter_arrival_ms"]["max"] == int(gaps.max())
+    for q in (50, 95, 99):
+        exact = np.percentile(gaps, q)
+        # Within a histogram bucket (4.7%), or 1 ms for the smallest gaps.
+        assert abs(result["inter_arrival_ms"][f"p{q}"] - exact) <= max(1, exact * 0.05)
+
+def test_too_many_buckets():
+
+    with pytest.raises(ValueError):
+        analyze("unused.db", "t", START, START + timedelta(days=365), 1)
+
+@pytest.mark.asyncio
+async def test_analyze_stored_events(db_path):
+
+    store = DedupStore(db_path=db_path)
+    await store.initialize()
+    try:
+        records = [
+            EventRecord(
+                "metrics.cpu" if i % 4 else "metrics.mem",
+                f"evt-{i}",
+                (START + timedelta(seconds=i * 10)).isoformat() + "Z",
+                f"host-{i % 2}"
+            )
+            for i in range(60)
+        ]
+        await store.mark_processed_batch(records)
+    finally:
+        await store.close()
+
+    result = analyze(db_path, "metrics.*", START, START + timedelta(minutes=10), 300, by_source=True)
+    assert result["events"] == 60
+    assert result["counts"] == [30, 30]
+    assert result["by_source"] == {"host-0": [15, 15], "host-1": [15, 15]}
+    assert result["inter_arrival_ms"]["p50"] == 10000
+
+    result = analyze(db_path, "metrics.cpu", START, START + timedelta(minutes=10), 60)
+    assert result["events"] == 45
+    assert len(result["buckets"]) == 10
+    assert result["buckets"][1] == "2025-10-23T10:01:00Z"
+    assert "by_source" not in result
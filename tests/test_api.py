@@ -1,11 +1,14 @@
-
 import pytest
+import time
 from fastapi.testclient import TestClient
 from src.main import app
 
 @pytest.fixture
-def client():
+def client(tmp_path, monkeypatch):
 
+    # Databases and snapshots of each test stay out of the working tree.
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "dedup.db"))
+    monkeypatch.setenv("SNAPSHOT_DIR", str(tmp_path / "snapshots"))
     with TestClient(app) as c:
         yield c
 
@@ -62,6 +65,20 @@ def test_publish_batch_events(client):
     data = response.json()
     assert data["received"] == 3
 
+def test_publish_integer_beyond_64_bits(client):
+
+    event = {
+        "topic": "test.api",
+        "event_id": "big-int-001",
+        "timestamp": "2025-10-23T10:00:00Z",
+        "source": "test",
+        "payload": {"big": 2**70}
+    }
+
+    response = client.post("/publish", json=event)
+    assert response.status_code == 200
+    assert response.json()["received"] == 1
+
 def test_publish_invalid_event(client):
 
     invalid_event = {
@@ -142,3 +159,289 @@ def test_duplicate_event_detection(client):
     data2 = response2.json()
 
     assert data2["duplicates"] >= 0
+
+def test_search_endpoint(client):
+
+    response = client.get("/search?q=login&topic=test.api&limit=5&order=rank")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["order"] == "rank"
+    assert data["count"] == len(data["results"])
+
+def test_search_endpoint_invalid(client):
+
+    assert client.get("/search").status_code == 422
+    assert client.get("/search?q=x&order=random").status_code == 400
+    assert client.get("/search?q=x&since=yesterday").status_code == 400
+    assert client.get('/search?q="x&raw=true').status_code == 400
+
+def test_rollups_endpoint(client):
+
+    response = client.get("/rollups?topic=test.*&since=2025-10-23T00:00:00Z&until=2025-10-24T00:00:00Z")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["resolution"] == "hour"
+    assert data["count"] == len(data["buckets"])
+
+    response = client.get("/rollups?group_by=source")
+    assert response.status_code == 200
+    assert response.json()["resolution"] == "minute"
+
+def test_rollups_endpoint_invalid(client):
+
+    assert client.get("/rollups?resolution=second").status_code == 400
+    assert client.get("/rollups?since=yesterday").status_code == 400
+
+def test_analytics_endpoint(client):
+
+    pytest.importorskip("numpy")
+    batch = {
+        "events": [
+            {
+                "topic": "test.analytics",
+                "event_id": f"analytics-{i}",
+                "timestamp": f"2025-10-23T10:0{i}:00Z",
+                "source": "test",
+                "payload": {}
+            }
+            for i in range(4)
+        ]
+    }
+    client.post("/publish", json=batch)
+    for _ in range(100):
+        response = client.get(
+            "/analytics?topic=test.analytics&since=2025-10-23T10:00:00Z&until=2025-10-23T11:00:00Z&by=source"
+        )
+        if response.json()["events"] == 4:
+            break
+        time.sleep(0.05)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["counts"][0] == 4
+    assert data["by_source"]["test"][0] == 4
+    assert data["inter_arrival_ms"]["p50"] == 60000
+
+    assert client.get("/analytics?topic=x&interval=often").status_code == 400
+    assert client.get("/analytics?topic=x&by=topic").status_code == 400
+    assert client.get("/analytics?topic=x&percentiles=150").status_code == 400
+
+def test_drain_endpoint(client):
+
+    event = {
+        "topic": "test.drain",
+        "event_id": "drain-test-001",
+        "timestamp": "2025-10-23T10:00:00Z",
+        "source": "test",
+        "payload": {}
+    }
+    client.post("/publish", json=event)
+
+    response = client.post("/drain")
+    assert response.status_code == 200
+    report = response.json()
+    assert report["remaining"] == 0
+
+    response = client.post("/publish", json=event)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+
+    data = client.get("/health").json()
+    assert data["status"] == "draining"
+    assert data["drain"] == report
+
+def test_ready_endpoint(client):
+
+    for _ in range(100):
+        response = client.get("/ready")
+        if response.status_code == 200:
+            break
+        time.sleep(0.05)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ready"
+    assert data["warmup"]["steps_done"] == data["warmup"]["steps_total"]
+    assert client.get("/health").json()["ready"] is True
+
+    client.post("/drain")
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "draining"
+
+def test_replication_disabled_by_default(client):
+
+    data = client.get("/replication").json()
+    assert data["role"] is None
+    assert data["changelog"] is None
+
+    assert client.get("/replication/changes").status_code == 400
+    assert client.post("/replication/promote").status_code == 400
+    assert client.get("/health").json()["replication"]["role"] is None
+
+def test_snapshot_endpoint(client):
+
+    response = client.post("/snapshot?incremental=false")
+    assert response.status_code == 202
+
+    for _ in range(100):
+        data = client.get("/snapshot").json()
+        if not data["running"]:
+            break
+        time.sleep(0.05)
+
+    assert data["last_error"] is None
+    assert data["last"]["incremental"] is False
+    assert data["last"]["pages"] > 0
+
+def test_publish_rejects_content_duplicates(client, monkeypatch):
+
+    monkeypatch.setenv("DEDUP_FINGERPRINT_TOPICS", "legacy.*")
+    event = {
+        "topic": "legacy.orders",
+        "event_id": "regenerated-1",
+        "timestamp": "2025-10-23T10:00:00Z",
+        "source": "legacy",
+        "payload": {"order": 7, "total": 12.5}
+    }
+    with TestClient(app) as c:
+        assert c.post("/publish", json=event).json()["accepted"] == 1
+        time.sleep(1.5)
+        retry = {**event, "event_id": "regenerated-2", "payload": {"total": 12.5, "order": 7}}
+        data = c.post("/publish", json=retry).json()
+        assert data["accepted"] == 0
+        assert data["duplicates"] == 1
+
+def test_events_etag_and_invalidation(client):
+
+    event = {
+        "topic": "test.cache",
+        "event_id": "cache-1",
+        "timestamp": "2025-10-23T10:00:00Z",
+        "source": "test",
+        "payload": {}
+    }
+    client.post("/publish", json=event)
+    time.sleep(1.5)
+    
+    first = client.get("/events?topic=test.cache")
+    assert first.json()["count"] == 1
+    etag = first.headers["etag"]
+    assert client.get("/events?topic=test.cache").headers["etag"] == etag
+    assert client.get("/events?topic=test.cache", headers={"If-None-Match": etag}).status_code == 304
+    
+    client.post("/publish", json={**event, "event_id": "cache-2"})
+    time.sleep(1.5)
+    response = client.get("/events?topic=test.cache", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["count"] == 2
+    
+    stats = client.get("/health").json()["response_cache"]
+    assert stats["hits"] >= 1
+    assert stats["not_modified"] == 1
+
+def test_stats_etag(client):
+
+    first = client.get("/stats")
+    etag = first.headers["etag"]
+    assert client.get("/stats", headers={"If-None-Match": etag}).status_code == 304
+    
+    client.post("/publish", json={
+        "topic": "test.cache",
+        "event_id": "stats-1",
+        "timestamp": "2025-10-23T10:00:00Z",
+        "source": "test"
+    })
+    assert client.get("/stats", headers={"If-None-Match": etag}).status_code == 200
+
+def test_publish_rate_limited(client, monkeypatch):
+
+    monkeypatch.setenv("PUBLISH_SOURCE_RATES", "noisy=5")
+    events = [
+        {"topic": "test.limit", "event_id": f"limit-{i}", "timestamp": "2025-10-23T10:00:00Z", "source": "noisy"}
+        for i in range(5)
+    ]
+    with TestClient(app) as c:
+        assert c.post("/publish", json={"events": events}).status_code == 200
+        response = c.post("/publish", json=events[0])
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+        assert c.post("/publish", json={**events[0], "source": "quiet"}).status_code == 200
+        assert c.get("/health").json()["rate_limits"]["rejected"] == 1
+
+def test_forwarded_header_does_not_bypass_rate_limit(client, monkeypatch):
+
+    monkeypatch.setenv("PUBLISH_SOURCE_RATES", "*=1")
+    event = {"topic": "test.limit", "timestamp": "2025-10-23T10:00:00Z", "source": "noisy"}
+    with TestClient(app) as c:
+        statuses = [
+            c.post(
+                "/publish",
+                json={**event, "event_id": f"forged-{i}"},
+                headers={"X-Cluster-Forwarded": "http://peer:8080"}
+            ).status_code
+            for i in range(3)
+        ]
+        assert statuses == [200, 429, 429]
+
+def test_events_compressed_when_large(client):
+
+    batch = {
+        "events": [
+            {"topic": "test.gzip", "event_id": f"gzip-{i}", "timestamp": "2025-10-23T10:00:00Z", "source": "test"}
+            for i in range(50)
+        ]
+    }
+    client.post("/publish", json=batch)
+    time.sleep(1.5)
+    
+    response = client.get("/events?topic=test.gzip&limit=1000", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json()["count"] == 50
+    assert response.json()["events"][0]["payload"]["processed_at"]
+    
+    plain = client.get("/events?topic=test.gzip&limit=1000", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == response.json()
+
+def test_debug_endpoints(client, monkeypatch):
+
+    assert client.get("/debug/profile?seconds=0.2").status_code == 404
+    
+    monkeypatch.setenv("DEBUG_PROFILE", "true")
+    response = client.get("/debug/profile?seconds=0.2&threads=all")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    line = response.text.splitlines()[0]
+    assert int(line.rsplit(" ", 1)[1]) >= 1
+    
+    assert client.get("/debug/profile?threads=some").status_code == 400
+    loop = client.get("/debug/loop").json()
+    assert "histogram" in loop
+    assert "loop_lag" in client.get("/health").json()
+
+def test_dead_letters_redrive(client, monkeypatch):
+
+    from src.consumer import EventConsumer
+    broken = {"on": True}
+    
+    async def handle_event(self, event):
+        if broken["on"]:
+            raise RuntimeError("downstream unavailable")
+    
+    monkeypatch.setattr(EventConsumer, "handle_event", handle_event)
+    monkeypatch.setenv("RETRY_MAX_ATTEMPTS", "1")
+    event = {"topic": "test.dlq", "event_id": "dlq-1", "timestamp": "2025-10-23T10:00:00Z", "source": "test"}
+    with TestClient(app) as c:
+        c.post("/publish", json=event)
+        time.sleep(1.5)
+        page = c.get("/dlq?topic=test.dlq").json()
+        assert page["total"] == 1
+        assert page["entries"][0]["event_id"] == "dlq-1"
+        assert "downstream unavailable" in page["entries"][0]["error"]
+        
+        broken["on"] = False
+        assert c.post("/dlq/redrive?topic=test.dlq").json() == {"redriven": 1, "remaining": 0}
+        time.sleep(0.2)
+        assert c.get("/health").json()["retries"]["recovered"] == 1
+        assert c.get("/dlq").json()["entries"] == []
@@ -0,0 +1,82 @@
+import gzip
+import json
+import pytest
+from src.bulk_import import BulkImporter, build_store
+
+def lines(start, stop, topic="archive.orders", **extra):
+
+    return [
+        json.dumps({"topic": topic, "event_id": f"a-{i}", "timestamp": "2025-10-23T10:00:00Z",
+                    "source": "archive", "payload": {"n": i}, **extra})
+        for i in range(start, stop)
+    ]
+
+@pytest.mark.asyncio
+async def test_import_dedups_like_consumer(tmp_path, db_path, open_store):
+
+    plain = tmp_path / "day1.ndjson"
+    plain.write_text("\n".join(lines(0, 50) + lines(10, 20) + ["{not json", '{"topic": "x"}', ""]) + "\n")
+    packed = tmp_path / "day2.log"
+    with gzip.open(packed, "wt") as f:
+        f.write("\n".join(lines(40, 120)) + "\n")
+    
+    store = await open_store(store=build_store(db_path)[0])
+    try:
+        report = await BulkImporter(store, workers=1, chunk_lines=16).run([plain, packed])
+        assert report["imported"] == 120
+        assert report["duplicates"] == 10 + 10
+        assert report["invalid"] == 2
+        assert report["files"][1]["lines"] == 80
+        assert report["deferred_indexes"] >= 2
+        assert await store.get_processed_count() == 120
+        
+        # Indexes are back and imported events are rolled up like consumed ones.
+        cursor = await store._db.execute("SELECT name FROM sqlite_master WHERE name = 'idx_processed_at'")
+        assert await cursor.fetchone() is not None
+        cursor = await store._db.execute("SELECT SUM(count) FROM rollup_hour WHERE topic = 'archive.orders'")
+        assert (await cursor.fetchone())[0] == 120
+    finally:
+        await store.close()
+
+@pytest.mark.asyncio
+async def test_import_resumes_from_saved_offset(tmp_path, db_path, open_store):
+
+    archive = tmp_path / "events.ndjson"
+    archive.write_text("\n".join(lines(0, 30)) + "\n")
+    store = await open_store(store=build_store(db_path)[0])
+    try:
+        importer = BulkImporter(store, workers=1, chunk_lines=8)
+        first = await importer.run([archive], defer_indexes=False)
+        assert first["imported"] == 30
+        
+        # Only what was appended since is read on the next run.
+        with open(archive, "a") as f:
+            f.write("\n".join(lines(30, 35)) + "\n")
+        second = await importer.run([archive], defer_indexes=False)
+        assert second["files"][0]["resumed_at"] > 0
+        assert second["lines"] == 5
+        assert second["imported"] == 5
+        
+        again = await importer.run([archive], resume=False, defer_indexes=False)
+        assert again["lines"] == 35
+        assert again["imported"] == 0
+    finally:
+        await store.close()
+
+@pytest.mark.asyncio
+async def test_import_fingerprints_content_duplicates(tmp_path, db_path, open_store, monkeypatch):
+
+    monkeypatch.setenv("DEDUP_FINGERPRINT_TOPICS", "archive.*")
+    archive = tmp_path / "retries.ndjson"
+    # Same content under regenerated ids (payload n is the same for a-1 and b-1).
+    archive.write_text("\n".join(lines(0, 5) + [
+        json.dumps({"topic": "archive.orders", "event_id": "b-1", "timestamp": "2025-10-23T10:00:00Z",
+                    "source": "archive", "payload": {"n": 1}})
+    ]) + "\n")
+    store = await open_store(store=build_store(db_path)[0])
+    try:
+        report = await BulkImporter(store, fingerprint_topics=["archive.*"], workers=1).run([archive])
+        assert report["imported"] == 5
+        assert report["duplicates"] == 1
+    finally:
+        await store.close()
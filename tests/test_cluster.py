@@ -0,0 +1,111 @@
+import pytest
+import httpx
+import json
+from src.cluster import FORWARDED_HEADER, SECRET_HEADER, Cluster, HashRing
+
+NODES = ["http://a:8080", "http://b:8080", "http://c:8080"]
+KEYS = [(f"topic-{i % 7}", f"evt-{i}") for i in range(6000)]
+
+def test_ring_is_deterministic():
+
+    first = HashRing(NODES)
+    second = HashRing(list(reversed(NODES)))
+
+    assert all(first.owner(*key) == second.owner(*key) for key in KEYS)
+
+def test_ring_balance():
+
+    ring = HashRing(NODES)
+    counts = {node: 0 for node in NODES}
+    for key in KEYS:
+        counts[ring.owner(*key)] += 1
+
+    for count in counts.values():
+        assert abs(count - len(KEYS) / 3) < len(KEYS) * 0.1
+
+def test_ring_minimal_movement_on_add():
+
+    before = HashRing(NODES)
+    after = HashRing(NODES + ["http://d:8080"])
+
+    moved = [key for key in KEYS if before.owner(*key) != after.owner(*key)]
+    assert all(after.owner(*key) == "http://d:8080" for key in moved)
+    assert abs(len(moved) - len(KEYS) / 4) < len(KEYS) * 0.1
+
+def test_ring_partition_keeps_order():
+
+    ring = HashRing(NODES)
+    parts = ring.partition((t, e, (t, e)) for t, e in KEYS[:100])
+
+    assert sum(len(items) for items in parts.values()) == 100
+    for node, items in parts.items():
+        assert items == [key for key in KEYS[:100] if ring.owner(*key) == node]
+
+def test_ring_requires_nodes():
+
+    with pytest.raises(ValueError):
+        HashRing([])
+
+def test_cluster_requires_self_in_nodes():
+
+    with pytest.raises(ValueError):
+        Cluster("http://x:8080", NODES)
+
+@pytest.mark.asyncio
+async def test_forward_all_reports_failed_nodes():
+    seen = []
+
+    def handler(request):
+        seen.append((request.url.host, request.headers[FORWARDED_HEADER], json.loads(request.content)))
+        if request.url.host == "c":
+            return httpx.Response(500)
+        return httpx.Response(200, json={"accepted": 1, "duplicates": 0})
+
+    cluster = Cluster("http://a:8080", NODES, transport=httpx.MockTransport(handler))
+    outcome = await cluster.forward_all({
+        "http://b:8080": [{"event_id": "1"}],
+        "http://c:8080": [{"event_id": "2"}],
+    })
+    await cluster.close()
+
+    assert outcome["http://b:8080"] == {"accepted": 1, "duplicates": 0}
+    assert isinstance(outcome["http://c:8080"], httpx.HTTPStatusError)
+    assert ("b", "http://a:8080", {"events": [{"event_id": "1"}]}) in seen
+    assert cluster.stats == {"forwarded_events": 1, "forward_errors": 1}
+
+@pytest.mark.asyncio
+async def test_gather_queries_peers_only():
+
+    def handler(request):
+        return httpx.Response(200, json={"node": request.url.host})
+
+    cluster = Cluster("http://a:8080", NODES, transport=httpx.MockTransport(handler))
+    results = await cluster.gather("/stats")
+    await cluster.close()
+
+    assert results == {"http://b:8080": {"node": "b"}, "http://c:8080": {"node": "c"}}
+
+@pytest.mark.asyncio
+async def test_trusts_only_peers_with_secret():
+
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get(SECRET_HEADER))
+        return httpx.Response(200, json={})
+
+    cluster = Cluster("http://a:8080", NODES, secret="s3cret", transport=httpx.MockTransport(handler))
+    await cluster.post_json("http://b:8080", "/cluster/keys", {"rows": []})
+    await cluster.close()
+
+    assert seen == ["s3cret"]
+    assert cluster.trusts("http://b:8080", "s3cret")
+    assert not cluster.trusts("http://b:8080", None)
+    assert not cluster.trusts("http://b:8080", "guess")
+    assert not cluster.trusts("http://x:8080", "s3cret")
+    assert not cluster.trusts(None, "s3cret")
+    # Without a secret the header must at least name a peer.
+    open_cluster = Cluster("http://a:8080", NODES)
+    assert open_cluster.trusts("http://c:8080/", None)
+    assert not open_cluster.trusts("http://a:8080", None)
+    await open_cluster.close()
@@ -0,0 +1,109 @@
+import pytest
+from tests.conftest import make_records
+
+np = pytest.importorskip("numpy")
+
+from src.cold_keys import ColdKeyIndex, merge_sorted
+
+def cold_index(directory):
+
+    return lambda store: ColdKeyIndex(store, str(directory), min_delta=1)
+
+def test_merge_sorted_interleaves():
+
+    rng = np.random.default_rng(7)
+    values = np.unique(rng.integers(0, 2**63, 5000, dtype=np.uint64))
+    rng.shuffle(values)
+    old, new = np.sort(values[:4000]), np.sort(values[4000:])
+    out = np.empty(len(values), dtype=np.uint64)
+    merge_sorted(old, new, out, chunk=333)
+    assert (out == np.sort(values)).all()
+
+@pytest.mark.asyncio
+async def test_new_keys_skip_sqlite(open_store, tmp_path):
+
+    store, index = await open_store(cold_index(tmp_path / "cold"), indexes=True)
+    try:
+        await store.mark_processed_batch(make_records(200, topic="cold.topic"))
+        # Not authoritative until loaded: everything goes to SQLite.
+        assert index.lookup([("cold.topic", "evt-1")]) == (set(), [("cold.topic", "evt-1")])
+        await index.load()
+        assert index.get_stats()["delta_keys"] == 200
+        
+        assert await index.build() == 200
+        assert index.get_stats()["delta_keys"] == 0
+        await store.mark_processed_batch(make_records(10, topic="cold.topic", prefix="late"))
+        
+        keys = [("cold.topic", f"evt-{i}") for i in range(0, 400, 20)] + [("cold.topic", "late-3")]
+        skipped = index.stats["sqlite_skipped"]
+        existing = await store.get_existing(keys)
+        assert existing == {key for key in keys if key[1] == "late-3" or int(key[1][4:]) < 200}
+        assert index.stats["sqlite_skipped"] - skipped == 10
+    finally:
+        await store.close()
+
+@pytest.mark.asyncio
+async def test_reused_rowids_found_after_restart(open_store, tmp_path):
+
+    store, index = await open_store(cold_index(tmp_path / "cold"), indexes=True)
+    await store.mark_processed_batch(make_records(50))
+    await index.load()
+    await index.build()
+    # The new rows take the deleted rows' rowids, all covered by the snapshot.
+    await store.delete_keys([("test.topic", f"evt-{i}") for i in range(45, 50)])
+    await store.mark_processed_batch(make_records(5, prefix="reused"))
+    await store.close()
+    
+    store, index = await open_store(cold_index(tmp_path / "cold"), indexes=True)
+    try:
+        await index.load()
+        keys = [("test.topic", f"reused-{i}") for i in range(5)]
+        assert await store.get_existing(keys) == set(keys)
+        
+        await index.build()
+        assert await store.get_state("cold_keys_rescan", -1) == -1
+    finally:
+        await store.close()
+    
+    store, index = await open_store(cold_index(tmp_path / "cold"), indexes=True)
+    try:
+        await index.load()
+        assert index.get_stats()["delta_keys"] == 0
+        assert await store.get_existing(keys) == set(keys)
+    finally:
+        await store.close()
+
+@pytest.mark.asyncio
+async def test_snapshot_reused_after_restart(open_store, tmp_path):
+
+    store, index = await open_store(cold_index(tmp_path / "cold"), indexes=True)
+    await store.mark_processed_batch(make_records(50))
+    await index.load()
+    await index.build()
+    await store.mark_processed_batch(make_records(5, prefix="after"))
+    await store.close()
+    
+    store, index = await open_store(cold_index(tmp_path / "cold"), indexes=True)
+    try:
+        await index.load()
+        assert index.get_stats()["cold_keys"] == 50
+        assert index.get_stats()["delta_keys"] == 5
+        assert await store.mark_processed_batch(make_records(3, prefix="after") + make_records(1, prefix="new")) == [
+            False, False, False, True
+        ]
+        
+        await store.delete_keys([("test.topic", "evt-0")])
+        await index.build()
+    finally:
+        await store.close()
+    
+    # Without the snapshot the database names, every row goes to the delta.
+    for path in (tmp_path / "cold").glob("*.npy"):
+        path.unlink()
+    store, index = await open_store(cold_index(tmp_path / "cold"), indexes=True)
+    try:
+        await index.load()
+        assert index.get_stats()["cold_keys"] == 0
+        assert index.get_stats()["delta_keys"] == 55
+    finally:
+        await store.close()
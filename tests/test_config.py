@@ -0,0 +1,41 @@
+import pytest
+from src.config import TopicRules, parse_duration, parse_topic_map
+
+def test_parse_topic_map():
+
+    rules = parse_topic_map("system.alert=1, user.*=4,", float)
+    assert rules == {"system.alert": 1.0, "user.*": 4.0}
+
+def test_parse_topic_map_empty():
+
+    assert parse_topic_map(None, int) == {}
+    assert parse_topic_map("", int) == {}
+
+def test_parse_topic_map_invalid():
+
+    with pytest.raises(ValueError):
+        parse_topic_map("system.alert", int)
+
+def test_topic_rules_exact_before_pattern():
+
+    rules = TopicRules({"user.*": 1, "user.login": 2}, default=0)
+    assert rules.get("user.login") == 2
+    assert rules.get("user.logout") == 1
+    assert rules.get("order.created") == 0
+
+def test_topic_rules_pattern_order():
+
+    rules = TopicRules({"order.*": 1, "*": 2}, default=0)
+    assert rules.get("order.paid") == 1
+    assert rules.get("anything") == 2
+
+def test_parse_duration():
+
+    assert parse_duration("90") == 90.0
+    assert parse_duration("30s") == 30.0
+    assert parse_duration("10m") == 600.0
+    assert parse_duration("2h") == 7200.0
+    assert parse_duration("7d") == 7 * 86400.0
+    assert parse_topic_map("metrics.*=10m", parse_duration) == {"metrics.*": 600.0}
+    with pytest.raises(ValueError):
+        parse_duration("soon")
@@ -0,0 +1,97 @@
+import pytest
+import pytest_asyncio
+import asyncio
+import os
+from src.consumer import EventConsumer
+from src.dedup_store import DedupStore
+from src.event_queue import EventQueue
+from tests.conftest import make_records
+
+@pytest_asyncio.fixture
+async def dedup_store(db_path):
+    store = DedupStore(db_path=db_path)
+    await store.initialize()
+    yield store
+    await store.close()
+
+@pytest.mark.asyncio
+async def test_drain_flushes_queue(dedup_store):
+    queue = EventQueue(maxsize=5000)
+    consumer = EventConsumer(queue, dedup_store)
+    await consumer.start()
+
+    await queue.enqueue_batch(make_records(1200, topic="test.drain"))
+    report = await consumer.drain(timeout=10.0)
+
+    assert consumer.running is False
+    assert report["remaining"] == 0
+    assert report["timed_out"] is False
+    assert await dedup_store.get_processed_count() == 1200
+    assert consumer.stats["processed"] == 1200
+
+@pytest.mark.asyncio
+async def test_drain_idle_consumer_returns_quickly(dedup_store):
+    queue = EventQueue(maxsize=100, mode="ring")
+    consumer = EventConsumer(queue, dedup_store, max_wait=5.0)
+    await consumer.start()
+    await asyncio.sleep(0)
+
+    report = await asyncio.wait_for(consumer.drain(timeout=10.0), timeout=1.0)
+
+    assert report == {**report, "drained": 0, "remaining": 0, "timed_out": False}
+
+@pytest.mark.asyncio
+async def test_drain_stops_at_deadline(dedup_store):
+    queue = EventQueue(maxsize=5000)
+    consumer = EventConsumer(queue, dedup_store)
+
+    await queue.enqueue_batch(make_records(1000, topic="test.drain"))
+    report = await consumer.drain(timeout=0)
+
+    assert report["drained"] == 0
+    assert report["remaining"] == 1000
+    assert report["timed_out"] is True
+
+@pytest.mark.asyncio
+async def test_checkpoint(dedup_store):
+    await dedup_store.mark_processed("test.drain", "evt-1", "2025-10-23T10:00:00Z", "test")
+    await dedup_store.checkpoint()
+
+    assert os.path.getsize(dedup_store.db_path + "-wal") == 0
+
+@pytest.mark.asyncio
+async def test_store_error_retries_batch(dedup_store, monkeypatch):
+    queue = EventQueue(maxsize=100)
+    consumer = EventConsumer(queue, dedup_store)
+    mark = dedup_store.mark_processed_batch
+    failures = []
+
+    async def flaky(events):
+        if len(failures) < 2:
+            failures.append(len(events))
+            raise RuntimeError("database is locked")
+        return await mark(events)
+
+    monkeypatch.setattr(dedup_store, "mark_processed_batch", flaky)
+    monkeypatch.setattr("src.consumer.MARK_RETRY_DELAY", 0)
+    await consumer._process_batch(make_records(10, topic="test.retry"))
+
+    assert failures == [10, 10]
+    assert consumer.stats["processed"] == 10
+    assert await dedup_store.get_processed_count() == 10
+
+@pytest.mark.asyncio
+async def test_store_failure_requeues_batch(dedup_store, monkeypatch):
+    queue = EventQueue(maxsize=100)
+    consumer = EventConsumer(queue, dedup_store)
+
+    async def broken(events):
+        raise RuntimeError("disk I/O error")
+
+    monkeypatch.setattr(dedup_store, "mark_processed_batch", broken)
+    monkeypatch.setattr("src.consumer.MARK_RETRY_DELAY", 0)
+    await consumer._process_batch(make_records(10, topic="test.retry"))
+
+    assert queue.qsize() == 10
+    assert consumer.stats["requeued"] == 10
+    assert consumer.stats["processed"] == 0
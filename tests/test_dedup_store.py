@@ -4,6 +4,7 @@ import asyncio
 import os
 from pathlib import Path
 from src.dedup_store import DedupStore
+from src.models import Event, EventRecord
 
 @pytest_asyncio.fixture
 async def dedup_store():
@@ -11,6 +12,7 @@ async def dedup_store():
     store = DedupStore(db_path=db_path)
     await store.initialize()
     yield store
+    await store.close()
     if os.path.exists(db_path):
         os.remove(db_path)
 
@@ -22,6 +24,7 @@ async def test_initialize():
     
     assert os.path.exists(db_path)
     
+    await store.close()
     os.remove(db_path)
 
 @pytest.mark.asyncio
@@ -138,3 +141,93 @@ async def test_topic_isolation(dedup_store):
     
     assert is_dup1 is True
     assert is_dup2 is True
+
+@pytest.mark.asyncio
+async def test_get_existing(dedup_store):
+
+    await dedup_store.mark_processed("topic1", "evt-001", "2025-10-23T10:00:00Z", "test")
+    await dedup_store.mark_processed("topic2", "evt-002", "2025-10-23T10:00:00Z", "test")
+
+    existing = await dedup_store.get_existing([
+        ("topic1", "evt-001"),
+        ("topic1", "evt-002"),
+        ("topic2", "evt-002"),
+        ("topic3", "evt-001"),
+    ])
+    assert existing == {("topic1", "evt-001"), ("topic2", "evt-002")}
+
+@pytest.mark.asyncio
+async def test_get_existing_large_lookup(dedup_store):
+
+    await dedup_store.mark_processed("topic1", "evt-999", "2025-10-23T10:00:00Z", "test")
+
+    keys = [("topic1", f"evt-{i}") for i in range(1000)]
+    existing = await dedup_store.get_existing(keys)
+    assert existing == {("topic1", "evt-999")}
+
+@pytest.mark.asyncio
+async def test_mark_processed_batch(dedup_store):
+
+    await dedup_store.mark_processed("topic1", "evt-001", "2025-10-23T10:00:00Z", "test")
+
+    events = [
+        Event(topic="topic1", event_id=event_id, timestamp="2025-10-23T10:00:00Z", source="test")
+        for event_id in ["evt-001", "evt-002", "evt-003", "evt-002"]
+    ]
+    flags = await dedup_store.mark_processed_batch(events)
+
+    assert flags == [False, True, True, False]
+    assert await dedup_store.get_processed_count() == 3
+    assert await dedup_store.is_duplicate("topic1", "evt-003") is True
+
+@pytest.mark.asyncio
+async def test_mark_processed_batch_empty(dedup_store):
+
+    flags = await dedup_store.mark_processed_batch([])
+    assert flags == []
+
+@pytest.mark.asyncio
+async def test_warm_and_integrity_check(dedup_store):
+    await dedup_store.mark_processed_batch([
+        EventRecord("test.topic", f"evt-{i}", "2025-10-23T10:00:00Z", "test") for i in range(250)
+    ])
+
+    progress = []
+    await dedup_store.warm(lambda done, total: progress.append((done, total)), chunk=100)
+    assert progress[-1] == (250, 250)
+    assert len(progress) == 3
+
+    await dedup_store.integrity_check()
+
+class BlindIndex:
+    # A key index that has drifted from disk: rules every key out.
+    def lookup(self, keys):
+        return set(), []
+
+    def forget(self, keys):
+        pass
+
+@pytest.mark.asyncio
+async def test_mark_processed_batch_conflict_keeps_batch(dedup_store):
+
+    await dedup_store.mark_processed("test.topic", "evt-1", "2025-10-23T10:00:00Z", "test")
+    dedup_store.add_key_index(BlindIndex())
+    records = [EventRecord("test.topic", f"evt-{i}", "2025-10-23T10:00:00Z", "test") for i in range(3)]
+
+    assert await dedup_store.mark_processed_batch(records) == [True, False, True]
+    assert await dedup_store.get_processed_count() == 3
+
+@pytest.mark.asyncio
+async def test_reads_ignore_uncommitted_rows(dedup_store):
+
+    await dedup_store.mark_processed("test.topic", "evt-0", "2025-10-23T10:00:00Z", "test")
+    assert await dedup_store.get_state("missing") == 0
+    async with dedup_store.transaction() as db:
+        await db.execute(
+            "INSERT INTO processed_events VALUES ('test.topic', 'evt-1', '2025-10-23T10:00:00Z', 'test', '')"
+        )
+        assert await dedup_store.get_existing([("test.topic", "evt-1")]) == set()
+        assert await dedup_store.get_processed_count() == 1
+        assert await dedup_store.get_count_by_topic("test.topic") == 1
+    assert await dedup_store.get_existing([("test.topic", "evt-1")]) == {("test.topic", "evt-1")}
+    assert await dedup_store.get_processed_count() == 2
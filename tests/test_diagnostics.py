@@ -0,0 +1,57 @@
+import asyncio
+import threading
+import time
+import pytest
+from src.diagnostics import LoopMonitor, format_collapsed, sample_stacks
+
+def blocking_handler():
+
+    time.sleep(0.3)
+
+@pytest.mark.asyncio
+async def test_slow_callback_reports_stack():
+    monitor = LoopMonitor(interval=0.02, slow_threshold=0.1)
+    await monitor.start()
+    await asyncio.sleep(0.1)
+    blocking_handler()
+    await asyncio.sleep(0.1)
+    await monitor.stop()
+    
+    stats = monitor.get_stats(detail=True)
+    assert stats["slow_callbacks"] == 1
+    assert stats["max_ms"] >= 250
+    assert stats["histogram"]["le_500ms"] == 1
+    slow = stats["recent_slow"][0]
+    assert slow["stack"].endswith("tests.test_diagnostics:blocking_handler")
+
+def test_lag_percentiles():
+
+    monitor = LoopMonitor()
+    for lag in [0.5] * 98 + [30, 700]:
+        monitor.record(lag)
+    assert monitor.percentile(0.5) == 1.0
+    assert monitor.percentile(0.99) == 50.0
+    assert monitor.percentile(1.0) == 1000.0
+    assert monitor.get_stats()["slow_callbacks"] == 1
+
+def busy(stop):
+
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_sample_stacks_collapsed():
+
+    stop = threading.Event()
+    worker = threading.Thread(target=busy, args=(stop,), name="busy-worker")
+    worker.start()
+    try:
+        stacks = sample_stacks(0.2, hz=200)
+    finally:
+        stop.set()
+        worker.join()
+    
+    lines = format_collapsed(stacks).splitlines()
+    busy_lines = [line for line in lines if line.startswith("busy-worker;")]
+    assert busy_lines
+    assert "tests.test_diagnostics:busy" in busy_lines[0]
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in busy_lines) >= 10
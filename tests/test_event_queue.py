@@ -1,7 +1,7 @@
 
 import pytest
 import asyncio
-from src.event_queue import EventQueue
+from src.event_queue import EventQueue, AdaptiveBatchSizer
 from src.models import Event
 
 @pytest.fixture
@@ -129,3 +129,142 @@ async def test_fifo_order(event_queue):
         event = await event_queue.dequeue()
         assert event.event_id == f"evt-{i}"
         assert event.payload["order"] == i
+
+@pytest.mark.asyncio
+async def test_dequeue_batch_drains_ready_items(event_queue):
+
+    events = [
+        Event(
+            topic="test",
+            event_id=f"evt-{i}",
+            timestamp="2025-10-23T10:00:00Z",
+            source="test",
+            payload={}
+        )
+        for i in range(5)
+    ]
+    await event_queue.enqueue_batch(events)
+
+    batch = await event_queue.dequeue_batch(max_items=3, max_wait=0.01)
+    assert [e.event_id for e in batch] == ["evt-0", "evt-1", "evt-2"]
+
+    batch = await event_queue.dequeue_batch(max_items=10, max_wait=0.01)
+    assert [e.event_id for e in batch] == ["evt-3", "evt-4"]
+    assert event_queue.qsize() == 0
+
+@pytest.mark.asyncio
+async def test_dequeue_batch_timeout_on_empty(event_queue):
+
+    batch = await event_queue.dequeue_batch(max_items=10, max_wait=0.01)
+    assert batch == []
+
+@pytest.mark.asyncio
+async def test_dequeue_batch_waits_for_first_item(event_queue, sample_event):
+
+    async def produce_later():
+        await asyncio.sleep(0.01)
+        await event_queue.enqueue(sample_event)
+
+    producer = asyncio.create_task(produce_later())
+    batch = await event_queue.dequeue_batch(max_items=10, max_wait=1.0)
+    await producer
+
+    assert len(batch) == 1
+    assert batch[0].event_id == sample_event.event_id
+
+def test_adaptive_batch_sizer_grows_under_load():
+
+    sizer = AdaptiveBatchSizer(min_size=1, max_size=8)
+    sizes = [sizer.update(sizer.size) for _ in range(5)]
+    assert sizes == [2, 4, 8, 8, 8]
+
+def test_adaptive_batch_sizer_shrinks_when_idle():
+
+    sizer = AdaptiveBatchSizer(min_size=1, max_size=64)
+    sizer.size = 64
+    assert sizer.update(10) == 32
+    assert sizer.update(20) == 32
+    assert sizer.update(0) == 16
+    for _ in range(10):
+        sizer.update(0)
+    assert sizer.size == 1
+
+@pytest.mark.asyncio
+async def test_fair_mode_interleaves_topics():
+
+    queue = EventQueue(maxsize=100, mode="fair")
+    for i in range(5):
+        await queue.enqueue(Event(topic="noisy", event_id=f"n-{i}", timestamp="2025-10-23T10:00:00Z", source="test"))
+    await queue.enqueue(Event(topic="quiet", event_id="q-0", timestamp="2025-10-23T10:00:00Z", source="test"))
+
+    batch = await queue.dequeue_batch(max_items=2, max_wait=0.01)
+    assert [e.topic for e in batch] == ["noisy", "quiet"]
+    assert queue.qsize() == 4
+
+@pytest.mark.asyncio
+async def test_fair_mode_topic_capacity():
+
+    queue = EventQueue(maxsize=100, mode="fair", topic_capacities={"system.*": 1})
+    event = Event(topic="system.alert", event_id="a-0", timestamp="2025-10-23T10:00:00Z", source="test")
+
+    assert await queue.enqueue(event) is True
+    assert await queue.enqueue(event) is False
+    assert queue.topic_sizes() == {"system.alert": 1}
+
+@pytest.mark.asyncio
+async def test_fair_mode_dequeue_waits(sample_event):
+
+    queue = EventQueue(maxsize=10, mode="fair")
+    assert await queue.dequeue_batch(max_items=5, max_wait=0.01) == []
+
+    async def produce_later():
+        await asyncio.sleep(0.01)
+        await queue.enqueue(sample_event)
+
+    producer = asyncio.create_task(produce_later())
+    event = await queue.dequeue()
+    await producer
+    assert event.event_id == sample_event.event_id
+    assert queue.is_empty() is True
+
+def test_invalid_mode():
+
+    with pytest.raises(ValueError):
+        EventQueue(maxsize=10, mode="lifo")
+
+@pytest.mark.asyncio
+async def test_ring_mode_matches_fifo_api(sample_event):
+
+    queue = EventQueue(maxsize=3, mode="ring")
+    events = [
+        Event(topic="test", event_id=f"evt-{i}", timestamp="2025-10-23T10:00:00Z", source="test")
+        for i in range(5)
+    ]
+
+    assert await queue.enqueue_batch(events) == 3
+    assert queue.is_full() is True
+    assert await queue.enqueue(sample_event) is False
+
+    first = await queue.dequeue()
+    assert first.event_id == "evt-0"
+    batch = await queue.dequeue_batch(max_items=10, max_wait=0.01)
+    assert [e.event_id for e in batch] == ["evt-1", "evt-2"]
+    assert queue.is_empty() is True
+
+@pytest.mark.asyncio
+async def test_ring_mode_wakes_waiting_consumer():
+
+    queue = EventQueue(maxsize=10, mode="ring")
+    events = [
+        Event(topic="test", event_id=f"evt-{i}", timestamp="2025-10-23T10:00:00Z", source="test")
+        for i in range(4)
+    ]
+
+    async def produce_later():
+        await asyncio.sleep(0.01)
+        await queue.enqueue_batch(events)
+
+    producer = asyncio.create_task(produce_later())
+    batch = await queue.dequeue_batch(max_items=10, max_wait=1.0)
+    await producer
+    assert len(batch) == 4
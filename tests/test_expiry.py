@@ -0,0 +1,142 @@
+import pytest
+import math
+import random
+import time
+from src.dedup_store import DedupStore
+from src.expiry import DedupWindows, TimingWheel
+from src.retry import RetryScheduler
+from tests.conftest import make_records
+
+def test_wheel_matches_brute_force():
+
+    # Small wheel (4 slots x 3 levels = 64 ticks) so cascades and the overflow
+    # list are both exercised.
+    rng = random.Random(7)
+    wheel = TimingWheel(tick=1.0, slots=4, levels=3, now=1000.0)
+    deadlines = {}
+    for i in range(2000):
+        deadline = 1000.0 + rng.uniform(0.1, 300.0)
+        assert wheel.add(deadline, i)
+        deadlines[i] = deadline
+    assert wheel.size == 2000
+    
+    now = 1000.0
+    seen = set()
+    while now < 1400.0:
+        now += rng.uniform(0.0, 7.0)
+        seen.update(wheel.advance(now))
+        assert seen == {i for i, deadline in deadlines.items() if math.ceil(deadline) <= math.floor(now)}
+    assert seen == set(deadlines)
+    assert wheel.size == 0
+
+def test_wheel_rejects_past_deadlines():
+
+    wheel = TimingWheel(tick=1.0, now=1000.0)
+    
+    assert wheel.add(999.0, "late") is False
+    assert wheel.add(1000.0, "now") is False
+    assert wheel.add(1000.5, "next") is True
+    assert wheel.advance(1000.9) == []
+    assert wheel.advance(1001.0) == ["next"]
+
+@pytest.mark.asyncio
+async def test_windows_expire_only_windowed_topics(db_path):
+    store = DedupStore(db_path=db_path)
+    windows = DedupWindows(store, {"short.*": 10.0})
+    store.add_writer(windows)
+    await store.initialize()
+    
+    await store.mark_processed_batch(make_records(100, "short.retry", "a") + make_records(50, "long.audit", "a"))
+    assert windows.get_stats()["tracked"] == 100
+    
+    assert await windows.expire(now=time.time() + 5) == 0
+    assert await windows.expire(now=time.time() + 12) == 100
+    assert await store.get_processed_count() == 50
+    assert windows.get_stats()["tracked"] == 0
+    
+    # After its window a key is accepted again.
+    flags = await store.mark_processed_batch(make_records(1, "short.retry", "a") + make_records(1, "long.audit", "a"))
+    assert flags == [True, False]
+    await store.close()
+
+@pytest.mark.asyncio
+async def test_windows_load_and_import(db_path):
+    store = DedupStore(db_path=db_path)
+    await store.initialize()
+    await store.mark_processed_batch(make_records(30, "short.retry", "old") + make_records(30, "long.audit", "old"))
+    await store.close()
+    
+    store = DedupStore(db_path=db_path)
+    windows = DedupWindows(store, {"short.*": 10.0})
+    store.add_writer(windows)
+    await store.initialize()
+    
+    progress = []
+    await windows.load(lambda done, total: progress.append((done, total)), chunk=7)
+    assert windows.get_stats()["keys_loaded"] == 30
+    assert progress == [(1, 1)]
+    
+    stale = "2020-01-01T00:00:00"
+    await store.import_keys([("short.retry", f"imported-{i}", "2020-01-01T00:00:00Z", "test", stale) for i in range(5)])
+    assert windows.get_stats()["tracked"] == 35
+    
+    # Imported keys were already past their window: deleted on the next pass.
+    assert await windows.expire() == 5
+    assert await windows.expire(now=time.time() + 12) == 30
+    assert await store.get_processed_count() == 30
+    await store.close()
+
+@pytest.mark.asyncio
+async def test_windowed_topics_served_from_memory(db_path):
+    store = DedupStore(db_path=db_path)
+    windows = DedupWindows(store, {"short.*": 60.0})
+    store.add_writer(windows)
+    store.add_key_index(windows)
+    await store.initialize()
+    
+    # Inserted between initialize and load: tracked once, not twice.
+    await store.mark_processed_batch(make_records(20, "short.retry", "a") + make_records(5, "long.audit", "a"))
+    await windows.load()
+    assert windows.get_stats()["tracked"] == 20
+    assert windows.get_stats()["keys_loaded"] == 0
+    
+    # Once loaded, a windowed key missing from memory is new without a query;
+    # keys in memory are still decided by SQLite.
+    await store._db.execute("DELETE FROM processed_events WHERE event_id = 'a-1'")
+    await store._db.execute(
+        "INSERT INTO processed_events (topic, event_id, timestamp, source, processed_at) "
+        "VALUES ('short.retry', 'b-1', '', '', '')"
+    )
+    await store._db.commit()
+    existing = await store.get_existing([("short.retry", "a-1"), ("short.retry", "b-1"), ("long.audit", "a-2")])
+    assert existing == {("long.audit", "a-2")}
+    assert await store.is_duplicate("short.retry", "a-2") is True
+    
+    windows.forget([("short.retry", "a-2")])
+    assert await store.is_duplicate("short.retry", "a-2") is False
+    await store.close()
+
+@pytest.mark.asyncio
+async def test_windows_keep_keys_of_pending_events(db_path):
+    store = DedupStore(db_path=db_path)
+    windows = DedupWindows(store, {"short.*": 10.0})
+    retries = RetryScheduler(store, handler=None, max_attempts=1)
+    store.add_writer(windows)
+    store.add_writer(retries)
+    await store.initialize()
+    
+    records = make_records(6, "short.retry", "a")
+    await store.mark_processed_batch(records)
+    await retries.complete(records[:2])
+    await retries.schedule([(record, ValueError("boom")) for record in records[4:]])
+    # Still in flight or dead-lettered: kept.
+    assert await windows.expire(now=time.time() + 12) == 2
+    assert await store.get_processed_count() == 4
+    assert windows.get_stats()["held"] == 4
+    
+    await retries.complete(records[2:4])
+    assert await windows.expire(now=time.time() + 24) == 2
+    assert await store.get_existing([(r.topic, r.event_id) for r in records]) == {
+        (r.topic, r.event_id) for r in records[4:]
+    }
+    await store.close()
@@ -0,0 +1,63 @@
+import pytest
+import pytest_asyncio
+from src.dedup_store import DedupStore
+from src.fingerprint import FingerprintIndex, fingerprint_batch
+from src.models import Event, EventRecord
+
+def record(event_id, payload, topic="legacy.orders", source="legacy"):
+
+    event = Event(topic=topic, event_id=event_id, timestamp="2025-10-23T10:00:00Z", source=source, payload=payload)
+    return EventRecord.from_event(event, canonical=True)
+
+@pytest_asyncio.fixture
+async def store(db_path):
+    store = DedupStore(db_path=db_path)
+    index = FingerprintIndex(["legacy.*"])
+    store.add_writer(index)
+    store.set_fingerprints(index)
+    await store.initialize()
+    yield store, index
+    await store.close()
+
+def test_fingerprint_ignores_key_order_and_event_id():
+
+    digests = fingerprint_batch([
+        record("a", {"x": 1, "y": [1, 2]}),
+        record("b", {"y": [1, 2], "x": 1}),
+        record("c", {"x": 1, "y": [1, 2]}, source="other"),
+    ])
+    assert digests[0] == digests[1]
+    assert digests[0] != digests[2]
+    assert len(digests[0]) == 16
+
+@pytest.mark.asyncio
+async def test_content_duplicates_rejected(store):
+    store, index = store
+    first = [record("retry-1", {"order": 7}), record("plain-1", {"order": 7}, topic="orders")]
+    index.stamp(first)
+    assert first[1].fingerprint is None
+    assert await store.mark_processed_batch(first) == [True, True]
+
+    # Same content under regenerated ids: only the fingerprinted topic dedups,
+    # within the batch as well as against stored events.
+    again = [
+        record("retry-2", {"order": 7}),
+        record("plain-2", {"order": 7}, topic="orders"),
+        record("retry-3", {"order": 8}),
+        record("retry-4", {"order": 8}),
+    ]
+    index.stamp(again)
+    assert await store.mark_processed_batch(again) == [False, True, True, False]
+    assert await index.get_existing([(again[0].topic, again[0].fingerprint)]) == {("legacy.orders", again[0].fingerprint)}
+
+@pytest.mark.asyncio
+async def test_deleted_key_releases_fingerprint(store):
+    store, index = store
+    first = [record("retry-1", {"order": 7})]
+    index.stamp(first)
+    await store.mark_processed_batch(first)
+    await store.delete_keys([("legacy.orders", "retry-1")])
+
+    again = [record("retry-2", {"order": 7})]
+    index.stamp(again)
+    assert await store.mark_processed_batch(again) == [True]
@@ -0,0 +1,34 @@
+import gzip
+import pytest
+from src import http_encoding
+from src.http_encoding import encode_body, json_response, preferred_encoding
+
+def test_preferred_encoding(monkeypatch):
+
+    monkeypatch.setattr(http_encoding, "ENCODINGS", ("br", "gzip"))
+    assert preferred_encoding(None) is None
+    assert preferred_encoding("identity") is None
+    assert preferred_encoding("gzip, deflate") == "gzip"
+    assert preferred_encoding("gzip, br") == "br"
+    assert preferred_encoding("br;q=0.5, gzip") == "gzip"
+    assert preferred_encoding("gzip;q=0") is None
+    assert preferred_encoding("*") == "br"
+    monkeypatch.setattr(http_encoding, "ENCODINGS", ("gzip",))
+    assert preferred_encoding("br") is None
+
+def test_encode_body_skips_small_bodies():
+
+    assert encode_body(b"{}", "gzip") == (b"{}", None)
+    body = b'{"events": [' + b'{"a": 1},' * 500 + b"{}]}"
+    encoded, encoding = encode_body(body, "gzip")
+    assert encoding == "gzip"
+    assert gzip.decompress(encoded) == body
+    assert encode_body(body, None) == (body, None)
+
+def test_json_response_headers():
+
+    response = json_response(b"x", "gzip", headers={"ETag": '"1"'})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == '"1"'
+    assert "content-encoding" not in json_response(b"{}").headers
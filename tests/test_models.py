@@ -1,7 +1,7 @@
 
 import pytest
 from pydantic import ValidationError
-from src.models import Event, EventBatch, PublishResponse, EventsResponse, StatsResponse
+from src.models import Event, EventBatch, EventRecord, PublishResponse, EventsResponse, StatsResponse
 
 def test_event_valid():
 
@@ -158,3 +158,60 @@ def test_stats_response():
     assert response.duplicate_dropped == 20
     assert len(response.topics) == 2
     assert response.uptime_seconds == 3600.5
+
+def test_event_record_round_trip():
+
+    event = Event(
+        topic="user.login",
+        event_id="evt-001",
+        timestamp="2025-10-23T10:00:00Z",
+        source="auth-service",
+        payload={"user_id": "user-123", "success": True, "nested": {"n": [1, 2]}}
+    )
+
+    record = EventRecord.from_event(event)
+    assert isinstance(record.payload, bytes)
+    assert record.payload_dict() == event.payload
+
+    restored = record.to_event()
+    assert restored == event
+
+def test_event_record_integers_beyond_64_bits():
+
+    event = Event(
+        topic="test",
+        event_id="evt-001",
+        timestamp="2025-10-23T10:00:00Z",
+        source="test",
+        payload={"big": 2**70, "small": -1}
+    )
+
+    assert EventRecord.from_event(event).payload == b'{"big":1180591620717411303424,"small":-1}'
+    assert EventRecord.from_event(event, canonical=True).payload == b'{"big":1180591620717411303424,"small":-1}'
+    assert EventRecord.from_event(event).payload_dict() == {"big": 2**70, "small": -1}
+
+def test_event_record_empty_payload():
+
+    event = Event(
+        topic="test",
+        event_id="evt-001",
+        timestamp="2025-10-23T10:00:00Z",
+        source="test"
+    )
+
+    record = EventRecord.from_event(event)
+    assert record.payload == b"{}"
+    assert record.to_event().payload == {}
+
+def test_event_record_interns_topic_and_source():
+
+    first = EventRecord("".join(["user.", "login"]), "evt-1", "2025-10-23T10:00:00Z", "".join(["auth", "-svc"]))
+    second = EventRecord("".join(["user.", "login"]), "evt-2", "2025-10-23T10:00:00Z", "".join(["auth", "-svc"]))
+
+    assert first.topic is second.topic
+    assert first.source is second.source
+
+def test_event_record_has_no_instance_dict():
+
+    record = EventRecord("test", "evt-1", "2025-10-23T10:00:00Z", "test")
+    assert not hasattr(record, "__dict__")
@@ -0,0 +1,58 @@
+import math
+import pytest
+from src.models import EventRecord
+from src.rate_limit import AdmissionControl, TokenBuckets
+from tests.conftest import make_records
+
+def from_source(source, count, topic="test.topic"):
+
+    return [EventRecord(topic, f"{source}-{i}", "2025-10-23T10:00:00Z", source) for i in range(count)]
+
+def test_bucket_refills_lazily():
+
+    buckets = TokenBuckets({"noisy": 10}, burst=1.0)
+    assert buckets.wait({"noisy": 10}, now=0.0) == 0
+    buckets.consume({"noisy": 10}, now=0.0)
+    assert buckets.wait({"noisy": 5}, now=0.0) == pytest.approx(0.5)
+    assert buckets.wait({"noisy": 5}, now=0.5) == 0
+    assert buckets.wait({"quiet": 1000}, now=0.5) == 0
+
+def test_large_batch_goes_into_debt():
+
+    buckets = TokenBuckets({"*": 10}, burst=1.0)
+    assert buckets.wait({"bulk": 50}, now=0.0) == 0
+    buckets.consume({"bulk": 50}, now=0.0)
+    # 40 tokens owed plus 10 to refill the burst for the next batch.
+    assert buckets.wait({"bulk": 50}, now=0.0) == pytest.approx(5.0)
+    assert buckets.wait({"bulk": 50}, now=5.0) == 0
+
+def test_zero_rate_blocks():
+
+    assert math.isinf(TokenBuckets({"banned": 0}).wait({"banned": 1}, now=0.0))
+
+def test_idle_buckets_evicted():
+
+    buckets = TokenBuckets({"*": 10}, burst=1.0, max_keys=100)
+    for i in range(100):
+        buckets.consume({f"s{i}": 1}, now=0.0)
+    assert len(buckets) == 100
+    buckets.consume({"late": 1}, now=0.01)
+    assert len(buckets) <= 100
+    # Refilled buckets are dropped as new keys arrive.
+    for i in range(100):
+        buckets.consume({f"t{i}": 1}, now=10.0)
+    assert len(buckets) <= 100
+
+def test_admission_all_or_nothing():
+
+    admission = AdmissionControl({"noisy": 10}, {"shared.*": 100})
+    assert admission.admit(from_source("noisy", 10), now=0.0) == 0
+    # noisy is out of tokens: the whole mixed batch waits, quiet's share included.
+    assert admission.admit(from_source("noisy", 5) + from_source("quiet", 5), now=0.0) > 0
+    # Each topic matching shared.* has a bucket of its own.
+    assert admission.admit(from_source("quiet", 50, topic="shared.x"), now=0.0) == 0
+    assert admission.admit(from_source("quiet", 60, topic="shared.y"), now=0.0) == 0
+    assert admission.admit(from_source("quiet", 60, topic="shared.x"), now=0.0) > 0
+    assert admission.admit(make_records(1000), now=0.0) == 0
+    assert admission.get_stats()["rejected"] == 2
+    assert admission.get_stats()["rejected_events"] == 70
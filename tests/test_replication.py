@@ -0,0 +1,167 @@
+import pytest
+import pytest_asyncio
+import asyncio
+import httpx
+from tests.conftest import make_records
+from src.replication import OFFSET_STATE, ChangeLog, ChangelogTrimmed, Replicator
+
+def changelog_writer(enabled=True):
+
+    return lambda store: ChangeLog(store, enabled=enabled, retain=10)
+
+@pytest_asyncio.fixture
+async def nodes(tmp_path, open_store):
+    primary, changelog = await open_store(changelog_writer(), path=str(tmp_path / "primary.db"))
+    standby, _ = await open_store(changelog_writer(False), path=str(tmp_path / "standby.db"))
+    return primary, changelog, standby
+
+def primary_transport(changelog):
+    # Serves /replication/changes from the primary's changelog in-process.
+    
+    async def handler(request):
+        params = request.url.params
+        changelog.ack(params["standby"], int(params["after"]))
+        try:
+            rows, head = await changelog.read_after(int(params["after"]), int(params["limit"]), float(params["wait"]))
+        except ChangelogTrimmed as e:
+            return httpx.Response(410, json={"detail": str(e)})
+        return httpx.Response(200, json={"changes": [list(row) for row in rows], "head": head})
+    
+    return httpx.MockTransport(handler)
+
+@pytest.mark.asyncio
+async def test_changelog_records_inserts_only(nodes):
+    primary, changelog, _ = nodes
+    
+    await primary.mark_processed_batch(make_records(5, prefix="a"))
+    await primary.mark_processed_batch(make_records(5, prefix="a"))
+    
+    rows, head = await changelog.read_after(0, 100)
+    assert head == 5
+    assert [row[0] for row in rows] == [1, 2, 3, 4, 5]
+    assert [row[2] for row in rows] == [f"a-{i}" for i in range(5)]
+    assert await changelog.bounds() == (1, 5)
+
+@pytest.mark.asyncio
+async def test_changelog_trim_and_trimmed_offset(nodes):
+    primary, changelog, _ = nodes
+    
+    await primary.mark_processed_batch(make_records(25, prefix="a"))
+    await changelog.trim(min_interval=0)
+    
+    assert await changelog.bounds() == (16, 25)
+    rows, _ = await changelog.read_after(15, 100)
+    assert len(rows) == 10
+    with pytest.raises(ChangelogTrimmed):
+        await changelog.read_after(14, 100)
+
+@pytest.mark.asyncio
+async def test_changelog_long_poll_wakes_on_notify(nodes):
+    primary, changelog, _ = nodes
+    
+    async def publish_later():
+        await asyncio.sleep(0.05)
+        await primary.mark_processed_batch(make_records(3, prefix="a"))
+        changelog.notify([])
+    
+    task = asyncio.create_task(publish_later())
+    rows, head = await changelog.read_after(0, 100, wait=5.0)
+    await task
+    
+    assert len(rows) == 3 and head == 3
+
+@pytest.mark.asyncio
+async def test_disabled_changelog_drops_trigger(open_store):
+    primary, _ = await open_store(changelog_writer())
+    await primary.close()
+    
+    primary, _ = await open_store(changelog_writer(False))
+    await primary.mark_processed_batch(make_records(3, prefix="a"))
+    cursor = await primary._db.execute("SELECT COUNT(*) FROM changelog")
+    count = (await cursor.fetchone())[0]
+    await primary.close()
+    
+    assert count == 0
+
+@pytest.mark.asyncio
+async def test_replicator_applies_and_resumes(nodes):
+    primary, changelog, standby = nodes
+    await primary.mark_processed_batch(make_records(7, prefix="a"))
+    
+    client = httpx.AsyncClient(transport=primary_transport(changelog))
+    replicator = Replicator("http://primary", standby, "standby-1", batch_size=4, client=client)
+    replicator.offset = await standby.get_state(OFFSET_STATE)
+    
+    assert await replicator.pull() == 4
+    assert await replicator.pull() == 3
+    assert await replicator.pull() == 0
+    assert replicator.get_status()["lag"] == 0
+    assert await standby.get_processed_count() == 7
+    assert await standby.get_state(OFFSET_STATE) == 7
+    assert (await changelog.get_status())["standbys"]["standby-1"]["acked"] == 7
+    
+    await primary.mark_processed_batch(make_records(2, prefix="b"))
+    assert await replicator.catch_up(timeout=5.0) is True
+    assert await standby.get_processed_count() == 9
+    await client.aclose()
+
+@pytest.mark.asyncio
+async def test_replicator_background_loop_and_trimmed(nodes):
+    primary, changelog, standby = nodes
+    await primary.mark_processed_batch(make_records(25, prefix="a"))
+    await changelog.trim(min_interval=0)
+    
+    replicator = Replicator(
+        "http://primary", standby, "standby-1",
+        client=httpx.AsyncClient(transport=primary_transport(changelog))
+    )
+    await replicator.start()
+    for _ in range(100):
+        if not replicator.running:
+            break
+        await asyncio.sleep(0.01)
+    status = replicator.get_status()
+    await replicator.stop()
+    
+    assert status["running"] is False
+    assert "earliest retained change 16" in status["last_error"]
+    assert await standby.get_processed_count() == 0
+
+@pytest.mark.asyncio
+async def test_catch_up_reports_unreachable_primary(nodes):
+    _, _, standby = nodes
+    
+    def handler(request):
+        raise httpx.ConnectError("connection refused")
+    
+    replicator = Replicator(
+        "http://primary", standby, "standby-1",
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    
+    assert await replicator.catch_up(timeout=1.0) is False
+    await replicator.stop()
+
+@pytest.mark.asyncio
+async def test_changelog_hides_uncommitted_changes(nodes):
+    primary, changelog, _ = nodes
+    await primary.mark_processed_batch(make_records(2, prefix="a"))
+    
+    async with primary.transaction() as db:
+        await db.execute(
+            "INSERT INTO processed_events VALUES ('test.topic', 'pending', '2025-10-23T10:00:00Z', 'test', '')"
+        )
+        rows, head = await changelog.read_after(0, 100)
+        assert [row[2] for row in rows] == ["a-0", "a-1"] and head == 2
+    rows, head = await changelog.read_after(0, 100)
+    assert head == 3
+
+@pytest.mark.asyncio
+async def test_enable_installs_trigger_on_promotion(open_store):
+    standby, log = await open_store(changelog_writer(False))
+    await standby.mark_processed_batch(make_records(2, prefix="a"))
+    
+    await log.enable()
+    await standby.mark_processed_batch(make_records(3, prefix="b"))
+    rows, head = await log.read_after(0, 100)
+    assert [row[2] for row in rows] == ["b-0", "b-1", "b-2"] and head == 3
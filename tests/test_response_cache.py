@@ -0,0 +1,50 @@
+import pytest
+from src.response_cache import ResponseCache
+
+def test_versions_follow_commits():
+
+    cache = ResponseCache()
+    orders, users, store = cache.version("orders"), cache.version("users"), cache.version()
+    cache.put(("events", "orders", 100), orders, b"[1]", 3)
+    cache.put(("events", "users", 100), users, b"[2]", 3)
+    
+    cache.invalidate({"orders"})
+    assert cache.version("orders") != orders
+    assert cache.version("users") == users
+    assert cache.version() != store
+    assert cache.get(("events", "orders", 100), cache.version("orders")) is None
+    assert cache.get(("events", "users", 100), cache.version("users")) == b"[2]"
+    
+    # Cleanup may touch any topic.
+    cache.invalidate(None)
+    assert cache.version("users") != users
+    assert cache.get(("events", "users", 100), cache.version("users")) is None
+    assert cache.get_stats()["hit_ratio"] == pytest.approx(1 / 3, abs=0.001)
+
+def test_lru_bounded_by_entries_and_bytes():
+
+    cache = ResponseCache(max_entries=3, max_bytes=100)
+    for i in range(3):
+        cache.put(i, 0, b"x" * 10, 10)
+    assert cache.get(0, 0) is not None
+    cache.put(3, 0, b"x" * 10, 10)
+    assert cache.get(1, 0) is None
+    assert cache.get(0, 0) is not None
+    
+    cache.put(4, 0, b"x" * 90, 90)
+    assert cache.get_stats()["bytes"] <= 100
+    assert cache.get(4, 0) is not None
+    cache.put(5, 0, b"x" * 200, 200)
+    assert cache.get(5, 0) is None
+    assert cache.get_stats()["evictions"] == 3
+
+def test_etag_matching():
+
+    cache = ResponseCache()
+    etag = cache.etag(cache.version("orders"))
+    assert cache.not_modified(etag, etag)
+    assert cache.not_modified(f'"other", W/{etag}', etag)
+    assert not cache.not_modified(None, etag)
+    cache.invalidate({"orders"})
+    assert not cache.not_modified(etag, cache.etag(cache.version("orders")))
+    assert ResponseCache().etag(0) != ResponseCache().etag(0)
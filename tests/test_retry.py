@@ -0,0 +1,147 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from src.consumer import EventConsumer
+from src.event_queue import EventQueue
+from src.retry import RetryScheduler
+from tests.conftest import make_records
+
+class FlakyHandler:
+
+    # Fails each event the first `failures` times it is handled.
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = {}
+    
+    async def __call__(self, event):
+        seen = self.calls[event.event_id] = self.calls.get(event.event_id, 0) + 1
+        if seen <= self.failures:
+            raise RuntimeError(f"failure {seen}")
+
+def scheduler(handler, max_attempts=3):
+
+    return lambda store: RetryScheduler(store, handler, max_attempts=max_attempts, base_delay=0.01, max_delay=0.05)
+
+async def run_consumer(store, retries, handler, records):
+
+    queue = EventQueue(maxsize=100)
+    consumer = EventConsumer(queue, store)
+    consumer.handle_event = handler
+    consumer.set_retries(retries)
+    await queue.enqueue_batch(records)
+    await consumer.drain(timeout=5.0)
+    return consumer
+
+def test_backoff_doubles_up_to_cap():
+
+    retries = RetryScheduler(None, None, base_delay=1.0, max_delay=5.0)
+    for attempts, full in [(1, 1.0), (2, 2.0), (3, 4.0), (4, 5.0), (10, 5.0)]:
+        assert full / 2 <= retries.delay(attempts) <= full
+
+@pytest.mark.asyncio
+async def test_failed_event_retried_until_handled(open_store):
+
+    handler = FlakyHandler(failures=2)
+    store, retries = await open_store(scheduler(handler))
+    await retries.start()
+    handled = []
+    retries.add_listener(handled.extend)
+    try:
+        consumer = await run_consumer(store, retries, handler, make_records(3, topic="test.retry"))
+        assert consumer.stats == {"processed": 0, "duplicates": 0, "failed": 3, "requeued": 0}
+        assert retries.get_stats()["pending"] == 3
+        
+        # A redelivery while the retry is pending is still a duplicate.
+        assert await store.mark_processed_batch(make_records(1, topic="test.retry")) == [False]
+        
+        for _ in range(100):
+            if len(handled) == 3:
+                break
+            await asyncio.sleep(0.02)
+        assert sorted(e.event_id for e in handled) == ["evt-0", "evt-1", "evt-2"]
+        assert handler.calls == {"evt-0": 3, "evt-1": 3, "evt-2": 3}
+        assert retries.get_stats()["recovered"] == 3
+        cursor = await store._db.execute("SELECT COUNT(*) FROM event_retries")
+        assert (await cursor.fetchone())[0] == 0
+    finally:
+        await retries.stop()
+        await store.close()
+
+@pytest.mark.asyncio
+async def test_exhausted_events_dead_lettered_and_redriven(open_store):
+
+    handler = FlakyHandler(failures=2)
+    store, retries = await open_store(scheduler(handler, max_attempts=2))
+    await retries.start()
+    try:
+        await run_consumer(store, retries, handler, make_records(2, topic="test.dlq"))
+        for _ in range(100):
+            if retries.dead_count == 2:
+                break
+            await asyncio.sleep(0.02)
+        entries = sorted(await retries.dead_letters(topic="test.dlq"), key=lambda e: e["event_id"])
+        assert [(e["event_id"], e["attempts"]) for e in entries] == [("evt-0", 2), ("evt-1", 2)]
+        assert "failure 2" in entries[0]["error"]
+        assert retries.get_stats()["pending"] == 0
+        
+        assert await retries.redrive(ids=[entries[1]["id"]]) == 1
+        for _ in range(100):
+            if retries.get_stats()["recovered"] == 1:
+                break
+            await asyncio.sleep(0.02)
+        assert retries.get_stats()["recovered"] == 1
+        assert [e["event_id"] for e in await retries.dead_letters()] == ["evt-0"]
+        assert retries.dead_count == 1
+    finally:
+        await retries.stop()
+        await store.close()
+
+@pytest.mark.asyncio
+async def test_pending_retries_survive_restart(open_store):
+
+    handler = FlakyHandler(failures=1)
+    store, retries = await open_store(scheduler(handler))
+    await run_consumer(store, retries, handler, make_records(2, topic="test.restart"))
+    await store.close()
+    
+    handled = []
+    store, retries = await open_store(scheduler(handler))
+    await retries.start()
+    retries.add_listener(handled.extend)
+    try:
+        for _ in range(100):
+            if len(handled) == 2:
+                break
+            await asyncio.sleep(0.02)
+        assert sorted(e.event_id for e in handled) == ["evt-0", "evt-1"]
+    finally:
+        await retries.stop()
+        await store.close()
+
+@pytest.mark.asyncio
+async def test_interrupted_events_run_after_restart(open_store):
+
+    handler = FlakyHandler(failures=0)
+    store, retries = await open_store(scheduler(handler))
+    # Marked, then the process dies before any handler ran.
+    assert await store.mark_processed_batch(make_records(2, topic="test.crash")) == [True, True]
+    consumer = await run_consumer(store, retries, handler, make_records(3, topic="test.ok"))
+    assert consumer.stats["processed"] == 3
+    await store.close()
+    
+    handled = []
+    store, retries = await open_store(scheduler(handler))
+    await retries.start()
+    retries.add_listener(handled.extend)
+    try:
+        for _ in range(100):
+            if len(handled) == 2:
+                break
+            await asyncio.sleep(0.02)
+        assert sorted(e.event_id for e in handled) == ["evt-0", "evt-1"]
+        assert all(e.topic == "test.crash" for e in handled)
+        cursor = await store.reader.execute("SELECT COUNT(*) FROM event_retries")
+        assert (await cursor.fetchone())[0] == 0
+    finally:
+        await retries.stop()
+        await store.close()
@@ -0,0 +1,60 @@
+import pytest
+from src.ring_buffer import RingBuffer
+
+def test_put_and_get_fifo():
+
+    ring = RingBuffer(4)
+    assert ring.put(1) is True
+    assert ring.put(2) is True
+    assert ring.get_many(10) == [1, 2]
+    assert ring.qsize() == 0
+
+def test_get_single():
+
+    ring = RingBuffer(2)
+    ring.put_many(["a", "b"])
+    assert ring.get() == "a"
+    ring.put("c")
+    assert ring.get() == "b"
+    assert ring.get() == "c"
+    with pytest.raises(IndexError):
+        ring.get()
+
+def test_put_full():
+
+    ring = RingBuffer(2)
+    ring.put(1)
+    ring.put(2)
+    assert ring.full() is True
+    assert ring.put(3) is False
+    assert ring.qsize() == 2
+
+def test_put_many_partial():
+
+    ring = RingBuffer(3)
+    assert ring.put_many([1, 2, 3, 4, 5]) == 3
+    assert ring.get_many(5) == [1, 2, 3]
+    assert ring.put_many([]) == 0
+
+def test_wraparound():
+
+    ring = RingBuffer(4)
+    ring.put_many([1, 2, 3])
+    assert ring.get_many(2) == [1, 2]
+
+    assert ring.put_many([4, 5, 6]) == 3
+    assert ring.qsize() == 4
+    assert ring.get_many(3) == [3, 4, 5]
+    assert ring.get_many(3) == [6]
+
+def test_get_many_releases_slots():
+
+    ring = RingBuffer(3)
+    ring.put_many(["a", "b", "c"])
+    ring.get_many(2)
+    assert ring._slots.count(None) == 2
+
+def test_invalid_capacity():
+
+    with pytest.raises(ValueError):
+        RingBuffer(0)
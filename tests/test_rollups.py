@@ -0,0 +1,91 @@
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from src.dedup_store import DedupStore
+from src.models import EventRecord
+from src.rollups import RollupStore, minute_bucket
+
+def make_record(topic, event_id, timestamp, source="test"):
+
+    return EventRecord(topic, event_id, timestamp, source)
+
+@pytest_asyncio.fixture
+async def store(db_path):
+    store = DedupStore(db_path=db_path)
+    rollups = RollupStore()
+    store.add_writer(rollups)
+    await store.initialize()
+    yield store, rollups
+    await store.close()
+
+def test_minute_bucket():
+
+    assert minute_bucket("2025-10-23T10:30:12.5Z") == "2025-10-23T10:30"
+    assert minute_bucket("2025-10-23T10:30:12") == "2025-10-23T10:30"
+    assert minute_bucket("2025-10-23T12:30:12+02:00") == "2025-10-23T10:30"
+    assert minute_bucket("2025-10-23T05:30:00-05:00") == "2025-10-23T10:30"
+    assert minute_bucket("2025-10-23") == "2025-10-23T00:00"
+
+def test_minute_bucket_offset_without_seconds():
+
+    assert minute_bucket("2025-10-23T10:30+05:00") == "2025-10-23T05:30"
+    assert minute_bucket("2025-10-23T10:30-0500") == "2025-10-23T15:30"
+    assert minute_bucket("2025-10-23T10:30Z") == "2025-10-23T10:30"
+
+@pytest.mark.asyncio
+async def test_rollups_count_batches(store):
+    store, rollups = store
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    ts = now.isoformat() + "Z"
+    later = (now + timedelta(minutes=1)).isoformat() + "Z"
+
+    await store.mark_processed_batch([
+        make_record("app.log", "1", ts, source="a"),
+        make_record("app.log", "2", ts, source="b"),
+        make_record("app.log", "3", later, source="a"),
+        make_record("app.error", "4", ts, source="a"),
+        make_record("app.log", "1", ts, source="a"),
+    ])
+    await store.mark_processed_batch([make_record("app.log", "5", ts, source="a")])
+    await store.mark_processed("app.log", "6", ts, "c")
+
+    since, until = now - timedelta(minutes=5), now + timedelta(minutes=5)
+    buckets = await rollups.query("minute", since, until, topic="app.log")
+    assert [(b["bucket"], b["count"], b["sources"]) for b in buckets] == [
+        (now.strftime("%Y-%m-%dT%H:%M:00Z"), 4, 3),
+        ((now + timedelta(minutes=1)).strftime("%Y-%m-%dT%H:%M:00Z"), 1, 1),
+    ]
+
+    by_source = await rollups.query("minute", since, until, topic="app.*", source="a", group_by="source")
+    assert sum(b["count"] for b in by_source) == 4
+    assert {b["topic"] for b in by_source} == {"app.log", "app.error"}
+
+    hours = await rollups.query("hour", now - timedelta(hours=2), now + timedelta(hours=2))
+    assert sum(b["count"] for b in hours) == 6
+
+@pytest.mark.asyncio
+async def test_rollups_downsample_keeps_hours(db_path):
+    store = DedupStore(db_path=db_path)
+    rollups = RollupStore(minute_retention=timedelta(hours=1), downsample_interval=0)
+    store.add_writer(rollups)
+    await store.initialize()
+
+    old = "2025-10-23T10:30:00Z"
+    await store.mark_processed_batch([make_record("app.log", "1", old), make_record("app.log", "2", old)])
+
+    since, until = datetime(2025, 10, 23, 10), datetime(2025, 10, 23, 11)
+    assert await rollups.query("minute", since, until) == []
+    hours = await rollups.query("hour", since, until)
+    assert [(b["bucket"], b["count"]) for b in hours] == [("2025-10-23T10:00:00Z", 2)]
+
+    await store.close()
+
+@pytest.mark.asyncio
+async def test_rollups_invalid_arguments(store):
+    store, rollups = store
+    now = datetime.utcnow()
+
+    with pytest.raises(ValueError):
+        await rollups.query("second", now, now)
+    with pytest.raises(ValueError):
+        await rollups.query("minute", now, now, group_by="day")
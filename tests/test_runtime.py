@@ -0,0 +1,42 @@
+import json
+import pytest
+from src import runtime
+
+def test_defaults_resolve_to_installed():
+
+    settings = runtime.load_settings({})
+    assert settings["loop"] in ("uvloop", "asyncio")
+    assert settings["http"] in ("httptools", "h11")
+    assert settings["workers"] == 1
+    assert settings["port"] == 8080
+    assert settings["limit_concurrency"] is None
+    assert settings["access_log"] is False
+
+def test_settings_from_env():
+
+    settings = runtime.load_settings({
+        "RUNTIME_LOOP": "asyncio",
+        "RUNTIME_HTTP": "h11",
+        "RUNTIME_WORKERS": "2",
+        "RUNTIME_KEEP_ALIVE": "30",
+        "RUNTIME_BACKLOG": "512",
+        "RUNTIME_LIMIT_CONCURRENCY": "200",
+        "RUNTIME_ACCESS_LOG": "true",
+        "PORT": "9000",
+    })
+    assert (settings["loop"], settings["http"], settings["workers"]) == ("asyncio", "h11", 2)
+    assert (settings["timeout_keep_alive"], settings["backlog"], settings["limit_concurrency"]) == (30, 512, 200)
+    assert settings["access_log"] is True
+    assert settings["port"] == 9000
+
+def test_unknown_loop_rejected():
+
+    with pytest.raises(ValueError):
+        runtime.load_settings({"RUNTIME_LOOP": "trio"})
+
+def test_describe_reports_launcher_settings(monkeypatch):
+
+    monkeypatch.setenv(runtime.RESOLVED_ENV, json.dumps({"loop": "uvloop"}))
+    assert runtime.describe()["launcher"] == {"loop": "uvloop"}
+    monkeypatch.delenv(runtime.RESOLVED_ENV)
+    assert runtime.describe()["launcher"] is None
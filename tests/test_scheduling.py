@@ -0,0 +1,99 @@
+import pytest
+from src.config import TopicRules
+from src.models import Event
+from src.scheduling import FairScheduler
+
+def make_event(topic, i):
+
+    return Event(
+        topic=topic,
+        event_id=f"{topic}-{i}",
+        timestamp="2025-10-23T10:00:00Z",
+        source="test",
+        payload={}
+    )
+
+def test_round_robin_between_topics():
+
+    scheduler = FairScheduler(maxsize=100)
+    for i in range(10):
+        scheduler.put(make_event("noisy", i))
+    scheduler.put(make_event("quiet", 0))
+
+    batch = scheduler.get_many(3)
+    assert [e.topic for e in batch] == ["noisy", "quiet", "noisy"]
+    assert scheduler.qsize() == 8
+
+def test_fifo_within_topic():
+
+    scheduler = FairScheduler(maxsize=100)
+    for i in range(5):
+        scheduler.put(make_event("a", i))
+
+    batch = scheduler.get_many(10)
+    assert [e.event_id for e in batch] == [f"a-{i}" for i in range(5)]
+
+def test_weighted_share():
+
+    scheduler = FairScheduler(maxsize=1000, weights=TopicRules({"heavy": 3.0}, default=1.0))
+    for i in range(100):
+        scheduler.put(make_event("heavy", i))
+        scheduler.put(make_event("light", i))
+
+    batch = scheduler.get_many(40)
+    heavy = sum(1 for e in batch if e.topic == "heavy")
+    assert heavy == 30
+
+def test_fractional_weight():
+
+    scheduler = FairScheduler(maxsize=1000, weights=TopicRules({"slow": 0.5}, default=1.0))
+    for i in range(10):
+        scheduler.put(make_event("slow", i))
+        scheduler.put(make_event("fast", i))
+
+    batch = scheduler.get_many(9)
+    assert sum(1 for e in batch if e.topic == "slow") == 3
+
+def test_strict_priority():
+
+    scheduler = FairScheduler(maxsize=100, priorities=TopicRules({"payment.*": 0}, default=1))
+    for i in range(3):
+        scheduler.put(make_event("system.alert", i))
+    scheduler.put(make_event("payment.done", 0))
+
+    batch = scheduler.get_many(2)
+    assert batch[0].topic == "payment.done"
+    assert batch[1].topic == "system.alert"
+
+def test_per_topic_capacity():
+
+    scheduler = FairScheduler(maxsize=100, capacities=TopicRules({"system.alert": 2}, default=100))
+    assert scheduler.put(make_event("system.alert", 0)) is True
+    assert scheduler.put(make_event("system.alert", 1)) is True
+    assert scheduler.put(make_event("system.alert", 2)) is False
+    assert scheduler.put(make_event("user.login", 0)) is True
+    assert scheduler.topic_sizes() == {"system.alert": 2, "user.login": 1}
+
+def test_total_capacity():
+
+    scheduler = FairScheduler(maxsize=2)
+    assert scheduler.put(make_event("a", 0)) is True
+    assert scheduler.put(make_event("b", 0)) is True
+    assert scheduler.put(make_event("c", 0)) is False
+    assert scheduler.full() is True
+
+def test_turn_resumes_across_calls():
+
+    scheduler = FairScheduler(maxsize=100, weights=TopicRules({"a": 4.0}, default=1.0))
+    for i in range(8):
+        scheduler.put(make_event("a", i))
+        scheduler.put(make_event("b", i))
+
+    first = scheduler.get_many(2)
+    second = scheduler.get_many(3)
+    assert [e.topic for e in first + second] == ["a", "a", "a", "a", "b"]
+
+def test_invalid_weight():
+
+    with pytest.raises(ValueError):
+        FairScheduler(maxsize=10, weights=TopicRules({"a": 0}, default=1.0))
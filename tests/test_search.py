@@ -0,0 +1,110 @@
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from src.dedup_store import DedupStore
+from src.models import EventRecord
+from src.search import SearchIndex, build_match, payload_text
+
+def make_record(topic, event_id, payload, source="test"):
+
+    return EventRecord(topic, event_id, "2025-10-23T10:00:00Z", source, payload)
+
+@pytest_asyncio.fixture
+async def store(db_path):
+    store = DedupStore(db_path=db_path)
+    index = SearchIndex()
+    store.add_writer(index)
+    await store.initialize()
+    yield store, index
+    await store.close()
+
+def test_payload_text():
+
+    payload = b'{"message": "disk full", "error": {"code": 28, "tags": ["io", null]}}'
+
+    assert payload_text(payload) == "disk full 28 io"
+    assert payload_text(payload, fields=["error.code", "missing"]) == "28"
+    assert payload_text(b"{}") == ""
+
+def test_build_match_quotes_terms():
+
+    assert build_match('disk OR "full"') == '"disk" "OR" """full"""'
+    assert build_match("time*") == '"time"*'
+
+@pytest.mark.asyncio
+async def test_search_indexes_batches(store):
+    store, index = store
+
+    await store.mark_processed_batch([
+        make_record("app.error", "e-1", b'{"message": "disk full on /var"}'),
+        make_record("app.error", "e-2", b'{"message": "connection timeout"}'),
+        make_record("app.info", "i-1", b'{"message": "disk usage 40%"}'),
+        make_record("app.error", "e-1", b'{"message": "disk full on /var"}'),
+    ])
+
+    hits = await index.search("disk")
+    assert [h["event_id"] for h in hits] == ["i-1", "e-1"]
+    assert await index.get_indexed_count() == 3
+
+    hits = await index.search("disk", topic="app.error")
+    assert [h["event_id"] for h in hits] == ["e-1"]
+    assert "[disk]" in hits[0]["snippet"]
+
+    assert await index.search("timeout connection") != []
+    assert await index.search("time*") != []
+    assert await index.search("missing") == []
+
+@pytest.mark.asyncio
+async def test_search_rank_order(store):
+    store, index = store
+
+    await store.mark_processed_batch([
+        make_record("app.log", "weak", b'{"message": "retry after failure, see logs for details and context"}'),
+        make_record("app.log", "strong", b'{"message": "retry retry retry"}'),
+        make_record("app.log", "other", b'{"message": "nothing here"}'),
+    ])
+
+    hits = await index.search("retry", order="rank")
+    assert [h["event_id"] for h in hits] == ["strong", "weak"]
+    assert hits[0]["score"] >= hits[1]["score"]
+
+@pytest.mark.asyncio
+async def test_search_since(store):
+    store, index = store
+
+    await store.mark_processed_batch([make_record("app.log", "old", b'{"m": "alpha"}')])
+    after = datetime.utcnow().isoformat()
+    await store.mark_processed_batch([make_record("app.log", "new", b'{"m": "alpha"}')])
+
+    hits = await index.search("alpha", since=after)
+    assert [h["event_id"] for h in hits] == ["new"]
+
+    future = (datetime.utcnow() + timedelta(days=1)).isoformat()
+    assert await index.search("alpha", since=future) == []
+
+@pytest.mark.asyncio
+async def test_search_invalid_query(store):
+    store, index = store
+
+    with pytest.raises(ValueError):
+        await index.search('"unterminated', raw=True)
+    with pytest.raises(ValueError):
+        await index.search("alpha", order="random")
+
+@pytest.mark.asyncio
+async def test_search_topic_filter_on_index(db_path):
+    store = DedupStore(db_path=db_path)
+    index = SearchIndex(topics="audit.*", fields=["message"])
+    store.add_writer(index)
+    await store.initialize()
+
+    await store.mark_processed_batch([
+        make_record("audit.login", "a-1", b'{"message": "login ok", "user": "alice"}'),
+        make_record("app.log", "l-1", b'{"message": "login ok"}'),
+    ])
+
+    hits = await index.search("login")
+    assert [h["event_id"] for h in hits] == ["a-1"]
+    assert await index.search("alice") == []
+
+    await store.close()
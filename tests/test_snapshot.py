@@ -0,0 +1,116 @@
+import pytest
+import pytest_asyncio
+import asyncio
+import os
+import sqlite3
+from pathlib import Path
+from src.dedup_store import DedupStore
+from tests.conftest import make_records
+import src.snapshot
+from src.snapshot import MANIFEST_SUFFIX, Snapshotter, take_snapshot
+
+def count_rows(path):
+
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        return conn.execute("SELECT COUNT(*) FROM processed_events").fetchone()[0]
+    finally:
+        conn.close()
+
+@pytest_asyncio.fixture
+async def store(db_path):
+    store = DedupStore(db_path=db_path)
+    await store.initialize()
+    await store.mark_processed_batch(make_records(5000, prefix="a"))
+    yield store
+    await store.close()
+
+@pytest.mark.asyncio
+async def test_full_then_incremental(store, tmp_path):
+    dest = tmp_path / "snapshots" / "dedup.db"
+    
+    full = take_snapshot(store.db_path, str(dest), pages_per_step=8)
+    assert full["incremental"] is False
+    assert full["pages_written"] == full["pages"]
+    assert count_rows(dest) == 5000
+    assert Path(str(dest) + MANIFEST_SUFFIX).exists()
+    
+    await store.mark_processed_batch(make_records(10, prefix="b"))
+    incremental = take_snapshot(store.db_path, str(dest), pages_per_step=8)
+    assert incremental["incremental"] is True
+    assert 0 < incremental["pages_written"] < incremental["pages"] // 2
+    assert count_rows(dest) == 5010
+    
+    # Patching changed pages gives exactly the file a full copy would.
+    reference = tmp_path / "reference.db"
+    take_snapshot(store.db_path, str(reference), incremental=False)
+    assert dest.read_bytes() == reference.read_bytes()
+    assert not list(tmp_path.glob(".*.staging"))
+
+@pytest.mark.asyncio
+async def test_snapshot_is_consistent_under_writes(store, tmp_path):
+    snapshotter = Snapshotter(store.db_path, str(tmp_path / "snapshots"), pages_per_step=1, step_pause=0.001)
+    stop = False
+    
+    async def ingest():
+        batch = 0
+        while not stop:
+            await store.mark_processed_batch(make_records(50, prefix=f"w{batch}"))
+            batch += 1
+        return batch
+    
+    writer = asyncio.create_task(ingest())
+    await asyncio.sleep(0.01)
+    before = await store.get_processed_count()
+    assert snapshotter.start()
+    assert not snapshotter.start()
+    await snapshotter._task
+    after = await store.get_processed_count()
+    stop = True
+    batches = await writer
+    
+    assert batches > 1
+    assert snapshotter.last_error is None
+    snapshot_rows = count_rows(snapshotter.dest)
+    assert before <= snapshot_rows <= after
+    assert (snapshot_rows - 5000) % 50 == 0
+
+@pytest.mark.asyncio
+async def test_snapshot_cancel(store, tmp_path):
+    snapshotter = Snapshotter(store.db_path, str(tmp_path / "snapshots"), pages_per_step=1, step_pause=0.01)
+    
+    snapshotter.start()
+    await asyncio.sleep(0.05)
+    assert snapshotter.get_status()["running"] is True
+    await snapshotter.stop()
+    
+    status = snapshotter.get_status()
+    assert status["running"] is False
+    assert "SnapshotAborted" in status["last_error"]
+    assert not list(tmp_path.glob(".*.staging"))
+
+@pytest.mark.asyncio
+async def test_failed_update_keeps_previous_snapshot(store, tmp_path, monkeypatch):
+    dest = tmp_path / "snapshots" / "dedup.db"
+    take_snapshot(store.db_path, str(dest))
+    previous = dest.read_bytes()
+    manifest = Path(str(dest) + MANIFEST_SUFFIX).read_bytes()
+    
+    await store.mark_processed_batch(make_records(500, prefix="b"))
+    calls = []
+    
+    def failing_digest(page):
+        calls.append(page)
+        if len(calls) > 20:
+            raise OSError("disk full")
+        return b"x" * 8
+    
+    monkeypatch.setattr(src.snapshot, "page_digest", failing_digest)
+    with pytest.raises(OSError):
+        take_snapshot(store.db_path, str(dest))
+    
+    assert dest.read_bytes() == previous
+    assert Path(str(dest) + MANIFEST_SUFFIX).read_bytes() == manifest
+    assert not list(dest.parent.glob("*.tmp"))
+    assert count_rows(dest) == 5000
@@ -0,0 +1,111 @@
+import pytest
+import asyncio
+import json
+from src.models import EventRecord
+from src.subscriptions import SubscriptionHub, build_frame
+
+def make_record(topic, event_id, payload=b'{"n":1}'):
+
+    return EventRecord(topic, event_id, "2025-10-23T10:00:00Z", "test", payload)
+
+def parse_frames(chunk):
+
+    frames = []
+    for block in chunk.decode().strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n") if not line.startswith(":"))
+        frames.append(fields)
+    return frames
+
+async def next_chunk(subscriber):
+
+    stream = subscriber.stream(keepalive=0.05)
+    return await asyncio.wait_for(stream.__anext__(), timeout=1.0)
+
+def test_build_frame():
+
+    frame = build_frame(42, make_record("user.login", "evt-1"))
+    fields = parse_frames(frame)[0]
+
+    assert fields["id"] == "42"
+    assert fields["event"] == "user.login"
+    assert json.loads(fields["data"]) == {
+        "topic": "user.login",
+        "event_id": "evt-1",
+        "timestamp": "2025-10-23T10:00:00Z",
+        "source": "test",
+        "payload": {"n": 1},
+    }
+
+@pytest.mark.asyncio
+async def test_pattern_filter():
+
+    hub = SubscriptionHub()
+    users = hub.subscribe("user.*")
+    orders = hub.subscribe("order.created")
+
+    hub.publish([make_record("user.login", "evt-1"), make_record("order.created", "evt-2")])
+
+    user_frames = parse_frames(await next_chunk(users))
+    order_frames = parse_frames(await next_chunk(orders))
+    assert [f["event"] for f in user_frames] == ["user.login"]
+    assert [f["event"] for f in order_frames] == ["order.created"]
+
+@pytest.mark.asyncio
+async def test_frame_shared_between_subscribers():
+
+    hub = SubscriptionHub()
+    first = hub.subscribe("user.*")
+    second = hub.subscribe("*")
+
+    hub.publish([make_record("user.login", "evt-1")])
+    assert first._buffer[0] is second._buffer[0]
+
+@pytest.mark.asyncio
+async def test_resume_from_cursor():
+
+    hub = SubscriptionHub()
+    live = hub.subscribe("*")
+    hub.publish([make_record("user.login", f"evt-{i}") for i in range(3)])
+    ids = [int(f["id"]) for f in parse_frames(await next_chunk(live))]
+
+    resumed = hub.subscribe("*", cursor=ids[0])
+    frames = parse_frames(await next_chunk(resumed))
+    assert [int(f["id"]) for f in frames] == ids[1:]
+
+@pytest.mark.asyncio
+async def test_resume_reports_gap():
+
+    hub = SubscriptionHub(history_size=2)
+    hub.publish([make_record("user.login", f"evt-{i}") for i in range(5)])
+
+    resumed = hub.subscribe("*", cursor=0)
+    frames = parse_frames(await next_chunk(resumed))
+    assert frames[0]["event"] == "gap"
+    assert len(frames) == 3
+
+@pytest.mark.asyncio
+async def test_overflow_disconnects_slow_subscriber():
+
+    hub = SubscriptionHub(buffer_size=2)
+    slow = hub.subscribe("*")
+    hub.publish([make_record("user.login", f"evt-{i}") for i in range(5)])
+
+    assert slow.closed is True
+    assert slow.close_reason == "overflow"
+
+    chunks = [chunk async for chunk in slow.stream(keepalive=0.05)]
+    frames = parse_frames(b"".join(chunks))
+    assert [f["event"] for f in frames] == ["user.login", "user.login", "overflow"]
+
+@pytest.mark.asyncio
+async def test_keepalive_and_unsubscribe():
+
+    hub = SubscriptionHub()
+    subscriber = hub.subscribe("*")
+
+    assert await next_chunk(subscriber) == b": keepalive\n\n"
+
+    hub.unsubscribe(subscriber)
+    assert hub.get_stats()["subscribers"] == 0
+    hub.publish([make_record("user.login", "evt-1")])
+    assert not subscriber._buffer
@@ -0,0 +1,89 @@
+import pytest
+import asyncio
+from src.warmup import Warmup
+
+async def finish(warmup):
+
+    await asyncio.wait_for(warmup._task, timeout=1.0)
+
+@pytest.mark.asyncio
+async def test_warmup_runs_steps_in_order():
+    warmup = Warmup()
+    calls = []
+
+    async def first(progress):
+        progress(5, 10)
+        calls.append("first")
+
+    async def second(progress):
+        calls.append("second")
+
+    warmup.add_step("first", first)
+    warmup.add_step("second", second)
+    assert warmup.progress()["ready"] is False
+
+    warmup.start()
+    await finish(warmup)
+
+    progress = warmup.progress()
+    assert calls == ["first", "second"]
+    assert progress["ready"] is True
+    assert progress["steps_done"] == progress["steps_total"] == 2
+    assert progress["current_step"] is None
+    assert set(progress["completed"]) == {"first", "second"}
+
+@pytest.mark.asyncio
+async def test_warmup_reports_progress():
+    warmup = Warmup()
+    release = asyncio.Event()
+
+    async def slow(progress):
+        progress(25, 100)
+        await release.wait()
+
+    warmup.add_step("slow", slow)
+    warmup.start()
+    await asyncio.sleep(0.01)
+
+    progress = warmup.progress()
+    assert progress["current_step"] == "slow"
+    assert progress["current_progress"] == 0.25
+    assert progress["ready"] is False
+
+    release.set()
+    await finish(warmup)
+    assert warmup.ready is True
+
+@pytest.mark.asyncio
+async def test_warmup_failed_step_blocks_readiness():
+    warmup = Warmup()
+
+    async def broken(progress):
+        raise RuntimeError("corrupt")
+
+    async def fine(progress):
+        pass
+
+    warmup.add_step("broken", broken)
+    warmup.add_step("fine", fine)
+    warmup.start()
+    await finish(warmup)
+
+    assert warmup.ready is False
+    assert warmup.progress()["failed"] == {"broken": "corrupt"}
+    assert "fine" in warmup.completed
+
+@pytest.mark.asyncio
+async def test_warmup_stop():
+    warmup = Warmup()
+
+    async def forever(progress):
+        await asyncio.Event().wait()
+
+    warmup.add_step("forever", forever)
+    warmup.start()
+    await asyncio.sleep(0)
+    await warmup.stop()
+
+    assert warmup._task.cancelled()
+    assert warmup.ready is False